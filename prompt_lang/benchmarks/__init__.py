@@ -0,0 +1,5 @@
+"""Performance benchmarks for prompt validation.
+
+Each module is runnable on its own, e.g.:
+    python -m prompt_lang.benchmarks.bench_lexer
+"""
@@ -0,0 +1,110 @@
+"""Compare counting tokens file by file with batched, threaded counting.
+
+Writes a synthetic corpus of prompt files, then counts the tokens of
+their contents with count_tokens one at a time and with
+count_tokens_batch on 1 to --threads threads, starting from an empty
+token count cache each time. Finally validates the whole directory
+in-process both ways.
+
+tiktoken's encodings are downloaded on first use. When the configured
+encoding cannot be loaded (no network), a small byte-level BPE built
+locally with tiktoken stands in for it, so the timings still reflect
+tiktoken's encoder and its release of the GIL.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_batch_counting [--files N] [--threads N]
+"""
+
+import argparse
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from prompt_lang import tokens
+from prompt_lang.benchmarks.bench_streaming import write_prompt
+from prompt_lang.config import load_config
+from prompt_lang.validate import validate_directory, validate_file
+
+
+def local_encoding():
+    """Build a byte-level BPE with merges for letter pairs."""
+    import tiktoken
+
+    ranks = {bytes([i]): i for i in range(256)}
+    for first in " " + string.ascii_lowercase:
+        for second in string.ascii_lowercase:
+            ranks[(first + second).encode()] = len(ranks)
+    return tiktoken.Encoding(
+        "local-bench",
+        pat_str=tokens.BPE_PATTERNS["cl100k_base"],
+        mergeable_ranks=ranks,
+        special_tokens={"<|endoftext|>": len(ranks)},
+    )
+
+
+def write_corpus(root: Path, file_count: int) -> None:
+    """Write file_count prompts of 2 to 32 KB."""
+    for i in range(file_count):
+        write_prompt(root / f"prompt-{i:05d}.md", 2048 * (1 + i % 16))
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def fresh_cache() -> None:
+    tokens.COUNT_CACHE = tokens.TokenCountCache()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    config = load_config()
+    encoding = config.validation.tokens.tokenizer
+    if not tokens.warm_up(encoding):
+        tokens._encoders[encoding] = local_encoding()
+        print(f"{encoding} unavailable; using a local byte-level BPE")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_corpus(root, args.files)
+        paths = sorted(root.glob("*.md"))
+        contents = [path.read_text(encoding="utf-8") for path in paths]
+        size_mb = sum(len(content) for content in contents) / (1024 * 1024)
+        print(f"corpus: {len(contents)} files, {size_mb:.1f} MB")
+
+        fresh_cache()
+        serial = timed(lambda: [tokens.count_tokens(c, encoding) for c in contents])
+        print(f"{'count_tokens per file':>26}: {serial:6.2f} s")
+        threads = 1
+        while threads <= args.threads:
+            fresh_cache()
+            elapsed = timed(
+                lambda: tokens.count_tokens_batch(contents, encoding, threads)
+            )
+            print(
+                f"{f'batched, {threads} thread(s)':>26}: {elapsed:6.2f} s "
+                f"({serial / elapsed:.1f}x)"
+            )
+            threads *= 2
+
+        # Whole runs, both in-process
+        fresh_cache()
+        serial = timed(lambda: [validate_file(path, config) for path in paths])
+        print(f"{'validate_file per file':>26}: {serial:6.2f} s")
+        fresh_cache()
+        batched = timed(lambda: validate_directory(root, config))
+        print(
+            f"{'validate_directory':>26}: {batched:6.2f} s ({serial / batched:.1f}x, "
+            f"{tokens.COUNT_THREADS} counting thread(s))"
+        )
+
+
+if __name__ == "__main__":
+    main()
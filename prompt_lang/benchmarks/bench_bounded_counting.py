@@ -0,0 +1,63 @@
+"""Compare exact and bounded token counting of large prompt files.
+
+Writes synthetic prompts of a few megabytes and validates each one with
+exact token counting (--exact-tokens) and with counting that stops at
+tokens.fail_at (the default), starting from an empty token count cache
+each time.
+
+As in bench_batch_counting, a local byte-level BPE stands in for the
+configured encoding when that cannot be downloaded.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_bounded_counting [--sizes MB ...]
+"""
+
+import argparse
+import copy
+import tempfile
+import time
+from pathlib import Path
+
+from prompt_lang import tokens
+from prompt_lang.benchmarks.bench_batch_counting import local_encoding
+from prompt_lang.benchmarks.bench_streaming import write_prompt
+from prompt_lang.config import load_config
+from prompt_lang.validate import validate_file
+
+
+def timed_validation(path: Path, config) -> tuple[float, str]:
+    tokens.COUNT_CACHE = tokens.TokenCountCache()
+    start = time.perf_counter()
+    result = validate_file(path, config)
+    return time.perf_counter() - start, result.token_count_text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    bounded = load_config()
+    exact = copy.deepcopy(bounded)
+    exact.validation.tokens.exact = True
+    encoding = bounded.validation.tokens.tokenizer
+    if not tokens.warm_up(encoding):
+        tokens._encoders[encoding] = local_encoding()
+        print(f"{encoding} unavailable; using a local byte-level BPE")
+
+    print(f"{'size':>6} {'exact':>8} {'bounded':>8} {'speedup':>8}  tokens")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes:
+            path = Path(tmp) / f"prompt-{size_mb}mb.md"
+            write_prompt(path, size_mb * 1024 * 1024)
+            exact_seconds, exact_count = timed_validation(path, exact)
+            bounded_seconds, bounded_count = timed_validation(path, bounded)
+            print(
+                f"{size_mb:>4}MB {exact_seconds:>7.2f}s {bounded_seconds:>7.2f}s "
+                f"{exact_seconds / bounded_seconds:>7.1f}x  "
+                f"{exact_count} / {bounded_count}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare loading an encoding from a rank file and from the encoding cache.
+
+Writes a synthetic vocabulary of --ranks byte strings as a rank file in
+tiktoken's format (base64 lines, as tiktoken downloads and caches them),
+converts it with encoding_cache.write_encoding, then times loading the
+ranks from each (load_tiktoken_bpe, read_entry) and building the
+tiktoken Encoding from them, which costs the same either way.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_encoding_cache [--ranks N] [--repeat N]
+"""
+
+import argparse
+import base64
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import tiktoken
+from tiktoken.load import load_tiktoken_bpe
+
+from prompt_lang import tokens
+from prompt_lang.encoding_cache import (
+    entry_path,
+    load_encoding,
+    read_entry,
+    write_encoding,
+)
+
+ENCODING = "cl100k_base"
+
+
+def write_rank_file(path: Path, rank_count: int) -> None:
+    """Write single bytes, then random byte strings of 2 to 12 bytes."""
+    rng = random.Random(0)
+    ranks = {bytes([i]): i for i in range(256)}
+    while len(ranks) < rank_count:
+        token = bytes(rng.randrange(256) for _ in range(rng.randint(2, 12)))
+        ranks.setdefault(token, len(ranks))
+    path.write_bytes(
+        b"".join(base64.b64encode(t) + b" %d\n" % r for t, r in ranks.items())
+    )
+
+
+def from_rank_file(path: Path):
+    return tiktoken.Encoding(
+        ENCODING,
+        pat_str=tokens.BPE_PATTERNS[ENCODING],
+        mergeable_ranks=load_tiktoken_bpe(str(path)),
+        special_tokens=tokens.BPE_SPECIAL_TOKENS[ENCODING],
+    )
+
+
+def report(name: str, ranks: float, total: float, size: int) -> None:
+    print(
+        f"{name:>14}: ranks {ranks * 1000:6.1f} ms, with Encoding "
+        f"{total * 1000:6.1f} ms ({size / 1e6:.1f} MB)"
+    )
+
+
+def timed(function, repeat: int) -> float:
+    """Return the best of repeat calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ranks", type=int, default=100256)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rank_file = Path(tmp) / f"{ENCODING}.tiktoken"
+        write_rank_file(rank_file, args.ranks)
+        write_encoding(tmp, ENCODING, rank_file)
+        entry = entry_path(tmp, ENCODING)
+        vocabulary = from_rank_file(rank_file).n_vocab
+        assert load_encoding(tmp, ENCODING).n_vocab == vocabulary
+
+        print(f"{args.ranks} ranks")
+        parsed = timed(lambda: load_tiktoken_bpe(str(rank_file)), args.repeat)
+        parsed_total = timed(lambda: from_rank_file(rank_file), args.repeat)
+        report("rank file", parsed, parsed_total, rank_file.stat().st_size)
+        cached = timed(lambda: read_entry(tmp, ENCODING), args.repeat)
+        cached_total = timed(lambda: load_encoding(tmp, ENCODING), args.repeat)
+        report("encoding cache", cached, cached_total, entry.stat().st_size)
+        print(
+            f"speedup: ranks {parsed / cached:.1f}x, "
+            f"with Encoding {parsed_total / cached_total:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
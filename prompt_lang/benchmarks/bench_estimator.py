@@ -0,0 +1,166 @@
+"""Measure the token estimator's error and speed against exact counting.
+
+Counts a corpus of markdown exactly with the configured tokenizer, then
+compares three estimates with those counts: len(text) // 4 (the
+fallback without tiktoken), the estimator with its default weights, and
+the estimator calibrated on half of the corpus (errors are measured on
+the other half). Also times each way of counting, and prints estimator
+weights calibrated on the whole corpus, with their error bound, for
+validation.tokens in the config file.
+
+The corpus is the package's own markdown plus synthetic prose, tables,
+code, lists and JSON, or every .md file under --corpus. As in
+bench_batch_counting, a local byte-level BPE stands in for the
+configured encoding when that cannot be downloaded; its counts are not
+cl100k_base's, so calibrate on a machine with the real encoding.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_estimator [--corpus DIR] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from prompt_lang import tokens
+from prompt_lang.benchmarks.bench_batch_counting import local_encoding
+from prompt_lang.config import load_config
+
+PACKAGE = Path(__file__).parent.parent
+
+
+def synthetic_corpus(words: list[str], count: int) -> list[tuple[str, str]]:
+    """Return count (shape, text) documents of each synthetic shape."""
+    rng = random.Random(0)
+
+    def sentence() -> str:
+        return " ".join(rng.choices(words, k=rng.randint(6, 18))).capitalize() + "."
+
+    def prose() -> str:
+        paragraphs = [" ".join(sentence() for _ in range(4)) for _ in range(6)]
+        return "\n\n".join(paragraphs) + "\n"
+
+    def table() -> str:
+        columns = rng.randint(3, 6)
+        rows = ["| " + " | ".join(rng.choices(words, k=columns)) + " |"]
+        rows.append("|" + "---|" * columns)
+        for _ in range(30):
+            cells = [
+                str(rng.randint(0, 99999)) if rng.random() < 0.4 else rng.choice(words)
+                for _ in range(columns)
+            ]
+            rows.append("| " + " | ".join(cells) + " |")
+        return "\n".join(rows) + "\n"
+
+    def code() -> str:
+        lines = ["```python"]
+        for n in range(12):
+            name = "_".join(rng.choices(words, k=2))
+            lines.append(f"def {name}(value, limit={rng.randint(1, 4096)}):")
+            lines.append(f"    if value[{n}] > limit:")
+            lines.append(f'        return {{"{rng.choice(words)}": value * {n}}}')
+            lines.append("    return None")
+            lines.append("")
+        lines.append("```")
+        return "\n".join(lines) + "\n"
+
+    def bullets() -> str:
+        return "".join(f"{n}. EXECUTE {sentence()}\n" for n in range(1, 40))
+
+    def json_block() -> str:
+        items = [
+            f'  "{rng.choice(words)}_{n}": [{rng.randint(0, 999)}, "{sentence()}"]'
+            for n in range(25)
+        ]
+        return "{\n" + ",\n".join(items) + "\n}\n"
+
+    shapes = {
+        "prose": prose,
+        "table": table,
+        "code": code,
+        "list": bullets,
+        "json": json_block,
+    }
+    return [(shape, make()) for _ in range(count) for shape, make in shapes.items()]
+
+
+def package_corpus() -> list[tuple[str, str]]:
+    paths = sorted(PACKAGE.glob("**/*.md"))
+    return [("package", path.read_text(encoding="utf-8")) for path in paths]
+
+
+def relative_errors(estimate, texts: list[str], counts: list[int]) -> list[float]:
+    return [abs(estimate(text) - count) / count for text, count in zip(texts, counts)]
+
+
+def timed(function, texts: list[str], repeat: int) -> float:
+    """Return the characters per second function counts over texts."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            function(text)
+    elapsed = time.perf_counter() - start
+    return sum(map(len, texts)) * repeat / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", type=Path, help="calibrate on the .md files here")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tokenizer = load_config().validation.tokens.tokenizer
+    encoder = tokens.get_encoder(tokenizer)
+    if encoder is None or isinstance(encoder, tokens.TokenEstimator):
+        encoder = local_encoding()
+        print(f"{tokenizer} unavailable; using a local byte-level BPE")
+
+    if args.corpus:
+        paths = sorted(args.corpus.glob("**/*.md"))
+        corpus = [(p.parent.name, p.read_text(encoding="utf-8")) for p in paths]
+    else:
+        readme = (PACKAGE / "README.md").read_text(encoding="utf-8")
+        words = sorted({word.lower() for word in readme.split() if word.isalpha()})
+        corpus = package_corpus() + synthetic_corpus(words, 8)
+    corpus = [(shape, text) for shape, text in corpus if text.strip()]
+    texts = [text for _, text in corpus]
+    counts = [len(encoder.encode(text)) for text in texts]
+    print(f"corpus: {len(texts)} texts, {sum(counts)} tokens")
+
+    # Calibrate on even texts, measure on odd ones
+    weights, _ = tokens.calibrate_estimator(texts[::2], counts[::2])
+    estimates = {
+        "len // 4": lambda text: len(text) // 4,
+        "defaults": tokens.TokenEstimator().count,
+        "calibrated": tokens.TokenEstimator(weights).count,
+    }
+    print(f"{'shape':>10} " + " ".join(f"{name:>21}" for name in estimates))
+    print(f"{'':>10} " + " ".join(f"{'mean':>10} {'max':>10}" for _ in estimates))
+    held_out = list(zip(corpus, counts))[1::2]
+    for shape in dict.fromkeys(shape for shape, _ in corpus):
+        shape_texts = [text for (s, text), _ in held_out if s == shape]
+        shape_counts = [count for (s, _), count in held_out if s == shape]
+        if not shape_texts:
+            continue
+        row = []
+        for estimate in estimates.values():
+            errors = relative_errors(estimate, shape_texts, shape_counts)
+            row.append(f"{sum(errors) / len(errors):>10.1%} {max(errors):>10.1%}")
+        print(f"{shape:>10} " + " ".join(row))
+
+    exact_speed = timed(encoder.encode, texts, args.repeat)
+    print(f"\n{'exact':>10}: {exact_speed / 1e6:7.2f} M chars/s")
+    for name, estimate in estimates.items():
+        speed = timed(estimate, texts, args.repeat)
+        print(f"{name:>10}: {speed / 1e6:7.2f} M chars/s ({speed / exact_speed:.1f}x)")
+
+    weights, error = tokens.calibrate_estimator(texts, counts)
+    print(f"\n# Calibrated on {len(texts)} texts; max relative error {error:.1%}")
+    print("validation:\n  tokens:\n    backend: estimator\n    estimator:")
+    for feature, weight in weights.items():
+        print(f"      {feature}: {weight}")
+
+
+if __name__ == "__main__":
+    main()
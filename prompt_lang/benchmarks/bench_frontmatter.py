@@ -0,0 +1,77 @@
+"""Compare frontmatter loading with yaml.safe_load.
+
+Loads the frontmatter of every fixture and of a few typical shapes
+(flat, with a tool list, nested) repeatedly, with yaml.safe_load and
+with load_frontmatter, and reports the time per load and the path
+load_frontmatter took.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_frontmatter [--repeat N]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import yaml
+
+from prompt_lang import frontmatter
+from prompt_lang.frontmatter import FrontmatterStats, load_frontmatter
+from prompt_lang.parser import FRONTMATTER_PATTERN
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+
+SHAPES = {
+    "flat": "name: deploy\ndescription: Deploy the service to production\nmodel: opus",
+    "tool list": "name: deploy\ndescription: Deploy the service\ntools: [Read, Bash]",
+    "nested": (
+        "name: deploy\nmetadata:\n  owner: platform\n  tags:\n    - ops\n    - ci"
+    ),
+}
+
+
+def fixture_frontmatters() -> dict[str, str]:
+    texts = {}
+    for path in sorted(FIXTURES.glob("*/*.md")):
+        match = FRONTMATTER_PATTERN.match(path.read_text(encoding="utf-8"))
+        if match:
+            texts[path.name] = match.group(1)
+    return texts
+
+
+def time_loads(load, text: str, repeat: int) -> float:
+    """Return the seconds per load of text."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        load(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def path_taken(text: str) -> str:
+    frontmatter.STATS = FrontmatterStats()
+    load_frontmatter(text)
+    counts = frontmatter.STATS
+    if counts.fast_path:
+        return "fast path"
+    return "libyaml" if counts.libyaml else "pure Python"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = {**fixture_frontmatters(), **SHAPES}
+    print(f"libyaml available: {yaml.__with_libyaml__}")
+    print(f"{'frontmatter':>23} {'safe_load':>10} {'new':>9} {'speedup':>8}  path")
+    for name, text in texts.items():
+        before = time_loads(yaml.safe_load, text, args.repeat)
+        after = time_loads(load_frontmatter, text, args.repeat)
+        print(
+            f"{name:>23} {before * 1e6:>8.1f}us {after * 1e6:>7.1f}us "
+            f"{before / after:>7.1f}x  {path_taken(text)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
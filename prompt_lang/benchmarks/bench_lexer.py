@@ -0,0 +1,89 @@
+"""Benchmark the single-pass tag lexer against the previous multi-scan approach.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_lexer [--lines N] [--repeat N]
+"""
+
+import argparse
+import re
+import time
+
+from prompt_lang.lexer import lex_tags, pair_events
+
+# Patterns used by the previous implementation
+OPEN_TAG_PATTERN = re.compile(r"<([a-z][a-z0-9-]*)>", re.IGNORECASE)
+CLOSE_TAG_PATTERN = re.compile(r"</([a-z][a-z0-9-]*)>", re.IGNORECASE)
+TAG_PAIR_PATTERN = re.compile(
+    r"<([a-z][a-z0-9-]*)>(.*?)</\1>", re.DOTALL | re.IGNORECASE
+)
+
+BLOCK_TAGS = ["purpose", "context", "instructions", "examples", "output"]
+
+
+def make_body(line_count: int) -> str:
+    """Build a prompt body of roughly line_count lines."""
+    lines: list[str] = []
+    i = 0
+    while len(lines) < line_count:
+        tag = BLOCK_TAGS[i % len(BLOCK_TAGS)]
+        lines.append(f"<{tag}>")
+        lines.extend(f"{n}. EXECUTE step {n} of block {i}" for n in range(1, 20))
+        lines.append(f"</{tag}>")
+        lines.append("")
+        i += 1
+    return "\n".join(lines)
+
+
+def legacy_scan(body: str) -> int:
+    """Scan the body the way the previous parser did (five passes)."""
+    lines = body.split("\n")
+    found = 0
+    for line in lines:
+        found += len(OPEN_TAG_PATTERN.findall(line))
+    for line in lines:
+        found += len(CLOSE_TAG_PATTERN.findall(line))
+    for match in TAG_PAIR_PATTERN.finditer(body):
+        found += body[: match.start()].count("\n") + body[: match.end()].count("\n")
+    for line in lines:
+        events = [(m.start(), "open") for m in OPEN_TAG_PATTERN.finditer(line)]
+        events += [(m.start(), "close") for m in CLOSE_TAG_PATTERN.finditer(line)]
+        events.sort(key=lambda x: x[0])
+        found += len(events)
+    return found
+
+
+def single_pass(body: str) -> int:
+    """Lex once and derive pairs from the event stream."""
+    events = lex_tags(body)
+    return len(events) + len(pair_events(events))
+
+
+def best_of(func, body: str, repeat: int) -> float:
+    """Return the best wall time of repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'legacy (ms)':>12} {'single (ms)':>12} {'speedup':>8}")
+    for line_count in args.lines:
+        body = make_body(line_count)
+        legacy = best_of(legacy_scan, body, args.repeat)
+        single = best_of(single_pass, body, args.repeat)
+        print(
+            f"{line_count:>8} {legacy * 1000:>12.2f} {single * 1000:>12.2f} "
+            f"{legacy / single:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark LSP diagnostics latency while typing in a large document.
+
+Opens a synthetic prompt of about 5,000 lines, then types characters one
+at a time into one instructions block. Each keystroke is a didChange
+notification; its latency is the time until the diagnostics are
+published. Full revalidation (validate_content) of the same text is timed
+for comparison.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_lsp [--lines N] [--edits N] [--check]
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from prompt_lang.config import load_config
+from prompt_lang.lsp import LanguageServer
+from prompt_lang.validate import validate_content
+
+# 95th percentile didChange -> publishDiagnostics latency on a 5k-line document
+LATENCY_BUDGET_MS = 50.0
+
+URI = "file:///bench/large.md"
+
+
+def make_document(line_count: int) -> str:
+    """Build a prompt of roughly line_count lines with many blocks."""
+    lines = [
+        "---",
+        "name: large",
+        "description: Synthetic document for latency benchmarks",
+        "---",
+        "",
+        "# Large",
+        "",
+        "<purpose>",
+        "Measure diagnostics latency.",
+        "</purpose>",
+        "",
+    ]
+    block = 0
+    while len(lines) < line_count:
+        lines.append("<instructions>")
+        for step in range(1, 16):
+            wording = "maybe run" if step == 7 else "run"
+            lines.append(f"{step}. EXECUTE {wording} step {step} of block {block}")
+        lines.append("</instructions>")
+        lines.append("")
+        lines.append("<context>")
+        lines.extend(f"Background line {n} for block {block}." for n in range(10))
+        lines.append("</context>")
+        lines.append("")
+        block += 1
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if the p95 latency exceeds the budget",
+    )
+    args = parser.parse_args()
+
+    config = load_config()
+    text = make_document(args.lines)
+    server = LanguageServer(config, io.BytesIO())
+
+    start = time.perf_counter()
+    server.handle(
+        {
+            "method": "textDocument/didOpen",
+            "params": {"textDocument": {"uri": URI, "version": 1, "text": text}},
+        }
+    )
+    open_ms = (time.perf_counter() - start) * 1000
+
+    # Type at the end of a step line in the middle of the document
+    document = server.documents[URI]
+    target_line = text[: len(text) // 2].count("\n")
+    while "EXECUTE" not in text.split("\n")[target_line]:
+        target_line += 1
+    column = len(text.split("\n")[target_line])
+
+    latencies: list[float] = []
+    for n in range(args.edits):
+        position = {"line": target_line, "character": column + n}
+        message = {
+            "method": "textDocument/didChange",
+            "params": {
+                "textDocument": {"uri": URI, "version": n + 2},
+                "contentChanges": [
+                    {"range": {"start": position, "end": position}, "text": "x"}
+                ],
+            },
+        }
+        server.output = io.BytesIO()
+        start = time.perf_counter()
+        server.handle(message)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    full: list[float] = []
+    for _ in range(min(args.edits, 20)):
+        start = time.perf_counter()
+        validate_content(document.text, Path("/bench/large.md"), config)
+        full.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    lines = document.text.count("\n")
+    print(f"document: {lines} lines, {len(document.text)} chars")
+    print(f"didOpen: {open_ms:.1f} ms")
+    print(
+        f"didChange: p50 {statistics.median(latencies):.2f} ms, "
+        f"p95 {p95:.2f} ms, max {latencies[-1]:.2f} ms "
+        f"(budget p95 {LATENCY_BUDGET_MS:.0f} ms)"
+    )
+    print(f"full revalidation: p50 {statistics.median(full):.2f} ms")
+    print(f"block checks on last edit: {document.blocks_checked}")
+
+    if args.check and p95 > LATENCY_BUDGET_MS:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Measure the memory held by the results of a directory run.
+
+Writes a synthetic corpus of prompt files (copies of the valid and
+invalid fixtures, so most files report errors or warnings), validates
+it with validate_directory and reports, with tracemalloc, the bytes the
+returned results hold per file. The same is measured for results
+rebuilt from plain data (cache hits) and unpickled (parallel runs).
+Also prints the size of one instance of each record type.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_memory [--files N]
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from prompt_lang.config import load_config
+from prompt_lang.directives import Directive
+from prompt_lang.errors import ValidationError, ValidationResult
+from prompt_lang.parser import Tag
+from prompt_lang.semantic import AmbiguousMatch
+from prompt_lang.validate import validate_directory
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+
+
+def write_corpus(root: Path, file_count: int) -> None:
+    """Write file_count prompts cycling through the fixtures."""
+    sources = sorted(FIXTURES.glob("*/*.md"))
+    texts = [path.read_text(encoding="utf-8") for path in sources]
+    for i in range(file_count):
+        directory = root / f"group-{i // 500:03d}"
+        directory.mkdir(exist_ok=True)
+        source = sources[i % len(sources)]
+        (directory / f"{i:05d}-{source.name}").write_text(
+            texts[i % len(texts)], encoding="utf-8"
+        )
+
+
+def held_bytes(build) -> tuple[int, object]:
+    """Return the bytes still allocated by build() and what it returned."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, value
+
+
+def instance_size(obj) -> int:
+    """Size of an instance, including its attribute dictionary if any."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=10000)
+    args = parser.parse_args()
+
+    config = load_config()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_corpus(root, args.files)
+        # Load the tokenizer and semantic matcher and fill the config caches
+        validate_directory(root, config)
+
+        size, results = held_bytes(lambda: validate_directory(root, config))
+
+    issues = sum(len(r.errors) + len(r.warnings) for r in results)
+    print(f"corpus: {len(results)} files, {issues} errors and warnings")
+    print(f"{'validated':>10}: {size / len(results):8.0f} bytes/result")
+
+    entries = [(r.file_path, json.dumps(r.to_dict())) for r in results]
+    size, rebuilt = held_bytes(
+        lambda: [
+            ValidationResult.from_dict(path, json.loads(entry))
+            for path, entry in entries
+        ]
+    )
+    print(f"{'cached':>10}: {size / len(rebuilt):8.0f} bytes/result")
+
+    payload = pickle.dumps(results)
+    size, unpickled = held_bytes(lambda: pickle.loads(payload))
+    print(f"{'unpickled':>10}: {size / len(unpickled):8.0f} bytes/result")
+
+    print()
+    records = [
+        Tag("instructions", "1. EXECUTE run", 1, 3),
+        ValidationError(1, "Missing <purpose> tag", "error"),
+        Directive("DELEGATE", "DELEGATE to agent", 1),
+        AmbiguousMatch("maybe", 1, "1. EXECUTE maybe run"),
+    ]
+    for record in records:
+        print(f"{type(record).__name__:>16}: {instance_size(record):4d} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare allocations of reading a prompt file with memory-mapping it.
+
+For each file, measures with tracemalloc (which sees Python allocations,
+not mapped pages):
+
+- retained: memory still held by the ParsedPrompt after parse_file
+- peak: the highest allocation while validating the file end to end
+
+Files are a fixture and synthetic prompts of the requested sizes.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_mmap [--sizes-kb N ...]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from prompt_lang.benchmarks.bench_streaming import write_prompt
+from prompt_lang.config import load_config
+from prompt_lang.parser import parse_file
+from prompt_lang.validate import validate_file
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "fixtures" / "valid" / "full.md"
+
+
+def measure(path: Path, config, memory_map: bool) -> tuple[int, int, float]:
+    """Return (retained bytes, peak bytes, seconds) for one file."""
+    tracemalloc.start()
+    parsed, _ = parse_file(path, config, memory_map=memory_map)
+    retained = tracemalloc.get_traced_memory()[0]
+    del parsed
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    validate_file(path, config, memory_map=memory_map)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return retained, peak, elapsed
+
+
+def format_bytes(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[64, 1024, 16384])
+    args = parser.parse_args()
+
+    config = load_config()
+    # Load the tokenizer, config and semantic matcher outside the measurement
+    validate_file(FIXTURE, config)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [FIXTURE]
+        for size_kb in args.sizes_kb:
+            path = Path(tmp) / f"prompt-{size_kb}k.md"
+            write_prompt(path, size_kb * 1024)
+            files.append(path)
+
+        print(
+            f"{'file':>18} {'size':>9} {'mode':>5} {'retained':>10} "
+            f"{'peak':>10} {'time':>9}"
+        )
+        for path in files:
+            size = format_bytes(path.stat().st_size)
+            for memory_map in (False, True):
+                retained, peak, elapsed = measure(path, config, memory_map)
+                print(
+                    f"{path.name:>18} {size:>9} {'mmap' if memory_map else 'read':>5} "
+                    f"{format_bytes(retained):>10} {format_bytes(peak):>10} "
+                    f"{elapsed * 1000:>7.1f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark ambiguous-language detection with many configured patterns.
+
+Compares the previous per-line, per-pattern regex search with the compiled
+single-scan matcher.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_semantic [--patterns N] [--lines N]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from prompt_lang.parser import Tag
+from prompt_lang.semantic import _find_ambiguous_patterns, compile_ambiguous_patterns
+
+WORDS = [
+    "route", "load", "verify", "execute", "report", "parse", "check", "agent",
+    "file", "output", "context", "request", "handle", "review", "update", "task",
+]  # fmt: skip
+
+
+def make_patterns(count: int) -> list[str]:
+    """Build count distinct hedging-style phrases."""
+    rng = random.Random(0)
+    patterns = ["maybe", "might", "consider", "try to", "perhaps"]
+    while len(patterns) < count:
+        phrase = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        phrase = f"{rng.choice(['kinda', 'sorta', 'loosely', 'roughly'])} {phrase}"
+        if phrase not in patterns:
+            patterns.append(phrase)
+    return patterns
+
+
+def make_instructions(line_count: int) -> Tag:
+    """Build an <instructions> tag with an occasional hedge."""
+    rng = random.Random(1)
+    lines = []
+    for n in range(1, line_count + 1):
+        words = " ".join(rng.choice(WORDS) for _ in range(10))
+        hedge = " maybe" if n % 50 == 0 else ""
+        lines.append(f"{n}. EXECUTE {words}{hedge}")
+    return Tag("instructions", "\n".join(lines), 1, line_count + 2)
+
+
+def legacy_find(tag: Tag, patterns: list[str]) -> int:
+    """Search every line for every pattern, compiling each time."""
+    found = 0
+    for line in tag.content.split("\n"):
+        line_lower = line.lower()
+        for pattern in patterns:
+            regex = re.compile(rf"\b{re.escape(pattern)}\b", re.IGNORECASE)
+            if regex.search(line_lower):
+                found += 1
+    return found
+
+
+def best_of(func, repeat: int) -> float:
+    """Return the best wall time of repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patterns", type=int, nargs="+", default=[9, 100, 300])
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tag = make_instructions(args.lines)
+    print(f"{args.lines} instruction lines")
+    print(f"{'patterns':>9} {'legacy (ms)':>12} {'compiled (ms)':>14} {'speedup':>8}")
+    for count in args.patterns:
+        patterns = make_patterns(count)
+        compile_ambiguous_patterns(tuple(patterns))  # Compiled once per config
+        assert legacy_find(tag, patterns) == len(_find_ambiguous_patterns(tag, patterns))
+
+        legacy = best_of(lambda: legacy_find(tag, patterns), args.repeat)
+        compiled = best_of(lambda: _find_ambiguous_patterns(tag, patterns), args.repeat)
+        print(
+            f"{count:>9} {legacy * 1000:>12.2f} {compiled * 1000:>14.2f} "
+            f"{legacy / compiled:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
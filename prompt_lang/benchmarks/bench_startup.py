@@ -0,0 +1,133 @@
+"""Measure CLI startup cost against the documented budgets.
+
+Runs the CLI in fresh interpreters with ``-X importtime`` and reports the
+wall time and the import time of the validator itself (prompt_lang and
+yaml). Everything else loaded on top of a bare interpreter is reported
+separately; for a single file that is mostly the tokenizer, whose load
+time depends on the environment (installed backend, cached BPE files).
+Heavy dependencies (yaml, tiktoken, multiprocessing, the semantic checker)
+are listed when a command imports them.
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_startup [--repeat N] [--check]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "fixtures" / "valid" / "minimal.md"
+
+# Budgets (ms) for the validator's own imports
+HELP_BUDGET_MS = 75.0
+SINGLE_FILE_BUDGET_MS = 110.0
+
+VALIDATOR_PACKAGES = ("prompt_lang", "yaml")
+HEAVY_MODULES = ("yaml", "tiktoken", "multiprocessing", "prompt_lang.semantic")
+
+
+def import_profile(args: list[str]) -> tuple[float, list[tuple[int, str, int]]]:
+    """Run an interpreter with -X importtime.
+
+    Returns:
+        Wall time in seconds and (depth, module, cumulative us) for every
+        import, in the order reported.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    imports: list[tuple[int, str, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(cumulative)))
+    return elapsed, imports
+
+
+def measure(
+    args: list[str], baseline: set[str], repeat: int
+) -> tuple[float, float, float, list[str]]:
+    """Time a command.
+
+    Returns:
+        Median wall ms, median validator import ms, median other import ms
+        and the heavy modules it loaded.
+    """
+    walls: list[float] = []
+    validator: list[float] = []
+    other: list[float] = []
+    heavy: set[str] = set()
+    for _ in range(repeat):
+        elapsed, imports = import_profile(args)
+        walls.append(elapsed * 1000)
+        own = rest = 0
+        for depth, name, cumulative in imports:
+            if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES:
+                heavy.add(name if name in HEAVY_MODULES else name.split(".")[0])
+            if depth or name in baseline:
+                continue
+            if name.split(".")[0] in VALIDATOR_PACKAGES:
+                own += cumulative
+            else:
+                rest += cumulative
+        validator.append(own / 1000)
+        other.append(rest / 1000)
+    return (
+        statistics.median(walls),
+        statistics.median(validator),
+        statistics.median(other),
+        sorted(heavy),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--check", action="store_true", help="Exit with status 1 if a budget is exceeded"
+    )
+    args = parser.parse_args()
+
+    _, bare = import_profile(["-c", "pass"])
+    baseline = {name for _, name, _ in bare}
+
+    cases = [
+        ("--help", ["-m", "prompt_lang", "--help"], HELP_BUDGET_MS),
+        (
+            "single file",
+            ["-m", "prompt_lang", str(FIXTURE), "--no-cache"],
+            SINGLE_FILE_BUDGET_MS,
+        ),
+    ]
+
+    over_budget = False
+    print(
+        f"{'command':<12} {'wall (ms)':>10} {'validator (ms)':>15} {'budget':>11} "
+        f"{'other (ms)':>11}  heavy"
+    )
+    for label, command, budget in cases:
+        wall, own, other, heavy = measure(command, baseline, args.repeat)
+        status = "ok" if own <= budget else "OVER"
+        over_budget |= own > budget
+        print(
+            f"{label:<12} {wall:>10.1f} {own:>15.1f} {budget:>6.0f} {status:<4} "
+            f"{other:>11.1f}  {', '.join(heavy) or '-'}"
+        )
+
+    if args.check and over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Measure peak memory when validating a very large prompt file.
+
+Writes a synthetic prompt of the requested size (many instructions and
+context blocks under one frontmatter), then validates it in a fresh
+interpreter and reports the wall time and peak resident memory.
+validate_file streams files of at least STREAMING_MIN_BYTES the same
+way; --compare also validates the file the way smaller files are (read
+whole, then parsed).
+
+Usage:
+    python -m prompt_lang.benchmarks.bench_streaming [--size-mb N] [--compare] [--check]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Peak RSS (MB) above a bare interpreter with the validator imported, for
+# a streamed file of any size
+STREAMING_BUDGET_MB = 64.0
+
+
+def write_prompt(path: Path, size_bytes: int) -> int:
+    """Write a synthetic prompt of at least size_bytes, a block at a time.
+
+    Returns:
+        The number of lines written.
+    """
+    lines_written = 0
+    written = 0
+    with open(path, "w", encoding="utf-8") as out:
+        header = (
+            "---\nname: large\ndescription: Synthetic prompt for memory benchmarks\n"
+            "---\n\n# Large\n\n<purpose>\nMeasure peak memory.\n</purpose>\n\n"
+        )
+        out.write(header)
+        written += len(header)
+        lines_written += header.count("\n")
+        block = 0
+        while written < size_bytes:
+            lines = ["<instructions>"]
+            lines.extend(
+                f"{step}. EXECUTE run step {step} of block {block}"
+                for step in range(1, 16)
+            )
+            lines.append("</instructions>")
+            lines.append("")
+            lines.append("<context>")
+            lines.extend(f"Background line {n} for block {block}." for n in range(10))
+            lines.append("</context>")
+            lines.append("")
+            text = "\n".join(lines) + "\n"
+            out.write(text)
+            written += len(text)
+            lines_written += len(lines)
+            block += 1
+    return lines_written
+
+
+def child(mode: str, path: Path) -> None:
+    """Validate path in this process and print timing and memory as JSON."""
+    import resource
+
+    from prompt_lang.config import load_config
+    from prompt_lang.validate import validate_content, validate_stream
+
+    config = load_config()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "stream":
+        with open(path, encoding="utf-8") as stream:
+            result = validate_stream(stream, path, config)
+    else:
+        result = validate_content(path.read_text(encoding="utf-8"), path, config)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "baseline_mb": baseline_kb / 1024,
+                "peak_mb": peak_kb / 1024,
+                "errors": len(result.errors),
+                "tokens": result.token_count,
+            }
+        )
+    )
+
+
+def run(mode: str, path: Path) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", __spec__.name, "--child", mode, str(path)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Also validate the file read whole (needs several times its size)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if streaming exceeds the memory budget",
+    )
+    parser.add_argument(
+        "--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], Path(args.child[1]))
+        return
+
+    size_bytes = args.size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "large.md"
+        start = time.perf_counter()
+        lines = write_prompt(path, size_bytes)
+        print(
+            f"file: {path.stat().st_size / (1024 * 1024):.0f} MB, {lines} lines "
+            f"(written in {time.perf_counter() - start:.1f} s)"
+        )
+
+        modes = ["stream", "whole"] if args.compare else ["stream"]
+        over_budget = False
+        for mode in modes:
+            stats = run(mode, path)
+            used = stats["peak_mb"] - stats["baseline_mb"]
+            print(
+                f"{mode:>6}: {stats['seconds']:.1f} s, "
+                f"peak RSS {stats['peak_mb']:.0f} MB "
+                f"(+{used:.0f} MB over {stats['baseline_mb']:.0f} MB after imports), "
+                f"{stats['errors']} error(s), {stats['tokens']} tokens"
+            )
+            if mode == "stream":
+                over_budget = used > STREAMING_BUDGET_MB
+        print(f"budget: +{STREAMING_BUDGET_MB:.0f} MB for streaming")
+
+    if args.check and over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
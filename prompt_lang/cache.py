@@ -0,0 +1,185 @@
+"""Persistent cache of validation results.
+
+Results are stored on disk keyed by a hash of the file content, the file
+rules that apply to the file, the configuration, the tokenizer and the
+package version (plus the modification times of its modules, so local
+edits to the validator invalidate old entries). Unchanged files are
+answered without being parsed.
+
+Each entry is a small JSON file written atomically (temp file + rename),
+which makes the cache safe to share between parallel workers and
+concurrent runs. The cache is bounded by total size; pruning removes the
+least recently used entries first.
+
+The directory also holds the token count cache (tokens.COUNT_CACHE), which
+outlives result entries: it is keyed by content alone, so counts survive
+configuration and validator changes.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+
+from . import __version__, tokens
+from .config import Config, FileRule
+from .errors import ValidationResult
+
+DEFAULT_CACHE_DIR = ".prompt_lang_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+_code_fingerprint: str | None = None
+
+
+def code_fingerprint() -> str:
+    """Return a hash of the package version and its module files."""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        digest = hashlib.sha256(__version__.encode("utf-8"))
+        for module_path in sorted(Path(__file__).parent.glob("*.py")):
+            stat = module_path.stat()
+            digest.update(f"{module_path.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        _code_fingerprint = digest.hexdigest()
+    return _code_fingerprint
+
+
+def config_fingerprint(config: Config) -> str:
+    """Return a stable hash of a configuration."""
+    data = json.dumps(asdict(config), sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """On-disk store of serialized ValidationResults."""
+
+    def __init__(
+        self,
+        cache_dir: Path | str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # (config, its fingerprint) of the last configuration keyed
+        self._config_fingerprint: tuple[Config, str] | None = None
+
+    @property
+    def token_counts_path(self) -> Path:
+        """File the token count cache is persisted to."""
+        return self.cache_dir / tokens.COUNT_CACHE_FILE
+
+    def make_key(
+        self, content: bytes, file_rules: list[FileRule], config: Config
+    ) -> str:
+        """Build the cache key for a file.
+
+        The configuration's fingerprint is computed on its first key and
+        reused while the same Config object is passed, so it must not be
+        modified once keys are made with it. Load the tokenizer first (see
+        tokens.warm_up): the key records whether it loaded.
+
+        Args:
+            content: Raw file content.
+            file_rules: Every file rule that matches the file.
+            config: Configuration object.
+
+        Returns:
+            Hex digest identifying the validation inputs.
+        """
+        digest = hashlib.sha256()
+        digest.update(code_fingerprint().encode("utf-8"))
+        memo = self._config_fingerprint
+        if memo is None or memo[0] is not config:
+            memo = self._config_fingerprint = (config, config_fingerprint(config))
+        digest.update(memo[1].encode("utf-8"))
+        digest.update(tokens.tokenizer_id(config.validation.tokens.tokenizer).encode())
+        rules = json.dumps([asdict(rule) for rule in file_rules], sort_keys=True)
+        digest.update(rules.encode("utf-8"))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str, file_path: str) -> ValidationResult | None:
+        """Return the cached result for key, or None on a miss.
+
+        Args:
+            key: Cache key from make_key.
+            file_path: Path to report in the returned result.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            result = ValidationResult.from_dict(file_path, data)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        # Mark as recently used for pruning
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        result.cached = True
+        return result
+
+    def put(self, key: str, result: ValidationResult) -> None:
+        """Store a result under key. Failures to write are ignored."""
+        import tempfile
+
+        entry_path = self._entry_path(key)
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(result.to_dict(), f)
+                os.replace(tmp_path, entry_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
+    def prune(self) -> int:
+        """Remove least recently used entries until the cache fits max_bytes.
+
+        Returns:
+            Number of entries removed.
+        """
+        entries: list[tuple[float, int, str]] = []  # (mtime, size, path)
+        try:
+            subdirs = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            try:
+                for entry in os.scandir(subdir.path):
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                # Already pruned by a concurrent run
+                pass
+            except OSError:
+                continue
+            total -= size
+
+        return removed
@@ -1,10 +1,142 @@
 """Configuration loader for prompt validation."""
 
+import copy
+import fnmatch
+import os
+import re
+import threading
 from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
 
-import yaml
+DEFAULT_CONFIG_PATH = Path(__file__).parent / "prompt-lang.config.yaml"
+
+# Values of validation.tokens.backend
+TOKENIZER_BACKENDS = ("tiktoken", "bpe", "estimator")
+
+# Bumped on every change to a setting Config.compiled depends on, so a
+# compiled form is known to be current without fingerprinting the config
+_generation = 0
+
+
+def _changed() -> None:
+    global _generation
+    _generation += 1
+
+
+class _TrackedList(list):
+    """A list whose changes bump the config generation."""
+
+    def __setitem__(self, index, value):
+        _changed()
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        _changed()
+        super().__delitem__(index)
+
+    def __iadd__(self, values):
+        _changed()
+        return super().__iadd__(values)
+
+    def __imul__(self, count):
+        _changed()
+        return super().__imul__(count)
+
+    def append(self, value):
+        _changed()
+        super().append(value)
+
+    def extend(self, values):
+        _changed()
+        super().extend(values)
+
+    def insert(self, index, value):
+        _changed()
+        super().insert(index, value)
+
+    def remove(self, value):
+        _changed()
+        super().remove(value)
+
+    def pop(self, index=-1):
+        _changed()
+        return super().pop(index)
+
+    def clear(self):
+        _changed()
+        super().clear()
+
+    def sort(self, *, key=None, reverse=False):
+        _changed()
+        super().sort(key=key, reverse=reverse)
+
+    def reverse(self):
+        _changed()
+        super().reverse()
+
+
+class _TrackedDict(dict):
+    """A dict whose changes bump the config generation."""
+
+    def __setitem__(self, key, value):
+        _changed()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        _changed()
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        _changed()
+        return super().__ior__(other)
+
+    def pop(self, *args):
+        _changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        _changed()
+        return super().popitem()
+
+    def clear(self):
+        _changed()
+        super().clear()
+
+    def update(self, *args, **kwargs):
+        _changed()
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        _changed()
+        return super().setdefault(key, default)
+
+
+class _Tracked:
+    """Base of the settings Config.compiled is built from.
+
+    Setting an attribute bumps the config generation, and list and dict
+    values are stored as tracked copies, so changes made in place count
+    too.
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if type(value) is list:
+            value = _TrackedList(value)
+        elif type(value) is dict:
+            value = _TrackedDict(value)
+        _changed()
+        object.__setattr__(self, name, value)
+
+
+@dataclass
+class TagTokenLimits:
+    """Token limits for each block of one tag (None for no limit)."""
+
+    warn_at: int | None = None
+    fail_at: int | None = None
 
 
 @dataclass
@@ -13,6 +145,92 @@ class TokenConfig:
 
     warn_at: int = 2000
     fail_at: int = 4000
+    # One of TOKENIZER_BACKENDS
+    backend: str = "tiktoken"
+    # tiktoken encoding; for the bpe backend, the encoding whose split
+    # pattern and special tokens bpe_file uses
+    encoding: str = "cl100k_base"
+    # Ranks file in tiktoken's format, for the bpe backend
+    bpe_file: str | None = None
+    # Directory of encodings written by 'prompt_lang tokenizer-cache',
+    # loaded instead of tiktoken's download
+    encoding_cache: str | None = None
+    # Feature -> weight overriding the estimator's defaults
+    estimator: dict[str, float] = field(default_factory=dict)
+    # Tag name -> limits for each of its blocks
+    tags: dict[str, TagTokenLimits] = field(default_factory=dict)
+    # Count every token, instead of stopping once the count reaches fail_at
+    exact: bool = False
+
+    @property
+    def count_bound(self) -> int | None:
+        """Return the count at which counting stops, or None if exact."""
+        return None if self.exact else self.fail_at
+
+    @property
+    def tokenizer(self) -> str:
+        """Return the tokenizer name to count with (see tokens)."""
+        if self.backend == "bpe":
+            return f"bpe:{self.encoding}:{self.bpe_file or ''}"
+        if self.backend == "estimator":
+            weights = ",".join(f"{k}={v}" for k, v in sorted(self.estimator.items()))
+            return f"estimator:{weights}" if weights else "estimator"
+        if self.encoding_cache:
+            return f"{self.encoding}:{self.encoding_cache}"
+        return self.encoding
+
+    def check(self) -> None:
+        """Check that the settings are usable.
+
+        Raises:
+            ValueError: If a limit is not a number, backend is not one of
+                TOKENIZER_BACKENDS, the bpe backend has no bpe_file, or
+                estimator names an unknown feature or a non-numeric weight.
+        """
+        from .tokens import ESTIMATOR_FEATURES
+
+        _check_limits({"tokens.warn_at": self.warn_at, "tokens.fail_at": self.fail_at})
+        _check_tag_limits("tokens.tags", self.tags)
+        if self.backend not in TOKENIZER_BACKENDS:
+            known = ", ".join(TOKENIZER_BACKENDS)
+            raise ValueError(
+                f"Unknown tokens.backend {self.backend!r} (known: {known})"
+            )
+        if self.backend == "bpe" and not self.bpe_file:
+            raise ValueError("tokens.backend bpe needs tokens.bpe_file")
+        for feature, weight in self.estimator.items():
+            if feature not in ESTIMATOR_FEATURES:
+                known = ", ".join(ESTIMATOR_FEATURES)
+                raise ValueError(
+                    f"Unknown tokens.estimator feature {feature!r} (known: {known})"
+                )
+            if not _is_number(weight):
+                raise ValueError(
+                    f"tokens.estimator.{feature} must be a number, got {weight!r}"
+                )
+
+
+def _is_number(value: Any) -> bool:
+    """Check whether a YAML value is an int or float (not a bool)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_limits(limits: dict[str, Any]) -> None:
+    """Raise ValueError for the first limit (setting -> value) not a number."""
+    for name, limit in limits.items():
+        if limit is not None and not _is_number(limit):
+            raise ValueError(f"{name} must be a number, got {limit!r}")
+
+
+def _check_tag_limits(setting: str, tag_limits: dict[str, TagTokenLimits]) -> None:
+    """Raise ValueError for a per-tag limit that is not a number."""
+    for tag, limits in tag_limits.items():
+        _check_limits(
+            {
+                f"{setting}.{tag}.warn_at": limits.warn_at,
+                f"{setting}.{tag}.fail_at": limits.fail_at,
+            }
+        )
 
 
 @dataclass
@@ -26,7 +244,7 @@ class FrontmatterConfig:
 
 
 @dataclass
-class DirectiveConfig:
+class DirectiveConfig(_Tracked):
     """Directive syntax configuration for routing rules."""
 
     keywords: list[str] = field(
@@ -43,7 +261,7 @@ class DirectiveConfig:
 
 
 @dataclass
-class InstructionConfig:
+class InstructionConfig(_Tracked):
     """Instruction action keyword enforcement configuration."""
 
     enforce_actions: bool = True
@@ -63,7 +281,7 @@ class InstructionConfig:
 
 
 @dataclass
-class FileRule:
+class FileRule(_Tracked):
     """File-specific tag requirements based on path patterns."""
 
     pattern: str
@@ -71,10 +289,12 @@ class FileRule:
     forbidden_tags: list[str] = field(default_factory=list)
     skip_frontmatter: bool = False
     skip_required_tags: bool = False
+    # Tag name -> limits replacing validation.tokens.tags for that tag
+    tag_tokens: dict[str, TagTokenLimits] = field(default_factory=dict)
 
 
 @dataclass
-class ValidationConfig:
+class ValidationConfig(_Tracked):
     """Complete validation configuration."""
 
     tokens: TokenConfig = field(default_factory=TokenConfig)
@@ -120,16 +340,162 @@ class ValidationConfig:
 
 
 @dataclass
-class Config:
+class Config(_Tracked):
     """Root configuration object."""
 
     validation: ValidationConfig = field(default_factory=ValidationConfig)
     file_rules: list[FileRule] = field(default_factory=list)
 
+    @property
+    def compiled(self) -> "CompiledConfig":
+        """Return the precompiled form of this configuration.
+
+        Compiled forms are cached by configuration contents, so copies of
+        the same configuration share one, and modifying this object yields
+        a fresh one on the next access. The contents are only fingerprinted
+        again after some configuration changed (see _generation), so
+        repeated accesses cost a comparison.
+        """
+        generation, compiled = self.__dict__.get("_compiled", (None, None))
+        if generation != _generation:
+            generation = _generation  # Before reading what may change
+            compiled = _compile(_fingerprint(self), self)
+            self.__dict__["_compiled"] = (generation, compiled)
+        return compiled
+
+    def __deepcopy__(self, memo: dict) -> "Config":
+        return Config(
+            validation=copy.deepcopy(self.validation, memo),
+            file_rules=copy.deepcopy(self.file_rules, memo),
+        )
+
+    def __getstate__(self) -> dict:
+        # Compiled patterns are rebuilt on first use after unpickling
+        state = self.__dict__.copy()
+        state.pop("_compiled", None)
+        return state
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """Immutable, precompiled configuration used by the validation hot paths."""
+
+    recognized_tags: frozenset[str]
+    # Tag name -> position in tag_order (only when order is enforced)
+    tag_positions: Mapping[str, int]
+    # (compiled fnmatch regex, rule) pairs in configuration order
+    file_rule_matchers: tuple[tuple[re.Pattern, FileRule], ...]
+    directive_patterns: Mapping[str, re.Pattern]
+    action_keywords: frozenset[str]
+    ambiguous_patterns: tuple[str, ...]
+
+    @cached_property
+    def ambiguous_matcher(self):
+        """Compiled matcher for ambiguous_patterns (built on first use)."""
+        from .semantic import compile_ambiguous_patterns
+
+        return compile_ambiguous_patterns(self.ambiguous_patterns)
+
+    def matching_file_rules(self, file_path: str) -> list[FileRule]:
+        """Return every file rule whose pattern matches a POSIX path."""
+        file_path = os.path.normcase(file_path)
+        return [
+            rule for regex, rule in self.file_rule_matchers if regex.match(file_path)
+        ]
+
+    def first_file_rule(self, file_path: str) -> FileRule | None:
+        """Return the first file rule whose pattern matches a POSIX path."""
+        file_path = os.path.normcase(file_path)
+        for regex, rule in self.file_rule_matchers:
+            if regex.match(file_path):
+                return rule
+        return None
+
+
+def _fingerprint(config: Config) -> tuple:
+    """Return a hashable snapshot of everything CompiledConfig depends on."""
+    v = config.validation
+    file_rules = tuple(
+        (
+            rule.pattern,
+            tuple(rule.required_tags),
+            tuple(rule.forbidden_tags),
+            rule.skip_frontmatter,
+            rule.skip_required_tags,
+            tuple(
+                (tag, limits.warn_at, limits.fail_at)
+                for tag, limits in rule.tag_tokens.items()
+            ),
+        )
+        for rule in config.file_rules
+    )
+    return (
+        tuple(v.required_tags),
+        tuple(v.optional_tags),
+        v.enforce_tag_order,
+        tuple(v.tag_order),
+        tuple(v.ambiguous_patterns),
+        tuple(v.directives.patterns.items()),
+        tuple(v.instructions.action_keywords),
+        file_rules,
+    )
+
+
+# fingerprint -> CompiledConfig, bounded to the most recent entries
+_compiled_cache: dict[tuple, CompiledConfig] = {}
+_COMPILED_CACHE_SIZE = 64
+
+
+def _compile(fingerprint: tuple, config: Config) -> CompiledConfig:
+    """Return the compiled form of config, cached by its fingerprint."""
+    compiled = _compiled_cache.get(fingerprint)
+    if compiled is not None:
+        return compiled
+
+    v = config.validation
+    tag_positions: dict[str, int] = {}
+    if v.enforce_tag_order:
+        for position, tag_name in enumerate(v.tag_order):
+            tag_positions.setdefault(tag_name, position)
+
+    file_rule_matchers = tuple(
+        (
+            re.compile(fnmatch.translate(os.path.normcase(rule.pattern))),
+            copy.deepcopy(rule),
+        )
+        for rule in config.file_rules
+    )
+    directive_patterns = {
+        keyword: re.compile(pattern)
+        for keyword, pattern in v.directives.patterns.items()
+    }
+
+    compiled = CompiledConfig(
+        recognized_tags=frozenset(v.all_tags),
+        tag_positions=MappingProxyType(tag_positions),
+        file_rule_matchers=file_rule_matchers,
+        directive_patterns=MappingProxyType(directive_patterns),
+        action_keywords=frozenset(v.instructions.action_keywords),
+        ambiguous_patterns=tuple(v.ambiguous_patterns),
+    )
+
+    if len(_compiled_cache) >= _COMPILED_CACHE_SIZE:
+        del _compiled_cache[next(iter(_compiled_cache))]
+    _compiled_cache[fingerprint] = compiled
+    return compiled
+
+
+# (resolved path, mtime_ns, size) -> loaded Config, shared and never mutated
+_config_cache: dict[tuple[str, int, int], Config] = {}
+_config_cache_lock = threading.Lock()
+
 
 def load_config(config_path: Path | str | None = None) -> Config:
     """Load configuration from YAML file.
 
+    Loaded files are memoized per process (see shared_config); each call
+    returns an independent copy that callers may modify.
+
     Args:
         config_path: Path to config file. If None, looks for
             'prompt-lang.config.yaml' in the prompt_lang package directory.
@@ -137,14 +503,56 @@ def load_config(config_path: Path | str | None = None) -> Config:
     Returns:
         Config object with loaded or default values.
     """
-    if config_path is None:
-        config_path = Path(__file__).parent / "prompt-lang.config.yaml"
-    else:
-        config_path = Path(config_path)
+    return copy.deepcopy(shared_config(config_path))
+
+
+def shared_config(config_path: Path | str | None = None) -> Config:
+    """Return the memoized configuration for a config file.
 
-    if not config_path.exists():
+    The file is re-read only when its resolved path, modification time or
+    size changes. The returned object is shared between callers and must
+    not be modified; use load_config for a private copy.
+
+    Args:
+        config_path: Path to config file. If None, uses the default
+            'prompt-lang.config.yaml' in the prompt_lang package directory.
+
+    Returns:
+        Shared Config object.
+    """
+    config_path = DEFAULT_CONFIG_PATH if config_path is None else Path(config_path)
+
+    try:
+        stat = config_path.stat()
+    except OSError:
         return Config()
 
+    key = (str(config_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    config = _config_cache.get(key)
+    if config is not None:
+        return config
+
+    config = _read_config(config_path)
+    config.compiled  # Compile once up front; copies share it
+    with _config_cache_lock:
+        # Drop entries for earlier versions of the same file
+        for stale_key in [k for k in _config_cache if k[0] == key[0]]:
+            del _config_cache[stale_key]
+        _config_cache[key] = config
+    return config
+
+
+def clear_config_cache() -> None:
+    """Forget all memoized configuration files."""
+    with _config_cache_lock:
+        _config_cache.clear()
+
+
+def _read_config(config_path: Path) -> Config:
+    """Read and parse a config file, falling back to defaults on errors."""
+    # Imported here so commands that never read a config file skip the cost
+    import yaml
+
     try:
         with open(config_path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
@@ -154,7 +562,16 @@ def load_config(config_path: Path | str | None = None) -> Config:
     if not data:
         return Config()
 
-    return _parse_config(data)
+    config = _parse_config(data)
+    tokens = config.validation.tokens
+    # Relative to the config file
+    if tokens.bpe_file:
+        tokens.bpe_file = str(config_path.parent / os.path.expanduser(tokens.bpe_file))
+    if tokens.encoding_cache:
+        tokens.encoding_cache = str(
+            config_path.parent / os.path.expanduser(tokens.encoding_cache)
+        )
+    return config
 
 
 def _parse_config(data: dict[str, Any]) -> Config:
@@ -166,7 +583,15 @@ def _parse_config(data: dict[str, Any]) -> Config:
     tokens = TokenConfig(
         warn_at=tokens_data.get("warn_at", 2000),
         fail_at=tokens_data.get("fail_at", 4000),
+        backend=tokens_data.get("backend", "tiktoken"),
+        encoding=tokens_data.get("encoding", "cl100k_base"),
+        bpe_file=tokens_data.get("bpe_file"),
+        encoding_cache=tokens_data.get("encoding_cache"),
+        estimator=tokens_data.get("estimator") or {},
+        tags=_parse_tag_token_limits(tokens_data.get("tags", {})),
+        exact=tokens_data.get("exact", False),
     )
+    tokens.check()
 
     # Parse frontmatter
     fm_data = v.get("frontmatter", {})
@@ -256,8 +681,22 @@ def _parse_config(data: dict[str, Any]) -> Config:
             pattern=rule.get("pattern", ""),
             required_tags=rule.get("required_tags", []),
             forbidden_tags=rule.get("forbidden_tags", []),
+            tag_tokens=_parse_tag_token_limits(rule.get("tag_tokens", {})),
         )
         for rule in file_rules_data
     ]
+    for rule in file_rules:
+        _check_tag_limits(f"file_rules {rule.pattern!r} tag_tokens", rule.tag_tokens)
 
     return Config(validation=validation, file_rules=file_rules)
+
+
+def _parse_tag_token_limits(data: dict[str, Any]) -> dict[str, TagTokenLimits]:
+    """Parse per-tag token limits (tag name -> warn_at/fail_at)."""
+    return {
+        str(name).lower(): TagTokenLimits(
+            warn_at=(limits or {}).get("warn_at"),
+            fail_at=(limits or {}).get("fail_at"),
+        )
+        for name, limits in (data or {}).items()
+    }
@@ -0,0 +1,352 @@
+"""Long-lived validation daemon over a local Unix socket.
+
+``prompt_lang serve`` keeps the configuration, its compiled matchers and
+the tokenizer loaded between runs, so editors, git hooks and other callers
+only pay for the validation itself. The CLI uses a running daemon
+automatically and validates in-process when none is reachable.
+
+Protocol: the client connects, sends one JSON object terminated by a
+newline and reads one JSON object back before the connection closes.
+
+    {"command": "ping"}
+    {"command": "validate", "cwd": "...", "fingerprint": "...", "args": {...}}
+    {"command": "validate_content", "content": "...", "file_path": "...",
+     "config": null, "no_semantic": false, "fingerprint": "..."}
+    {"command": "shutdown"}
+
+Responses carry either ``results`` (a list of serialized results), an
+``error`` with an ``exit_code``, or ``stale`` when the daemon runs
+different validator code than the client.
+
+Requests are handled one at a time. Each validate request runs in the
+client's working directory, so relative paths, file rule matching and the
+result cache location behave exactly as in an in-process run.
+"""
+
+import argparse
+import json
+import os
+import socket
+import stat
+import sys
+from pathlib import Path
+from typing import Any
+
+from . import tokens
+from .cache import code_fingerprint
+from .errors import ValidationResult
+
+SOCKET_ENV_VAR = "PROMPT_LANG_SOCKET"
+
+
+def default_socket_path() -> Path:
+    """Return the socket path used by the daemon and the CLI.
+
+    PROMPT_LANG_SOCKET takes precedence, then the per-user runtime
+    directory, then a per-user name in /tmp.
+    """
+    if os.environ.get(SOCKET_ENV_VAR):
+        return Path(os.environ[SOCKET_ENV_VAR])
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / "prompt_lang.sock"
+    return Path(os.environ.get("TMPDIR", "/tmp")) / f"prompt_lang-{os.getuid()}.sock"
+
+
+def _owned_socket(socket_path: Path | str) -> bool:
+    """Return whether socket_path is a socket owned by the current user.
+
+    Anyone can create the /tmp fallback path first, so the client only
+    talks to a socket its own user created.
+    """
+    try:
+        info = os.lstat(socket_path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def request(
+    payload: dict[str, Any], socket_path: Path | str | None = None
+) -> dict[str, Any] | None:
+    """Send one request to the daemon.
+
+    Args:
+        payload: Request object.
+        socket_path: Daemon socket. Defaults to default_socket_path().
+
+    Returns:
+        The response object, or None if no daemon answered or the socket
+        is not one the current user owns.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    if socket_path is None:
+        socket_path = default_socket_path()
+    if not _owned_socket(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+        return json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+
+
+def validate_remote(
+    args: argparse.Namespace, socket_path: Path | str | None = None
+) -> list[ValidationResult] | None:
+    """Validate the path named by CLI arguments through the daemon.
+
+    Args:
+        args: Arguments from validate.parse_args.
+        socket_path: Daemon socket. Defaults to default_socket_path().
+
+    Returns:
+        Validation results, or None if no up-to-date daemon answered.
+
+    Raises:
+        CLIError: If the daemon could not load the config or find the path.
+    """
+    from .validate import CLIError
+
+    response = request(
+        {
+            "command": "validate",
+            "cwd": os.getcwd(),
+            "fingerprint": code_fingerprint(),
+            "args": vars(args),
+        },
+        socket_path,
+    )
+    if response is None or ("results" not in response and "error" not in response):
+        return None
+    if "error" in response:
+        raise CLIError(response["error"], response["exit_code"])
+    return [_result_from_wire(data) for data in response["results"]]
+
+
+def validate_content_remote(
+    content: str,
+    file_path: str,
+    config_path: str | None = None,
+    no_semantic: bool = False,
+    socket_path: Path | str | None = None,
+) -> ValidationResult | None:
+    """Validate in-memory content through the daemon.
+
+    Args:
+        content: Prompt file content.
+        file_path: Path used for file rule matching and reporting.
+        config_path: Config file. Defaults to the bundled configuration.
+        no_semantic: Skip semantic checks.
+        socket_path: Daemon socket. Defaults to default_socket_path().
+
+    Returns:
+        The validation result, or None if no up-to-date daemon answered.
+    """
+    response = request(
+        {
+            "command": "validate_content",
+            "content": content,
+            "file_path": file_path,
+            "config": os.path.abspath(config_path) if config_path else None,
+            "no_semantic": no_semantic,
+            "fingerprint": code_fingerprint(),
+        },
+        socket_path,
+    )
+    if response is None or not response.get("results"):
+        return None
+    return _result_from_wire(response["results"][0])
+
+
+def _result_to_wire(result: ValidationResult) -> dict[str, Any]:
+    data = result.to_dict()
+    data["file_path"] = result.file_path
+    data["cached"] = result.cached
+    return data
+
+
+def _result_from_wire(data: dict[str, Any]) -> ValidationResult:
+    result = ValidationResult.from_dict(data["file_path"], data)
+    result.cached = data.get("cached", False)
+    return result
+
+
+def handle_request(payload: dict[str, Any]) -> dict[str, Any]:
+    """Answer one request inside the daemon process.
+
+    Args:
+        payload: Request object.
+
+    Returns:
+        Response object.
+    """
+    from .config import load_config
+    from .validate import CLIError, run_validation, validate_content
+
+    command = payload.get("command")
+    if command == "ping":
+        return {"ok": True, "pid": os.getpid(), "fingerprint": code_fingerprint()}
+    if command == "shutdown":
+        return {"ok": True}
+    if command not in ("validate", "validate_content"):
+        return {"error": f"Unknown command: {command!r}", "exit_code": 2}
+    if payload.get("fingerprint") != code_fingerprint():
+        return {"stale": True}
+
+    if command == "validate_content":
+        config = load_config(payload.get("config"))
+        if payload.get("no_semantic"):
+            config.validation.semantic_check = False
+        result = validate_content(payload["content"], Path(payload["file_path"]), config)
+        return {"results": [_result_to_wire(result)]}
+
+    previous_cwd = os.getcwd()
+    try:
+        os.chdir(payload["cwd"])
+        results = run_validation(argparse.Namespace(**payload["args"]))
+    except CLIError as e:
+        return {"error": str(e), "exit_code": e.exit_code}
+    finally:
+        os.chdir(previous_cwd)
+    return {"results": [_result_to_wire(result) for result in results]}
+
+
+def make_server(socket_path: Path | str | None = None):
+    """Bind the daemon socket.
+
+    A leftover socket file from a daemon that is no longer running is
+    replaced.
+
+    Args:
+        socket_path: Socket to listen on. Defaults to default_socket_path().
+
+    Returns:
+        A socketserver.UnixStreamServer; call serve_forever() to run it.
+
+    Raises:
+        RuntimeError: If another daemon is already listening on the socket.
+    """
+    import socketserver
+
+    if socket_path is None:
+        socket_path = default_socket_path()
+    socket_path = Path(socket_path)
+
+    if request({"command": "ping"}, socket_path) is not None:
+        raise RuntimeError(f"A daemon is already listening on {socket_path}")
+    try:
+        socket_path.unlink()
+    except FileNotFoundError:
+        pass
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            payload: dict[str, Any] = {}
+            try:
+                payload = json.loads(self.rfile.readline())
+                response = handle_request(payload)
+            except Exception as e:
+                response = {"error": f"Daemon error: {e}", "exit_code": 2}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            if payload.get("command") == "shutdown":
+                # shutdown() waits for serve_forever, so ask from another thread
+                import threading
+
+                threading.Thread(target=self.server.shutdown).start()
+
+    previous_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(str(socket_path), Handler)
+    finally:
+        os.umask(previous_umask)
+    return server
+
+
+def serve(
+    socket_path: Path | str | None = None, config_path: str | None = None
+) -> None:
+    """Warm up and serve requests until a shutdown request arrives.
+
+    Args:
+        socket_path: Socket to listen on. Defaults to default_socket_path().
+        config_path: Config to load and compile up front.
+    """
+    from .config import shared_config
+
+    server = make_server(socket_path)
+
+    # Load everything a request needs before accepting the first one
+    config = shared_config(config_path)
+    config.compiled.ambiguous_matcher  # Imports and compiles the semantic checker
+    tokens.warm_up(config.validation.tokens.tokenizer)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            Path(server.server_address).unlink()
+        except OSError:
+            pass
+
+
+def serve_main(argv: list[str] | None = None) -> int:
+    """Entry point for ``prompt_lang serve``.
+
+    Args:
+        argv: Arguments after ``serve``.
+
+    Returns:
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="prompt_lang serve",
+        description="Serve validation requests over a Unix socket, keeping the "
+        "configuration and tokenizer loaded between runs.",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help=f"Socket path (default: ${SOCKET_ENV_VAR} or a per-user path)",
+    )
+    parser.add_argument(
+        "--config",
+        "-c",
+        type=str,
+        default=None,
+        help="Config file to load at startup (default: prompt-lang.config.yaml)",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Stop the running daemon",
+    )
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: Unix sockets are not supported on this platform", file=sys.stderr)
+        return 2
+
+    if args.stop:
+        if request({"command": "shutdown"}, args.socket) is None:
+            print("No daemon is running", file=sys.stderr)
+            return 1
+        return 0
+
+    try:
+        serve(args.socket, args.config)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -2,12 +2,16 @@
 
 import re
 from dataclasses import dataclass
-from typing import Tuple
+from typing import AbstractSet, Mapping, Tuple
 
 from .config import DirectiveConfig, InstructionConfig
 
+# Numbered instruction steps ("1. ROUTE to agent")
+STEP_PATTERN = re.compile(r"^\d+\.\s+(.+)$")
+STEP_PREFIX_PATTERN = re.compile(r"^\d+\.")
 
-@dataclass
+
+@dataclass(slots=True)
 class Directive:
     """Parsed directive from a directives block."""
 
@@ -42,12 +46,18 @@ def parse_directives(content: str) -> list[Directive]:
     return directives
 
 
-def validate_directive(line: str, config: DirectiveConfig) -> Tuple[bool, str]:
+def validate_directive(
+    line: str,
+    config: DirectiveConfig,
+    compiled_patterns: Mapping[str, re.Pattern] | None = None,
+) -> Tuple[bool, str]:
     """Validate a directive line against patterns.
 
     Args:
         line: The directive line to validate.
         config: Directive configuration with patterns.
+        compiled_patterns: Optional precompiled config.patterns
+            (see CompiledConfig.directive_patterns).
 
     Returns:
         Tuple of (is_valid, error_message). error_message is empty string if valid.
@@ -76,18 +86,28 @@ def validate_directive(line: str, config: DirectiveConfig) -> Tuple[bool, str]:
         )
 
     # Validate against pattern
-    if not re.match(pattern, line):
+    if compiled_patterns is not None:
+        matched = compiled_patterns[directive_type].match(line)
+    else:
+        matched = re.match(pattern, line)
+    if not matched:
         return False, f"Invalid {directive_type} syntax. Expected pattern: {pattern}"
 
     return True, ""
 
 
-def validate_instruction_step(line: str, config: InstructionConfig) -> Tuple[bool, str]:
+def validate_instruction_step(
+    line: str,
+    config: InstructionConfig,
+    action_keywords: AbstractSet[str] | None = None,
+) -> Tuple[bool, str]:
     """Validate that an instruction step starts with an action keyword.
 
     Args:
         line: The instruction line to validate (e.g., "1. ROUTE to agent").
         config: Instruction configuration with action keywords.
+        action_keywords: Optional precompiled set of config.action_keywords
+            (see CompiledConfig.action_keywords).
 
     Returns:
         Tuple of (is_valid, error_message). error_message is empty string if valid.
@@ -98,7 +118,7 @@ def validate_instruction_step(line: str, config: InstructionConfig) -> Tuple[boo
     line = line.strip()
 
     # Check if this is a numbered step
-    step_match = re.match(r"^\d+\.\s+(.+)$", line)
+    step_match = STEP_PATTERN.match(line)
     if not step_match:
         # Not a numbered step, skip validation
         return True, ""
@@ -109,7 +129,9 @@ def validate_instruction_step(line: str, config: InstructionConfig) -> Tuple[boo
     # Check if first word is an action keyword
     first_word = content.split()[0] if content.split() else ""
 
-    if first_word not in config.action_keywords:
+    if action_keywords is None:
+        action_keywords = config.action_keywords
+    if first_word not in action_keywords:
         return (
             False,
             f"Instruction step must start with an action keyword. "
@@ -133,7 +155,7 @@ def extract_instruction_steps(content: str) -> list[Tuple[str, int]]:
 
     for i, line in enumerate(lines, start=1):
         line = line.strip()
-        if re.match(r"^\d+\.", line):
+        if STEP_PREFIX_PATTERN.match(line):
             steps.append((line, i))
 
     return steps
@@ -0,0 +1,197 @@
+"""Preloaded tiktoken encodings for hosts without network access.
+
+tiktoken downloads an encoding's BPE ranks on first use. ``prompt_lang
+tokenizer-cache`` writes the encodings a configuration uses to a local
+directory (validation.tokens.encoding_cache), taking them from tiktoken
+(which downloads them if it has to) or from a vendored .tiktoken rank
+file. Token counting then loads them from that directory without
+touching the network.
+
+Entries are marshalled, which loads several times faster than
+tiktoken's base64 rank files, so a cold process does not pay for
+parsing them.
+"""
+
+import argparse
+import marshal
+import os
+import sys
+from pathlib import Path
+
+# Directory tokenizer-cache writes to when the config names none
+DEFAULT_ENCODING_CACHE_DIR = Path(".prompt_lang_cache") / "encodings"
+ENCODING_FILE_SUFFIX = ".bpe"
+_MAGIC = b"prompt_lang encoding v1\n"
+
+
+def entry_path(cache_dir: Path | str, encoding_name: str) -> Path:
+    """Return the path of an encoding's entry in a cache directory."""
+    return Path(cache_dir) / f"{encoding_name}{ENCODING_FILE_SUFFIX}"
+
+
+def write_encoding(
+    cache_dir: Path | str, encoding_name: str, source: Path | str | None = None
+) -> Path:
+    """Write an encoding to a cache directory.
+
+    Args:
+        cache_dir: Directory to write to, created if missing.
+        encoding_name: tiktoken encoding name.
+        source: Rank file in tiktoken's format to take the encoding's
+            ranks from. It is split with the pattern and special tokens of
+            encoding_name (see tokens.BPE_PATTERNS). If None, the encoding
+            is taken from tiktoken's constructor for it (in
+            tiktoken_ext.openai_public), which downloads its ranks.
+
+    Returns:
+        Path of the written entry.
+
+    Raises:
+        ValueError: If tiktoken has no constructor for encoding_name, or
+            source is given for an encoding without a known split pattern.
+        Exception: Whatever tiktoken raises when it cannot load the
+            encoding or parse source.
+    """
+    import tempfile
+
+    from .tokens import BPE_PATTERNS, BPE_SPECIAL_TOKENS
+
+    if source is None:
+        from tiktoken_ext.openai_public import ENCODING_CONSTRUCTORS
+
+        if encoding_name not in ENCODING_CONSTRUCTORS:
+            known = ", ".join(ENCODING_CONSTRUCTORS)
+            raise ValueError(f"Unknown encoding {encoding_name} (known: {known})")
+        params = ENCODING_CONSTRUCTORS[encoding_name]()
+        entry = {
+            "pat_str": params["pat_str"],
+            "mergeable_ranks": params["mergeable_ranks"],
+            "special_tokens": params["special_tokens"],
+        }
+    elif encoding_name not in BPE_PATTERNS:
+        known = ", ".join(BPE_PATTERNS)
+        raise ValueError(f"No split pattern for {encoding_name} (known: {known})")
+    else:
+        from tiktoken.load import load_tiktoken_bpe
+
+        entry = {
+            "pat_str": BPE_PATTERNS[encoding_name],
+            "mergeable_ranks": load_tiktoken_bpe(str(source)),
+            "special_tokens": BPE_SPECIAL_TOKENS[encoding_name],
+        }
+
+    path = entry_path(cache_dir, encoding_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            marshal.dump(entry, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def read_entry(cache_dir: Path | str, encoding_name: str) -> dict | None:
+    """Read the Encoding arguments stored for an encoding.
+
+    Returns:
+        Dict of pat_str, mergeable_ranks and special_tokens, or None if
+        the directory has no readable entry for the encoding.
+    """
+    try:
+        data = entry_path(cache_dir, encoding_name).read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(_MAGIC):
+        return None
+    try:
+        return marshal.loads(memoryview(data)[len(_MAGIC) :])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def load_encoding(cache_dir: Path | str, encoding_name: str):
+    """Load an encoding from a cache directory.
+
+    Returns:
+        tiktoken Encoding, or None if the directory has no readable entry
+        for it.
+    """
+    entry = read_entry(cache_dir, encoding_name)
+    if entry is None:
+        return None
+
+    import tiktoken
+
+    return tiktoken.Encoding(encoding_name, **entry)
+
+
+def tokenizer_cache_main(argv: list[str] | None = None) -> int:
+    """Entry point for ``prompt_lang tokenizer-cache``.
+
+    Args:
+        argv: Arguments after ``tokenizer-cache``.
+
+    Returns:
+        Exit code.
+    """
+    from .config import load_config
+
+    parser = argparse.ArgumentParser(
+        prog="prompt_lang tokenizer-cache",
+        description="Write tiktoken encodings to a local directory, so token "
+        "counting never downloads them.",
+    )
+    parser.add_argument(
+        "encodings",
+        nargs="*",
+        metavar="ENCODING",
+        help="Encodings to write (default: validation.tokens.encoding)",
+    )
+    parser.add_argument(
+        "--config",
+        "-c",
+        type=str,
+        default=None,
+        help="Path to config file (default: prompt-lang.config.yaml)",
+    )
+    parser.add_argument(
+        "--dir",
+        type=str,
+        default=None,
+        help="Directory to write to (default: validation.tokens.encoding_cache, "
+        f"or {DEFAULT_ENCODING_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--from",
+        dest="source",
+        metavar="FILE",
+        type=str,
+        default=None,
+        help="Vendored rank file in tiktoken's format to take one encoding from, "
+        "instead of tiktoken's download",
+    )
+    args = parser.parse_args(argv)
+
+    tokens_config = load_config(args.config).validation.tokens
+    encodings = args.encodings or [tokens_config.encoding]
+    if args.source and len(encodings) != 1:
+        parser.error("--from takes exactly one encoding")
+    cache_dir = args.dir or tokens_config.encoding_cache or DEFAULT_ENCODING_CACHE_DIR
+
+    for encoding_name in encodings:
+        try:
+            path = write_encoding(cache_dir, encoding_name, args.source)
+        except Exception as e:
+            print(f"Error writing {encoding_name}: {e}", file=sys.stderr)
+            return 1
+        print(f"Wrote {encoding_name} to {path}")
+
+    if tokens_config.encoding_cache is None or (
+        Path(cache_dir).resolve() != Path(tokens_config.encoding_cache).resolve()
+    ):
+        print(f"Set validation.tokens.encoding_cache to {cache_dir} to use it")
+    return 0
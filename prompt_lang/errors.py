@@ -1,10 +1,25 @@
 """Error and result classes for prompt validation."""
 
 from dataclasses import dataclass, field
-from typing import Literal
+from typing import Any, Literal
 
+# Most messages repeat across files ("Missing <purpose> tag"), so results
+# share one copy of each. Bounded, since messages can quote prompt text.
+MAX_SHARED_MESSAGES = 4096
+_shared_messages: dict[str, str] = {}
 
-@dataclass
+
+def share_message(message: str) -> str:
+    """Return the shared copy of message, adding it if there is room."""
+    shared = _shared_messages.get(message)
+    if shared is not None:
+        return shared
+    if len(_shared_messages) < MAX_SHARED_MESSAGES:
+        _shared_messages[message] = message
+    return message
+
+
+@dataclass(slots=True)
 class ValidationError:
     """A single validation error or warning."""
 
@@ -17,7 +32,7 @@ class ValidationError:
         return f"  Line {self.line}: {self.message}"
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Result of validating a prompt file."""
 
@@ -25,19 +40,61 @@ class ValidationResult:
     errors: list[ValidationError] = field(default_factory=list)
     warnings: list[ValidationError] = field(default_factory=list)
     token_count: int = 0
+    # False when counting stopped at fail_at: token_count is then fail_at,
+    # and the file has at least that many tokens
+    token_count_exact: bool = True
+    # Tokens by block ("frontmatter", "<tag>"), largest first, for files
+    # whose count reaches warn_at or a tag limit
+    token_breakdown: dict[str, int] | None = field(default=None, compare=False)
+    cached: bool = field(default=False, compare=False)
 
     @property
     def passed(self) -> bool:
         """Returns True if no errors were found."""
         return len(self.errors) == 0
 
+    @property
+    def token_count_text(self) -> str:
+        """Token count for display, as '>= N' when it is a lower bound."""
+        if self.token_count_exact:
+            return str(self.token_count)
+        return f">= {self.token_count}"
+
     def add_error(self, line: int, message: str) -> None:
         """Add an error to the result."""
-        self.errors.append(ValidationError(line, message, "error"))
+        self.errors.append(ValidationError(line, share_message(message), "error"))
 
     def add_warning(self, line: int, message: str) -> None:
         """Add a warning to the result."""
-        self.warnings.append(ValidationError(line, message, "warning"))
+        self.warnings.append(ValidationError(line, share_message(message), "warning"))
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the result (without its file path) to plain data."""
+        return {
+            "errors": [[e.line, e.message] for e in self.errors],
+            "warnings": [[w.line, w.message] for w in self.warnings],
+            "token_count": self.token_count,
+            "token_count_exact": self.token_count_exact,
+            "token_breakdown": self.token_breakdown,
+        }
+
+    @classmethod
+    def from_dict(cls, file_path: str, data: dict[str, Any]) -> "ValidationResult":
+        """Rebuild a result produced by to_dict for the given file path."""
+        return cls(
+            file_path=file_path,
+            errors=[
+                ValidationError(line, share_message(msg), "error")
+                for line, msg in data["errors"]
+            ],
+            warnings=[
+                ValidationError(line, share_message(msg), "warning")
+                for line, msg in data["warnings"]
+            ],
+            token_count=data["token_count"],
+            token_count_exact=data.get("token_count_exact", True),
+            token_breakdown=data.get("token_breakdown"),
+        )
 
     def __str__(self) -> str:
         lines = [f"Validating: {self.file_path}", ""]
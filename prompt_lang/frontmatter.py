@@ -0,0 +1,162 @@
+"""YAML frontmatter loading with a fast path for flat mappings.
+
+Frontmatter is almost always a flat mapping of simple scalars
+(``name: deploy``, ``description: ...``). Those are parsed directly,
+without importing yaml. Anything else goes to yaml's libyaml-backed
+CSafeLoader when it is available, and otherwise to the pure-Python
+SafeLoader. Every path gives the same result as ``yaml.safe_load``.
+"""
+
+import re
+from dataclasses import dataclass, fields
+
+# One line of a flat mapping: a plain key, then a value or nothing
+ENTRY_PATTERN = re.compile(r"([^\W\d][\w-]{0,127}):(?: +(.*))?")
+# Values parsed as plain strings: starting with a letter or '_' (no int,
+# float, timestamp or other resolver applies), and without a comment,
+# a nested mapping indicator or trailing spaces to strip
+PLAIN_VALUE_PATTERN = re.compile(r"[^\W\d](?:(?!: | #)[^\t])*?(?<![ :])")
+SINGLE_QUOTED_PATTERN = re.compile(r"'((?:[^']|'')*)'")
+DOUBLE_QUOTED_PATTERN = re.compile(r'"([^"\\]*)"')
+# Characters the fast path leaves to yaml: line breaks other than '\n',
+# tabs, a byte order mark, and characters yaml does not accept
+UNSUPPORTED_CHARACTER_PATTERN = re.compile(
+    "[^\n\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd"
+    "\U00010000-\U0010ffff]"
+)
+# Text libyaml accepts but SafeLoader rejects or reads differently: tabs,
+# byte order marks, tags (an empty '!' tag in particular), a comment right
+# after a block scalar header, and directives. '?' inside a flow
+# collection is checked separately.
+LIBYAML_DIVERGENT_PATTERN = re.compile(
+    "[\t\ufeff!]|[|>][-+0-9]*#|(?:^|[\r\x85\u2028\u2029])%", re.MULTILINE
+)
+
+# Plain scalars yaml resolves to booleans or null (YAML 1.1)
+SPECIAL_SCALARS = {
+    **dict.fromkeys(["yes", "Yes", "YES", "true", "True", "TRUE"], True),
+    **dict.fromkeys(["on", "On", "ON"], True),
+    **dict.fromkeys(["no", "No", "NO", "false", "False", "FALSE"], False),
+    **dict.fromkeys(["off", "Off", "OFF"], False),
+    **dict.fromkeys(["null", "Null", "NULL"], None),
+}
+
+_NOT_FLAT = object()
+
+
+class FrontmatterError(ValueError):
+    """Frontmatter text that is not valid YAML. The message is yaml's."""
+
+
+@dataclass
+class FrontmatterStats:
+    """How often each frontmatter loading path was taken."""
+
+    fast_path: int = 0
+    libyaml: int = 0
+    pure_python: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Frontmatter: {self.fast_path} fast path, {self.libyaml} libyaml, "
+            f"{self.pure_python} pure-Python YAML"
+        )
+
+    def add(self, other: "FrontmatterStats") -> None:
+        """Add the counters of another process's stats to these."""
+        for stat in fields(self):
+            value = getattr(self, stat.name) + getattr(other, stat.name)
+            setattr(self, stat.name, value)
+
+
+STATS = FrontmatterStats()
+
+
+def load_frontmatter(text: str):
+    """Parse frontmatter text the way yaml.safe_load does.
+
+    Args:
+        text: YAML between the frontmatter delimiters.
+
+    Returns:
+        The parsed document (a dict for valid frontmatter, but any YAML
+        value is returned as is).
+
+    Raises:
+        FrontmatterError: If text is not valid YAML.
+    """
+    value = _load_flat(text)
+    if value is not _NOT_FLAT:
+        STATS.fast_path += 1
+        return value
+
+    # Imported on first use to keep CLI startup fast
+    import yaml
+
+    if getattr(yaml, "__with_libyaml__", False) and _libyaml_agrees(text):
+        try:
+            value = yaml.load(text, Loader=yaml.CSafeLoader)
+        except yaml.YAMLError:
+            # libyaml words its errors differently; report SafeLoader's
+            pass
+        else:
+            STATS.libyaml += 1
+            return value
+
+    STATS.pure_python += 1
+    try:
+        return yaml.load(text, Loader=yaml.SafeLoader)
+    except yaml.YAMLError as e:
+        raise FrontmatterError(str(e)) from e
+
+
+def _libyaml_agrees(text: str) -> bool:
+    """Check that text has none of the constructs libyaml reads differently."""
+    if LIBYAML_DIVERGENT_PATTERN.search(text):
+        return False
+    return "?" not in text or ("[" not in text and "{" not in text)
+
+
+def _load_flat(text: str):
+    """Parse text as a flat mapping of simple scalars.
+
+    Returns:
+        The mapping (None if text holds only blank and comment lines), or
+        _NOT_FLAT if text uses anything else.
+    """
+    if UNSUPPORTED_CHARACTER_PATTERN.search(text):
+        return _NOT_FLAT
+
+    mapping = {}
+    for line in text.split("\n"):
+        match = ENTRY_PATTERN.fullmatch(line)
+        if match is None:
+            stripped = line.lstrip(" ")
+            if not stripped or stripped.startswith("#"):
+                continue
+            return _NOT_FLAT
+
+        key = SPECIAL_SCALARS.get(match.group(1), match.group(1))
+        value = match.group(2)
+        if value is not None:
+            value = _load_flat_value(value.rstrip(" "))
+            if value is _NOT_FLAT:
+                return _NOT_FLAT
+        mapping[key] = value
+
+    return mapping or None
+
+
+def _load_flat_value(value: str):
+    """Parse a mapping value, or return _NOT_FLAT if it is not simple."""
+    if not value or value.startswith("#"):
+        return None
+    if PLAIN_VALUE_PATTERN.fullmatch(value):
+        return SPECIAL_SCALARS.get(value, value)
+    match = SINGLE_QUOTED_PATTERN.fullmatch(value)
+    if match:
+        return match.group(1).replace("''", "'")
+    match = DOUBLE_QUOTED_PATTERN.fullmatch(value)
+    if match:
+        return match.group(1)
+    return _NOT_FLAT
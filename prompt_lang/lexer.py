@@ -0,0 +1,267 @@
+"""Single-pass tag lexer for prompt bodies.
+
+Scans the body once and produces an ordered stream of open/close tag
+events. The parser derives tag extraction, unclosed/extra tag checks,
+nesting checks and tag pair building from this stream instead of
+rescanning the text for each check.
+"""
+
+import re
+import sys
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Literal
+
+# Matches both opening (<name>) and closing (</name>) tags
+TAG_PATTERN = re.compile(r"<(/?)([a-z][a-z0-9-]*)>", re.IGNORECASE)
+# TAG_PATTERN for UTF-8 bytes. Unlike TAG_PATTERN, it matches ASCII
+# letters only; TAG_PATTERN also matches four non-ASCII letters that
+# case-fold to ASCII (see NON_ASCII_TAG_LETTERS_PATTERN).
+TAG_BYTES_PATTERN = re.compile(rb"<(/?)([a-z][a-z0-9-]*)>", re.IGNORECASE)
+NON_ASCII_TAG_LETTERS_PATTERN = re.compile(
+    rb"\xc4[\xb0\xb1]|\xc5\xbf|\xe2\x84\xaa"  # İ ı ſ K (Kelvin sign)
+)
+NEWLINE_PATTERN = re.compile(r"\n")
+
+
+class LineIndex:
+    """Maps character offsets in a text to line numbers.
+
+    Stores the start offset of every line once, so each lookup is a
+    binary search instead of a rescan of the text before the offset.
+    """
+
+    def __init__(self, text: str, first_line: int = 1) -> None:
+        self.first_line = first_line
+        self._length = len(text)
+        self._starts = [0]
+        self._starts.extend(m.end() for m in NEWLINE_PATTERN.finditer(text))
+
+    def replaced(
+        self, text: str, start: int, old_end: int, new_end: int
+    ) -> "LineIndex":
+        """Return the index of text after a range of the indexed text changed.
+
+        Args:
+            text: The new text.
+            start: Offset where the changed range starts (same in both texts).
+            old_end: Offset where the changed range ended in the indexed text.
+            new_end: Offset where the changed range ends in text.
+
+        Returns:
+            A new LineIndex for text. Line starts outside the changed range
+            are reused (shifted) rather than rescanned.
+        """
+        delta = new_end - old_end
+        starts = self._starts
+        # A line start depends only on the character before it
+        before = bisect_right(starts, start)
+        after = bisect_right(starts, old_end)
+
+        new_starts = starts[:before]
+        new_starts.extend(
+            m.end() for m in NEWLINE_PATTERN.finditer(text, start, new_end)
+        )
+        new_starts.extend(offset + delta for offset in starts[after:])
+
+        index = LineIndex.__new__(LineIndex)
+        index.first_line = self.first_line
+        index._length = len(text)
+        index._starts = new_starts
+        return index
+
+    def __len__(self) -> int:
+        """Return the number of lines in the text."""
+        return len(self._starts)
+
+    def line_of(self, offset: int) -> int:
+        """Return the line number containing offset."""
+        return bisect_right(self._starts, offset) - 1 + self.first_line
+
+    def line_start(self, line: int) -> int:
+        """Return the offset of the first character of line."""
+        return self._starts[line - self.first_line]
+
+    def line_end(self, line: int) -> int:
+        """Return the offset just past the last character of line (before its newline)."""
+        index = line - self.first_line + 1
+        if index < len(self._starts):
+            return self._starts[index] - 1
+        return self._length
+
+
+@dataclass(slots=True)
+class TagEvent:
+    """An opening or closing tag found by the lexer."""
+
+    kind: Literal["open", "close"]
+    name: str  # Lowercased tag name, interned
+    start: int  # Offset of '<' in the scanned text
+    end: int  # Offset just past '>'
+    line: int
+
+
+def lex_tags(
+    text: str,
+    pos: int = 0,
+    line_index: LineIndex | None = None,
+    endpos: int | None = None,
+) -> list[TagEvent]:
+    """Scan text for tags in a single pass.
+
+    Args:
+        text: Text to scan.
+        pos: Offset to start scanning from.
+        line_index: Line index for text. Built on demand if omitted.
+        endpos: Offset to stop scanning at. Defaults to the end of text.
+
+    Returns:
+        Tag events in document order, with offsets into text.
+    """
+    if line_index is None:
+        line_index = LineIndex(text)
+
+    events: list[TagEvent] = []
+    line_of = line_index.line_of
+
+    if endpos is None:
+        endpos = len(text)
+
+    for match in TAG_PATTERN.finditer(text, pos, endpos):
+        start = match.start()
+        kind = "close" if match.group(1) else "open"
+        events.append(
+            TagEvent(
+                kind,
+                sys.intern(match.group(2).lower()),
+                start,
+                match.end(),
+                line_of(start),
+            )
+        )
+
+    return events
+
+
+def lex_tags_bytes(data, pos: int = 0, first_line: int = 1) -> list[TagEvent]:
+    """Scan UTF-8 encoded text for tags without decoding it.
+
+    Gives the same events as lex_tags on the decoded text, with byte
+    offsets, provided the data contains none of the letters matched by
+    NON_ASCII_TAG_LETTERS_PATTERN.
+
+    Args:
+        data: bytes or another buffer, such as an mmap.
+        pos: Byte offset to start scanning from.
+        first_line: Line number at pos.
+
+    Returns:
+        Tag events in document order, with byte offsets into data.
+    """
+    events: list[TagEvent] = []
+    names: dict[bytes, str] = {}
+    line = first_line
+    last = pos
+    for match in TAG_BYTES_PATTERN.finditer(data, pos):
+        start = match.start()
+        line += data[last:start].count(b"\n")
+        last = start
+        raw_name = match.group(2)
+        name = names.get(raw_name)
+        if name is None:
+            name = names[raw_name] = sys.intern(raw_name.decode("ascii").lower())
+        kind = "close" if match.group(1) else "open"
+        events.append(TagEvent(kind, name, start, match.end(), line))
+    return events
+
+
+class ChunkLexer:
+    """Lexes text that arrives in chunks, such as a file read piece by piece.
+
+    Tags never span lines, so each chunk is scanned up to its last newline
+    and the partial line after it is carried over into the next chunk.
+    Event offsets and lines refer to the whole input.
+    """
+
+    def __init__(self, offset: int = 0, first_line: int = 1) -> None:
+        self._offset = offset  # Offset of the carried text in the whole input
+        self._line = first_line  # Line number at that offset
+        self._carry = ""
+
+    def feed(self, chunk: str) -> tuple[str, int, list[TagEvent]]:
+        """Lex the complete lines available after adding chunk.
+
+        Returns:
+            Tuple of (text, offset, events): the text scanned, its offset
+            in the whole input, and the tag events found in it.
+        """
+        text = self._carry + chunk
+        cut = text.rfind("\n") + 1
+        self._carry = text[cut:]
+        return self._scan(text[:cut] if self._carry else text)
+
+    def close(self) -> tuple[str, int, list[TagEvent]]:
+        """Lex the text left after the last newline, at the end of input."""
+        text = self._carry
+        self._carry = ""
+        return self._scan(text)
+
+    def _scan(self, text: str) -> tuple[str, int, list[TagEvent]]:
+        offset = self._offset
+        line = self._line
+        events: list[TagEvent] = []
+        pos = 0
+        for match in TAG_PATTERN.finditer(text):
+            start = match.start()
+            line += text.count("\n", pos, start)
+            pos = start
+            kind = "close" if match.group(1) else "open"
+            events.append(
+                TagEvent(
+                    kind,
+                    sys.intern(match.group(2).lower()),
+                    offset + start,
+                    offset + match.end(),
+                    line,
+                )
+            )
+        self._line = line + text.count("\n", pos)
+        self._offset = offset + len(text)
+        return text, offset, events
+
+
+def pair_events(events: list[TagEvent]) -> list[tuple[TagEvent, TagEvent]]:
+    """Pair opening tags with their closing tags.
+
+    Pairs are chosen the same way as a leftmost, non-greedy
+    ``<name>(.*?)</name>`` scan: each opening tag is paired with the next
+    closing tag of the same name, and scanning resumes after that closing
+    tag. Opening tags without a later closing tag are skipped.
+
+    Args:
+        events: Tag events in document order.
+
+    Returns:
+        List of (open_event, close_event) tuples in document order.
+    """
+    # Index of the next closing tag with the same name, for each opening tag
+    next_close: list[int | None] = [None] * len(events)
+    latest_close: dict[str, int] = {}
+    for i in range(len(events) - 1, -1, -1):
+        event = events[i]
+        if event.kind == "close":
+            latest_close[event.name] = i
+        else:
+            next_close[i] = latest_close.get(event.name)
+
+    pairs: list[tuple[TagEvent, TagEvent]] = []
+    i = 0
+    while i < len(events):
+        close_index = next_close[i]
+        if close_index is None:
+            i += 1
+            continue
+        pairs.append((events[i], events[close_index]))
+        i = close_index + 1
+
+    return pairs
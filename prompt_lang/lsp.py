@@ -0,0 +1,439 @@
+"""Language Server Protocol server (stdio transport).
+
+``prompt_lang lsp`` publishes validation errors and warnings as
+diagnostics while prompts are edited. Each open document keeps its text
+and the results of the per-block checks (ambiguous language, directive
+syntax, instruction steps), keyed by the block's name and content. After
+an edit the structure is updated with parser.reparse, which re-lexes only
+the edited lines, and only blocks whose content changed are checked
+again; the results of the others are moved to their new lines.
+
+Supported messages: initialize, shutdown, exit and the textDocument
+didOpen, didChange (full or incremental sync) and didClose notifications.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO
+from urllib.parse import unquote, urlparse
+
+from . import __version__
+from .config import Config, load_config
+from .errors import ValidationResult
+from .lexer import LineIndex
+from .parser import ParsedPrompt, Tag, TextEdit, parse_content, reparse
+from .validate import (
+    get_matching_file_rule,
+    validate_directives_block,
+    validate_file_rules,
+    validate_instructions_block,
+)
+
+# LSP constants
+TEXT_DOCUMENT_SYNC_INCREMENTAL = 2
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+# (relative line, message) pairs produced by one check of one block
+BlockErrors = list[tuple[int, str]]
+
+
+@dataclass
+class Document:
+    """An open text document and the cached results of its block checks."""
+
+    uri: str
+    text: str
+    version: int = 0
+    parsed: ParsedPrompt | None = None
+    result: ValidationResult | None = None
+    # (check, tag name, tag content) -> errors relative to the tag's first line
+    block_errors: dict[tuple[str, str, str], BlockErrors] = field(default_factory=dict)
+    blocks_checked: int = 0  # Block checks run by the latest validation
+    # Edits applied since parsed was produced
+    pending_edits: list[TextEdit] = field(default_factory=list)
+    # Line index of text, kept up to date by apply_change once built
+    _line_index: LineIndex | None = field(default=None, repr=False)
+
+    @property
+    def path(self) -> Path:
+        """File system path of the document, used for file rule matching."""
+        parsed = urlparse(self.uri)
+        if parsed.scheme == "file":
+            return Path(unquote(parsed.path))
+        return Path(self.uri)
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Line index of text, with lines numbered from 1 as in results."""
+        if self._line_index is None:
+            if self.parsed is not None and not self.pending_edits:
+                # The parser's index of the same text, if it kept one
+                self._line_index = self.parsed.line_index
+            if self._line_index is None:
+                self._line_index = LineIndex(self.text)
+        return self._line_index
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        """Apply one TextDocumentContentChangeEvent."""
+        text = change["text"]
+        if "range" not in change:
+            start, end = 0, len(self.text)
+            self._line_index = None
+        else:
+            start = self.offset_at(change["range"]["start"])
+            end = self.offset_at(change["range"]["end"])
+        self.text = self.text[:start] + text + self.text[end:]
+        if self._line_index is not None:
+            self._line_index = self._line_index.replaced(
+                self.text, start, end, start + len(text)
+            )
+        self.pending_edits.append(TextEdit(start, end, text))
+
+    def offset_at(self, position: dict[str, int]) -> int:
+        """Convert an LSP position (line, UTF-16 character) to a string offset."""
+        line_index = self.line_index
+        line = position["line"] + 1
+        if line > len(line_index):
+            return len(self.text)
+        line_start = line_index.line_start(line)
+        line_end = line_index.line_end(line)
+        return line_start + _utf16_to_index(
+            self.text[line_start:line_end], position["character"]
+        )
+
+    def reset(self) -> None:
+        """Forget the parse, so the next validation parses the text from scratch."""
+        self.parsed = None
+        self.pending_edits = []
+        self._line_index = None
+
+
+def _utf16_to_index(line: str, units: int) -> int:
+    """Convert a UTF-16 code unit count within line to a character index."""
+    if line.isascii():
+        return min(units, len(line))
+    index = 0
+    for char in line:
+        if units <= 0:
+            break
+        units -= 2 if ord(char) > 0xFFFF else 1
+        index += 1
+    return index
+
+
+def _utf16_length(line: str) -> int:
+    if line.isascii():
+        return len(line)
+    return len(line.encode("utf-16-le")) // 2
+
+
+def validate_document(document: Document, config: Config) -> ValidationResult:
+    """Validate a document, reusing block results from earlier validations.
+
+    Produces the same errors and warnings as validate.validate_content.
+
+    Args:
+        document: Open document.
+        config: Configuration object.
+
+    Returns:
+        ValidationResult for the document's current text.
+    """
+    file_path = document.path
+    file_rule = get_matching_file_rule(file_path, config)
+    result = ValidationResult(file_path=str(file_path))
+    if document.parsed is None:
+        parsed, result = parse_content(document.text, result, config, file_rule)
+    else:
+        parsed, result = reparse(
+            document.parsed, document.pending_edits, result, config, file_rule
+        )
+    document.pending_edits = []
+
+    previous = document.block_errors
+    current: dict[tuple[str, str, str], BlockErrors] = {}
+    document.blocks_checked = 0
+
+    def add_block_errors(check: str, tag: Tag) -> None:
+        key = (check, tag.name, tag.content)
+        errors = current.get(key)
+        if errors is None:
+            errors = previous.get(key)
+        if errors is None:
+            errors = _check_block(check, tag, config)
+            document.blocks_checked += 1
+        current[key] = errors
+        for relative_line, message in errors:
+            result.add_error(tag.start_line + relative_line, message)
+
+    # Same order of checks as validate._validate_parsed
+    if config.validation.semantic_check and not (
+        file_rule and file_rule.skip_frontmatter
+    ):
+        for tag in parsed.get_tags("instructions"):
+            add_block_errors("semantic", tag)
+
+    validate_file_rules(file_path, parsed, result, config)
+
+    for tag in parsed.get_tags("directives"):
+        add_block_errors("directives", tag)
+    for tag in parsed.get_tags("instructions"):
+        add_block_errors("instructions", tag)
+
+    document.block_errors = current
+    document.parsed = parsed
+    document.result = result
+    return result
+
+
+def _check_block(check: str, tag: Tag, config: Config) -> BlockErrors:
+    """Run one check on a block as if it started on line 0."""
+    block_result = ValidationResult(file_path="")
+    if check == "semantic":
+        from .semantic import check_ambiguous_language
+
+        relative_tag = Tag(tag.name, tag.content, 0, tag.end_line - tag.start_line)
+        check_ambiguous_language(
+            ParsedPrompt(tags=[relative_tag]), block_result, config
+        )
+    elif check == "directives":
+        validate_directives_block(tag.content, 0, block_result, config)
+    else:
+        validate_instructions_block(tag.content, 0, block_result, config)
+    return [(error.line, error.message) for error in block_result.errors]
+
+
+def to_diagnostics(
+    document: Document, result: ValidationResult
+) -> list[dict[str, Any]]:
+    """Convert a result to LSP diagnostics.
+
+    Each diagnostic covers the whole line it was reported on. File-level
+    errors (line 0) are shown on the first line.
+    """
+    text = document.text
+    line_index = document.line_index
+    diagnostics = []
+    for severity, errors in (
+        (SEVERITY_ERROR, result.errors),
+        (SEVERITY_WARNING, result.warnings),
+    ):
+        for error in errors:
+            line = min(max(error.line, 1), len(line_index))
+            end = _utf16_length(
+                text[line_index.line_start(line) : line_index.line_end(line)]
+            )
+            line -= 1  # LSP lines are numbered from 0
+            diagnostics.append(
+                {
+                    "range": {
+                        "start": {"line": line, "character": 0},
+                        "end": {"line": line, "character": end},
+                    },
+                    "severity": severity,
+                    "source": "prompt_lang",
+                    "message": error.message,
+                }
+            )
+    return diagnostics
+
+
+class LanguageServer:
+    """Dispatches LSP messages and tracks open documents."""
+
+    def __init__(self, config: Config, output: BinaryIO) -> None:
+        self.config = config
+        self.output = output
+        self.documents: dict[str, Document] = {}
+        self.shutdown_requested = False
+
+    def handle(self, message: dict[str, Any]) -> bool:
+        """Handle one message.
+
+        A request that fails is answered with an internal error. A
+        notification that fails is logged to stderr, and the document it
+        names is reparsed from scratch on its next change.
+
+        Returns:
+            False once the client asked the server to exit.
+        """
+        try:
+            return self._dispatch(message)
+        except Exception as e:
+            if isinstance(message, dict) and "id" in message:
+                self.send_error(message["id"], INTERNAL_ERROR, f"Internal error: {e}")
+                return True
+            method = message.get("method") if isinstance(message, dict) else None
+            print(f"prompt_lang lsp: error handling {method}: {e!r}", file=sys.stderr)
+            try:
+                document = self.documents.get(message["params"]["textDocument"]["uri"])
+            except (KeyError, TypeError):
+                document = None
+            if document is not None:
+                document.reset()
+            return True
+
+    def _dispatch(self, message: dict[str, Any]) -> bool:
+        method = message.get("method")
+        params = message.get("params") or {}
+
+        if method == "exit":
+            return False
+
+        if "id" in message:
+            self._respond(message["id"], method, params)
+            return True
+
+        if method == "textDocument/didOpen":
+            item = params["textDocument"]
+            document = Document(item["uri"], item["text"], item.get("version", 0))
+            self.documents[document.uri] = document
+            self.publish(document)
+        elif method == "textDocument/didChange":
+            document = self.documents.get(params["textDocument"]["uri"])
+            if document is not None:
+                for change in params["contentChanges"]:
+                    document.apply_change(change)
+                document.version = params["textDocument"].get(
+                    "version", document.version
+                )
+                self.publish(document)
+        elif method == "textDocument/didClose":
+            document = self.documents.pop(params["textDocument"]["uri"], None)
+            if document is not None:
+                self._notify(
+                    "textDocument/publishDiagnostics",
+                    {"uri": document.uri, "diagnostics": []},
+                )
+        # Other notifications are ignored
+        return True
+
+    def _respond(self, request_id: Any, method: str | None, params: dict) -> None:
+        if method == "initialize":
+            result: Any = {
+                "capabilities": {
+                    "textDocumentSync": {
+                        "openClose": True,
+                        "change": TEXT_DOCUMENT_SYNC_INCREMENTAL,
+                    }
+                },
+                "serverInfo": {"name": "prompt_lang", "version": __version__},
+            }
+        elif method == "shutdown":
+            self.shutdown_requested = True
+            result = None
+        else:
+            message = f"Method not found: {method}"
+            self.send_error(request_id, METHOD_NOT_FOUND, message)
+            return
+        self._send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    def send_error(self, request_id: Any, code: int, message: str) -> None:
+        """Answer a request with an error (request_id None for unreadable ones)."""
+        self._send(
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {"code": code, "message": message},
+            }
+        )
+
+    def publish(self, document: Document) -> None:
+        """Validate a document and publish its diagnostics."""
+        result = validate_document(document, self.config)
+        self._notify(
+            "textDocument/publishDiagnostics",
+            {
+                "uri": document.uri,
+                "version": document.version,
+                "diagnostics": to_diagnostics(document, result),
+            },
+        )
+
+    def _notify(self, method: str, params: dict[str, Any]) -> None:
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def _send(self, message: dict[str, Any]) -> None:
+        body = json.dumps(message).encode("utf-8")
+        self.output.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii"))
+        self.output.write(body)
+        self.output.flush()
+
+
+def read_message(stream: BinaryIO) -> dict[str, Any] | None:
+    """Read one framed JSON-RPC message, or None at end of input.
+
+    Raises:
+        ValueError: If the headers or the JSON body cannot be parsed.
+    """
+    content_length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.lower() == "content-length":
+            content_length = int(value)
+
+    if content_length is None:
+        return {}
+    return json.loads(stream.read(content_length))
+
+
+def serve_stdio(config: Config, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    """Run the server until the client exits.
+
+    Returns:
+        0 if the client requested shutdown before exiting, 1 otherwise.
+    """
+    server = LanguageServer(config, stdout)
+    while True:
+        try:
+            message = read_message(stdin)
+        except ValueError as e:
+            server.send_error(None, PARSE_ERROR, f"Parse error: {e}")
+            continue
+        if message is None or not server.handle(message):
+            break
+    return 0 if server.shutdown_requested else 1
+
+
+def lsp_main(argv: list[str] | None = None) -> int:
+    """Entry point for ``prompt_lang lsp``.
+
+    Args:
+        argv: Arguments after ``lsp``.
+
+    Returns:
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="prompt_lang lsp",
+        description="Run a Language Server Protocol server on stdin/stdout.",
+    )
+    parser.add_argument(
+        "--config",
+        "-c",
+        type=str,
+        default=None,
+        help="Path to config file (default: prompt-lang.config.yaml)",
+    )
+    parser.add_argument(
+        "--stdio",
+        action="store_true",
+        help="Use stdin/stdout (the only transport; accepted for editor compatibility)",
+    )
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    return serve_stdio(config, sys.stdin.buffer, sys.stdout.buffer)
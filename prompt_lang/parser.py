@@ -5,34 +5,47 @@ Performs deterministic validation of:
 - XML tag extraction and validation
 - Nesting detection
 - Token counting
+
+parse_content parses a whole document; reparse updates an earlier parse
+after text edits, re-lexing only the lines the edits touch; parse_stream
+parses a file object chunk by chunk, for files too large to hold in
+memory.
 """
 
+import codecs
 import re
+from collections import deque
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from pathlib import Path
-
-import yaml
-
-try:
-    import tiktoken
-
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
-
-from .config import Config, FileRule, load_config
-from .errors import ValidationResult
+from typing import TextIO
+
+from . import tokens
+from .config import Config, FileRule, TagTokenLimits, shared_config
+from .errors import ValidationError, ValidationResult
+from .frontmatter import FrontmatterError, load_frontmatter
+from .lexer import (
+    NON_ASCII_TAG_LETTERS_PATTERN,
+    ChunkLexer,
+    LineIndex,
+    TagEvent,
+    lex_tags,
+    lex_tags_bytes,
+    pair_events,
+)
 
 # Regex patterns
 FRONTMATTER_PATTERN = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
-OPEN_TAG_PATTERN = re.compile(r"<([a-z][a-z0-9-]*)>", re.IGNORECASE)
-CLOSE_TAG_PATTERN = re.compile(r"</([a-z][a-z0-9-]*)>", re.IGNORECASE)
-TAG_PAIR_PATTERN = re.compile(
-    r"<([a-z][a-z0-9-]*)>(.*?)</\1>", re.DOTALL | re.IGNORECASE
-)
+FRONTMATTER_OPENER_PATTERN = re.compile(r"---\s*\n")
+NON_SPACE_PATTERN = re.compile(r"\S")
 
+# Characters parse_stream reads at a time
+STREAM_CHUNK_CHARS = 1 << 20
+# Longest frontmatter parse_stream looks for a closing '---' in
+MAX_FRONTMATTER_CHARS = 1 << 20
 
-@dataclass
+
+@dataclass(slots=True)
 class Tag:
     """Represents a parsed XML tag."""
 
@@ -40,6 +53,125 @@ class Tag:
     content: str
     start_line: int
     end_line: int
+    # Tokens of the block, tags included (set for files reaching a limit)
+    token_count: int | None = field(default=None, compare=False)
+
+
+class SpanTag(Tag):
+    """A Tag whose content is read from a span of a shared buffer.
+
+    Tags parsed from a memory-mapped file (parse_file with memory_map)
+    record byte offsets instead of a copy of their content. The content
+    is decoded on each access, so it is only held while it is used.
+    """
+
+    __slots__ = ("source", "span_start", "span_end")
+
+    def __init__(
+        self,
+        name: str,
+        source,
+        span_start: int,
+        span_end: int,
+        start_line: int,
+        end_line: int,
+    ) -> None:
+        self.name = name
+        self.source = source  # bytes-like, UTF-8 encoded
+        self.span_start = span_start
+        self.span_end = span_end
+        self.start_line = start_line
+        self.end_line = end_line
+        self.token_count = None
+
+    @property
+    def content(self) -> str:
+        """Stripped text of the tag, decoded from the source."""
+        return str(
+            memoryview(self.source)[self.span_start : self.span_end], "utf-8"
+        ).strip()
+
+    def __eq__(self, other) -> bool:
+        # Equal to a Tag with the same fields, whichever side it is on
+        if not isinstance(other, Tag):
+            return NotImplemented
+        return (self.name, self.content, self.start_line, self.end_line) == (
+            other.name,
+            other.content,
+            other.start_line,
+            other.end_line,
+        )
+
+
+class TagList(list):
+    """List of tags that keeps a name index in sync with its contents.
+
+    Lookups by name are dictionary lookups instead of scans. Appending or
+    extending updates the index in place; other mutations rebuild it.
+    """
+
+    def __init__(self, tags=()) -> None:
+        super().__init__(tags)
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_name: dict[str, list[Tag]] = {}
+        for tag in self:
+            self._by_name.setdefault(tag.name.lower(), []).append(tag)
+
+    def by_name(self, name: str) -> list[Tag]:
+        """Return all tags with the given name, in document order."""
+        return self._by_name.get(name.lower(), [])
+
+    def append(self, tag: Tag) -> None:
+        super().append(tag)
+        self._by_name.setdefault(tag.name.lower(), []).append(tag)
+
+    def extend(self, tags) -> None:
+        for tag in tags:
+            self.append(tag)
+
+    def __iadd__(self, tags):
+        self.extend(tags)
+        return self
+
+    def insert(self, index, tag: Tag) -> None:
+        super().insert(index, tag)
+        self._reindex()
+
+    def remove(self, tag: Tag) -> None:
+        super().remove(tag)
+        self._reindex()
+
+    def pop(self, index=-1) -> Tag:
+        tag = super().pop(index)
+        self._reindex()
+        return tag
+
+    def clear(self) -> None:
+        super().clear()
+        self._by_name = {}
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._reindex()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._reindex()
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._reindex()
+
+    def __imul__(self, count):
+        super().__imul__(count)
+        self._reindex()
+        return self
 
 
 @dataclass
@@ -48,25 +180,80 @@ class ParsedPrompt:
 
     frontmatter: dict | None = None
     frontmatter_end_line: int = 0
-    tags: list[Tag] = field(default_factory=list)
+    tags: list[Tag] = field(default_factory=TagList)
     raw_content: str = ""
+    # Tokens of the frontmatter, delimiters included (set with tag counts)
+    frontmatter_token_count: int | None = None
+    # What reparse needs from the parse that produced this object
+    _state: "_ParseState | None" = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __setattr__(self, name: str, value) -> None:
+        # Keep tags indexed even when a plain list is assigned
+        if name == "tags" and not isinstance(value, TagList):
+            value = TagList(value)
+        super().__setattr__(name, value)
+
+    @property
+    def line_index(self) -> LineIndex | None:
+        """Line index of raw_content built by the parse, if it kept one."""
+        return self._state.line_index if self._state is not None else None
 
     def get_tag(self, name: str) -> Tag | None:
-        """Get a tag by name."""
-        for tag in self.tags:
-            if tag.name.lower() == name.lower():
-                return tag
-        return None
+        """Get the first tag with the given name."""
+        tags = self.tags.by_name(name)
+        return tags[0] if tags else None
+
+    def get_tags(self, name: str) -> list[Tag]:
+        """Get every tag with the given name, in document order."""
+        return list(self.tags.by_name(name))
 
     def has_tag(self, name: str) -> bool:
         """Check if a tag exists."""
-        return self.get_tag(name) is not None
+        return bool(self.tags.by_name(name))
+
+
+@dataclass
+class TextEdit:
+    """Replacement of the characters from start to end (exclusive) with text."""
+
+    start: int
+    end: int
+    text: str
+
+
+@dataclass
+class _ParseState:
+    """Intermediate results of a parse, reused by reparse."""
+
+    key: tuple  # Inputs besides the text that the state depends on
+    config: Config
+    file_rule: FileRule | None
+    file_path: str
+    line_index: LineIndex
+    events: list[TagEvent]
+    frontmatter_match: str | None  # Frontmatter text including delimiters
+    frontmatter_errors: list[ValidationError]
+    tags_by_span: dict[tuple[int, int], Tag]  # (open start, close start) -> Tag
+    segment_counts: dict[str, int] | None = None  # Token counts by segment
+
+
+def _state_key(config: Config, file_rule: FileRule | None) -> tuple:
+    return (
+        config.compiled,
+        tuple(config.validation.frontmatter.required),
+        config.validation.tokens.tokenizer,
+        bool(file_rule and file_rule.skip_frontmatter),
+        bool(file_rule and file_rule.skip_required_tags),
+    )
 
 
 def parse_file(
     file_path: Path | str,
     config: Config | None = None,
     file_rule: FileRule | None = None,
+    memory_map: bool = False,
 ) -> tuple[ParsedPrompt, ValidationResult]:
     """Parse a prompt file and validate its structure.
 
@@ -74,6 +261,11 @@ def parse_file(
         file_path: Path to the prompt file.
         config: Optional config object. If None, loads from default location.
         file_rule: Optional file-specific rule for this file type.
+        memory_map: Memory-map the file instead of reading it. Tags are
+            then SpanTags that decode their content on access, and
+            raw_content is empty. Files that cannot be mapped, or whose
+            text would be lexed differently as bytes, are read as usual.
+            The file must not be truncated while the tags are in use.
 
     Returns:
         Tuple of (ParsedPrompt, ValidationResult).
@@ -82,7 +274,12 @@ def parse_file(
     result = ValidationResult(file_path=str(file_path))
 
     if config is None:
-        config = load_config()
+        config = shared_config()
+
+    if memory_map:
+        parsed = _parse_mapped(file_path, result, config, file_rule)
+        if parsed is not None:
+            return parsed, result
 
     # Read file content
     try:
@@ -99,6 +296,7 @@ def parse_content(
     result: ValidationResult,
     config: Config,
     file_rule: FileRule | None = None,
+    token_count: int | None = None,
 ) -> tuple[ParsedPrompt, ValidationResult]:
     """Parse prompt content and validate structure.
 
@@ -107,58 +305,652 @@ def parse_content(
         result: ValidationResult to populate.
         config: Configuration object.
         file_rule: Optional file-specific rule for this file type.
+        token_count: Token count of content, if already counted (see
+            tokens.count_tokens_batch).
 
     Returns:
         Tuple of (ParsedPrompt, ValidationResult).
     """
     parsed = ParsedPrompt(raw_content=content)
-    lines = content.split("\n")
+    line_index = LineIndex(content)
 
     # Check if we should skip frontmatter validation
     skip_frontmatter = file_rule and file_rule.skip_frontmatter
     skip_required_tags = file_rule and file_rule.skip_required_tags
 
     # Step 1: Parse and validate frontmatter (unless skipped)
+    frontmatter_errors_start = len(result.errors)
     if skip_frontmatter:
         # No frontmatter expected, start from beginning
         parsed.frontmatter = None
         parsed.frontmatter_end_line = 0
     else:
         parsed.frontmatter, parsed.frontmatter_end_line = _parse_frontmatter(
-            content, lines, result, config
+            content, result, config
         )
+    frontmatter_errors = result.errors[frontmatter_errors_start:]
 
     # Step 2: Check for reference flag - skip further validation if set
     if parsed.frontmatter and parsed.frontmatter.get("reference") is True:
-        result.token_count = _count_tokens(content)
+        if token_count is None:
+            token_count = _count_tokens(content, config)
+        _set_token_count(token_count, result, config)
         return parsed, result
 
     # Step 3: Extract and validate tags
-    body_start = parsed.frontmatter_end_line
-    body_content = "\n".join(lines[body_start:])
-    parsed.tags = _extract_tags(body_content, body_start, lines, result, config)
+    body_start = line_index.line_start(parsed.frontmatter_end_line + 1)
+    events = lex_tags(content, body_start, line_index)
+    _check_tag_balance(events, result, config)
+    pairs = pair_events(events)
+    parsed.tags = TagList(
+        _make_tag(content, open_event, close_event) for open_event, close_event in pairs
+    )
+
+    # Steps 4-6: Nesting, required tags and tag order
+    _check_tag_structure(parsed, events, result, config, skip_required_tags)
+
+    # Step 7: Count tokens (unless already counted), by block past a limit
+    token_count = _count_tokens_by_block(
+        content, parsed, pairs, body_start, result, config, file_rule, token_count
+    )
+    _set_token_count(token_count, result, config)
+    _check_token_limits(result, config)
+
+    parsed._state = _ParseState(
+        key=_state_key(config, file_rule),
+        config=config,
+        file_rule=file_rule,
+        file_path=result.file_path,
+        line_index=line_index,
+        events=events,
+        frontmatter_match=_frontmatter_match(content, skip_frontmatter),
+        frontmatter_errors=frontmatter_errors,
+        tags_by_span={
+            (open_event.start, close_event.start): tag
+            for (open_event, close_event), tag in zip(pairs, parsed.tags)
+        },
+    )
+    return parsed, result
 
-    # Step 4: Check for nesting violations
-    _check_nesting(body_content, body_start, lines, result, config)
 
-    # Step 5: Check required tags (unless skipped)
-    if not skip_required_tags:
-        _check_required_tags(parsed, result, config)
+def parse_stream(
+    stream: TextIO,
+    result: ValidationResult,
+    config: Config,
+    file_rule: FileRule | None = None,
+    on_tag: Callable[[Tag], None] | None = None,
+    chunk_chars: int = STREAM_CHUNK_CHARS,
+) -> tuple[ParsedPrompt, ValidationResult]:
+    """Parse prompt content from a text stream without reading it whole.
 
-    # Step 6: Check tag order
-    _check_tag_order(parsed, result, config)
+    Reports the same errors as parse_content on the stream's content. The
+    stream is read in chunks of chunk_chars characters and lexed as it
+    arrives; the text of a tag is kept only until its closing tag is
+    found, so memory is bounded by the largest tag block (an unclosed
+    tag's block runs to the end of the input) rather than by the file.
 
-    # Step 7: Count tokens
-    parsed_token_count = _count_tokens(content)
-    result.token_count = parsed_token_count
-    _check_token_limits(parsed_token_count, result, config)
+    Differences from parse_content: raw_content is empty, a closing
+    frontmatter delimiter is only looked for in the first
+    MAX_FRONTMATTER_CHARS characters, and there is no token breakdown.
+    Blocks of tags with token limits are counted one by one (see
+    _BlockTokenCounts), so their counts can differ by a token or so.
+
+    Args:
+        stream: Text stream positioned at the start of the content.
+        result: ValidationResult to populate.
+        config: Configuration object.
+        file_rule: Optional file-specific rule for this file type.
+        on_tag: Called with each Tag, in document order, as soon as it is
+            complete. When given, tags are not collected in the returned
+            ParsedPrompt.
+        chunk_chars: Characters to read at a time.
+
+    Returns:
+        Tuple of (ParsedPrompt, ValidationResult).
+    """
+    parsed = ParsedPrompt()
+    skip_frontmatter = file_rule and file_rule.skip_frontmatter
+    skip_required_tags = file_rule and file_rule.skip_required_tags
+
+    # Step 1: Read enough of the stream to settle the frontmatter
+    head = _read_head(stream, chunk_chars, skip_frontmatter)
+    if skip_frontmatter:
+        parsed.frontmatter = None
+        parsed.frontmatter_end_line = 0
+    else:
+        parsed.frontmatter, parsed.frontmatter_end_line = _parse_frontmatter(
+            head, result, config
+        )
+
+    counter = tokens.TokenCounter(
+        config.validation.tokens.tokenizer,
+        max_tokens=config.validation.tokens.count_bound,
+    )
+    counter.feed(head)
 
+    # Step 2: Check for reference flag - skip further validation if set
+    if parsed.frontmatter and parsed.frontmatter.get("reference") is True:
+        while chunk := stream.read(chunk_chars):
+            counter.feed(chunk)
+        _set_token_count(counter.total(), result, config)
+        return parsed, result
+
+    # Step 3: Lex and pair tags chunk by chunk
+    body_start = len(_frontmatter_match(head, skip_frontmatter) or "")
+    lexer = ChunkLexer(body_start, parsed.frontmatter_end_line + 1)
+    balance = _TagBalance(config)
+    nesting = _TagNesting(config)
+    nesting_result = ValidationResult(file_path=result.file_path)
+    block_counts = _BlockTokenCounts(config, file_rule)
+    checked = _StreamedTags(config, on_tag, block_counts)
+    pairing = _StreamPairing(checked.add)
+
+    scanned = lexer.feed(head[body_start:])
+    while True:
+        text, offset, events = scanned
+        for event in events:
+            balance.add(event)
+            nesting.add(event, nesting_result)
+        pairing.feed(text, offset, events)
+        chunk = stream.read(chunk_chars)
+        if not chunk:
+            break
+        counter.feed(chunk)
+        scanned = lexer.feed(chunk)
+
+    text, offset, events = lexer.close()
+    for event in events:
+        balance.add(event)
+        nesting.add(event, nesting_result)
+    pairing.feed(text, offset, events)
+    pairing.close()
+
+    # Steps 4-6: Balance, nesting, required tags and tag order, in the
+    # order parse_content reports them
+    balance.report(result)
+    result.errors.extend(nesting_result.errors)
+    summary = ParsedPrompt(tags=checked.summary)
+    if not skip_required_tags:
+        _check_required_tags(summary, result, config)
+    _check_tag_order(summary, result, config)
+    if on_tag is None:
+        parsed.tags = checked.tags
+
+    # Step 7: Count tokens
+    parsed_token_count = counter.total()
+    block_counts.check(parsed_token_count, result)
+    _set_token_count(parsed_token_count, result, config)
+    _check_token_limits(result, config)
     return parsed, result
 
 
+def _read_head(stream: TextIO, chunk_chars: int, skip_frontmatter) -> str:
+    """Read from the stream until the frontmatter match cannot change.
+
+    On the whole content, FRONTMATTER_PATTERN prefers the longest opening
+    delimiter line (whitespace after '---' up to a newline) and takes all
+    whitespace after the closing '---'. A match on the text read so far
+    is therefore final only if it uses the longest opening delimiter
+    line and non-whitespace text follows it.
+    """
+    head = stream.read(chunk_chars)
+    if skip_frontmatter:
+        return head
+    while len(head) < MAX_FRONTMATTER_CHARS and not _frontmatter_settled(head):
+        chunk = stream.read(chunk_chars)
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+def _frontmatter_settled(head: str) -> bool:
+    """Check whether more text after head could change the frontmatter match."""
+    if len(head) < 3:
+        return False
+    if not head.startswith("---"):
+        return True
+    match = FRONTMATTER_PATTERN.match(head)
+    return bool(
+        match
+        and match.start(1) == FRONTMATTER_OPENER_PATTERN.match(head).end()
+        and NON_SPACE_PATTERN.search(head, match.end())
+    )
+
+
+def _parse_mapped(
+    file_path: Path,
+    result: ValidationResult,
+    config: Config,
+    file_rule: FileRule | None,
+) -> ParsedPrompt | None:
+    """Parse a memory-mapped file, recording tags as spans of the mapping.
+
+    Returns:
+        The ParsedPrompt, or None (with result untouched) if the file must
+        be read instead: it cannot be mapped, has carriage returns (which
+        reading translates), contains letters the bytes lexer does not
+        match, or has no settled frontmatter within MAX_FRONTMATTER_CHARS.
+    """
+    import mmap
+
+    try:
+        with open(file_path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # Empty files, pipes and the like
+    if data.find(b"\r") >= 0 or NON_ASCII_TAG_LETTERS_PATTERN.search(data):
+        return None
+
+    skip_frontmatter = file_rule and file_rule.skip_frontmatter
+    skip_required_tags = file_rule and file_rule.skip_required_tags
+
+    # Decode just enough of the start to settle the frontmatter
+    head = ""
+    head_bytes = min(len(data), 1024)
+    while not skip_frontmatter:
+        end = head_bytes
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1  # Do not split a UTF-8 sequence
+        head = data[:end].decode("utf-8")
+        if end == len(data) or _frontmatter_settled(head):
+            break
+        if head_bytes >= MAX_FRONTMATTER_CHARS:
+            return None
+        head_bytes = min(len(data), head_bytes * 4)
+
+    # Validate the encoding and count tokens over the whole text
+    counter = tokens.TokenCounter(
+        config.validation.tokens.tokenizer,
+        max_tokens=config.validation.tokens.count_bound,
+    )
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for start in range(0, len(data), STREAM_CHUNK_CHARS):
+        counter.feed(decoder.decode(data[start : start + STREAM_CHUNK_CHARS]))
+    counter.feed(decoder.decode(b"", final=True))
+
+    # From here on, the same steps as parse_content
+    parsed = ParsedPrompt()
+    if skip_frontmatter:
+        parsed.frontmatter = None
+        parsed.frontmatter_end_line = 0
+    else:
+        parsed.frontmatter, parsed.frontmatter_end_line = _parse_frontmatter(
+            head, result, config
+        )
+
+    if parsed.frontmatter and parsed.frontmatter.get("reference") is True:
+        _set_token_count(counter.total(), result, config)
+        return parsed
+
+    frontmatter = _frontmatter_match(head, skip_frontmatter) or ""
+    events = lex_tags_bytes(
+        data, len(frontmatter.encode("utf-8")), parsed.frontmatter_end_line + 1
+    )
+    _check_tag_balance(events, result, config)
+    pairs = pair_events(events)
+    parsed.tags = TagList(
+        _make_span_tag(data, open_event, close_event)
+        for open_event, close_event in pairs
+    )
+
+    _check_tag_structure(parsed, events, result, config, skip_required_tags)
+
+    parsed_token_count = counter.total()
+    block_counts = _BlockTokenCounts(config, file_rule)
+    if parsed_token_count >= _block_count_threshold(config, block_counts.tag_limits):
+        for tag, (open_event, close_event) in zip(parsed.tags, pairs):
+            block = data[open_event.start : close_event.end].decode("utf-8")
+            block_counts.add(tag, block)
+        block_counts.check(parsed_token_count, result)
+    _set_token_count(parsed_token_count, result, config)
+    _check_token_limits(result, config)
+    return parsed
+
+
+# ASCII characters str.strip removes
+_ASCII_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f")
+
+
+def _make_span_tag(data, open_event: TagEvent, close_event: TagEvent) -> SpanTag:
+    """Build the SpanTag for a matched pair, trimming ASCII whitespace."""
+    start = open_event.end
+    end = close_event.start
+    while start < end and data[start] in _ASCII_WHITESPACE:
+        start += 1
+    while end > start and data[end - 1] in _ASCII_WHITESPACE:
+        end -= 1
+    return SpanTag(
+        open_event.name, data, start, end, open_event.line, close_event.line
+    )
+
+
+class _StreamPairing:
+    """Pairs tag events as they are lexed, keeping text only while needed.
+
+    Follows pair_events: each opening tag is paired with the next closing
+    tag of the same name. While an opening tag waits for its closing tag,
+    the text and events after it are kept; if the input ends first, the
+    opening tag is skipped and the kept events are paired again.
+
+    Each tag is emitted with the text of its block, tags included.
+    """
+
+    def __init__(self, emit: Callable[[Tag, str], None]) -> None:
+        self.emit = emit
+        self.waiting: TagEvent | None = None  # Opening tag awaiting its close
+        self.events: list[TagEvent] = []  # Events from the waiting tag on
+        self.pieces: list[str] = []  # Text from the waiting tag on
+
+    def feed(self, text: str, offset: int, events: list[TagEvent]) -> None:
+        """Add lexed text and the events found in it."""
+        waiting = self.waiting
+        for event in events:
+            if waiting is None:
+                if event.kind == "open":
+                    waiting = self.waiting = event
+                    self.events = [event]
+                    self.pieces = []
+            elif event.kind == "close" and event.name == waiting.name:
+                start = max(waiting.start - offset, 0)
+                self.pieces.append(text[start : event.end - offset])
+                block = "".join(self.pieces)
+                self.emit(_make_tag_from(block, waiting.start, waiting, event), block)
+                waiting = self.waiting = None
+                self.events = []
+                self.pieces = []
+            else:
+                self.events.append(event)
+        if waiting is not None:
+            self.pieces.append(text[max(waiting.start - offset, 0) :])
+
+    def close(self) -> None:
+        """Pair what is left at the end of the input."""
+        if self.waiting is None:
+            return
+        block = "".join(self.pieces)
+        block_start = self.waiting.start
+        for open_event, close_event in pair_events(self.events):
+            self.emit(
+                _make_tag_from(block, block_start, open_event, close_event),
+                block[open_event.start - block_start : close_event.end - block_start],
+            )
+        self.waiting = None
+        self.events = []
+        self.pieces = []
+
+
+class _StreamedTags:
+    """Tags of a streamed parse: passed on, and summarized for the checks.
+
+    The summary keeps the first tag of each name (for the required tag
+    check) and the first tags in the configured order, up to one more
+    than the order has names: the order check stops at the first
+    mismatch, which is at or before that position.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        on_tag: Callable[[Tag], None] | None,
+        block_counts: "_BlockTokenCounts",
+    ) -> None:
+        self.on_tag = on_tag
+        self.block_counts = block_counts
+        self.tag_positions = config.compiled.tag_positions
+        self.ordered_limit = len(config.validation.tag_order) + 1
+        self.ordered_count = 0
+        self.names: set[str] = set()
+        self.summary: list[Tag] = []
+        self.tags = TagList()
+
+    def add(self, tag: Tag, block: str) -> None:
+        self.block_counts.add(tag, block)
+        if self.on_tag is None:
+            self.tags.append(tag)
+        else:
+            self.on_tag(tag)
+
+        keep = tag.name not in self.names
+        self.names.add(tag.name)
+        if tag.name.lower() in self.tag_positions:
+            if self.ordered_count < self.ordered_limit:
+                keep = True
+            self.ordered_count += 1
+        if keep:
+            self.summary.append(Tag(tag.name, "", tag.start_line, tag.end_line))
+
+
+class _BlockTokenCounts:
+    """Token counts of the blocks of limited tags, for files not held whole.
+
+    Streamed and memory-mapped files are not encoded as one text that
+    tokens can be attributed from (see tokens.count_tokens_by_span), so
+    the block of each tag with a token limit is counted on its own. Such
+    a count can differ from the in-memory one by a token or so at the
+    block's edges. The tags kept for the check have no content.
+    """
+
+    def __init__(self, config: Config, file_rule: FileRule | None) -> None:
+        self.config = config
+        self.tag_limits = _tag_token_limits(config, file_rule)
+        self.tags: list[Tag] = []
+
+    def add(self, tag: Tag, block: str) -> None:
+        """Count the block of tag if its tag has token limits."""
+        if tag.name.lower() not in self.tag_limits:
+            return
+        tag.token_count = _count_tokens(block, self.config)
+        self.tags.append(
+            Tag(tag.name, "", tag.start_line, tag.end_line, tag.token_count)
+        )
+
+    def check(self, token_count: int, result: ValidationResult) -> None:
+        """Check the counted blocks of a file of token_count tokens."""
+        if token_count >= _block_count_threshold(self.config, self.tag_limits):
+            _check_tag_token_limits(
+                self.tags, token_count, self.tag_limits, result, self.config
+            )
+
+
+def reparse(
+    parsed: ParsedPrompt,
+    edits: list[TextEdit],
+    result: ValidationResult | None = None,
+    config: Config | None = None,
+    file_rule: FileRule | None = None,
+) -> tuple[ParsedPrompt, ValidationResult]:
+    """Update a parse after text edits.
+
+    Produces the same ParsedPrompt and errors as parse_content on the
+    edited text, doing only the work the edits require:
+
+    - Only the lines touched by the edits are lexed again; tag events
+      after them are shifted.
+    - Tag objects whose content did not change are reused (moved to new
+      lines when lines were added or removed above them).
+    - The frontmatter YAML is parsed again only if the frontmatter text
+      changed.
+    - Tokens are counted per segment (see tokens.count_tokens_incremental),
+      so only segments that changed are encoded again. Documents that
+      reach a token limit are encoded once more to count their blocks.
+
+    Tag balance, nesting, required tags and tag order are derived from
+    the whole tag event stream again, which is cheap. Documents whose
+    frontmatter boundaries change, reference documents and parses without
+    reusable state fall back to parse_content.
+
+    Args:
+        parsed: Result of parse_content or reparse for the text before the
+            edits. It is not modified.
+        edits: Edits in the order they were made. Offsets of each edit
+            refer to the text after the edits before it.
+        result: ValidationResult to populate. Defaults to a new result for
+            the same file path as the previous parse.
+        config: Configuration object. Defaults to the previous parse's.
+        file_rule: File rule for the document. Defaults to the previous
+            parse's.
+
+    Returns:
+        Tuple of (ParsedPrompt, ValidationResult) for the edited text.
+    """
+    state = parsed._state
+    if config is None:
+        config = state.config if state else shared_config()
+    if file_rule is None and state is not None:
+        file_rule = state.file_rule
+    if result is None:
+        result = ValidationResult(file_path=state.file_path if state else "")
+
+    old_content = parsed.raw_content
+    content, start, old_end, new_end = _apply_edits(old_content, edits)
+
+    if state is None or state.key != _state_key(config, file_rule):
+        return parse_content(content, result, config, file_rule)
+
+    # Frontmatter: reuse it (and its errors) when its text is unchanged
+    skip_frontmatter = file_rule and file_rule.skip_frontmatter
+    frontmatter_match = _frontmatter_match(content, skip_frontmatter)
+    if frontmatter_match != state.frontmatter_match or (
+        frontmatter_match is None and not skip_frontmatter
+    ):
+        return parse_content(content, result, config, file_rule)
+
+    new_parsed = ParsedPrompt(
+        frontmatter=parsed.frontmatter,
+        frontmatter_end_line=parsed.frontmatter_end_line,
+        raw_content=content,
+    )
+    result.errors.extend(state.frontmatter_errors)
+    body_start = len(frontmatter_match or "")
+
+    # Lines: reuse line starts outside the edited range
+    old_index = state.line_index
+    line_index = old_index.replaced(content, start, old_end, new_end)
+    line_delta = len(line_index) - len(old_index)
+    delta = new_end - old_end
+
+    # Tags never span lines, so only whole lines around the edit are lexed
+    window_start = max(old_index.line_start(old_index.line_of(start)), body_start)
+    old_window_end = old_index.line_end(old_index.line_of(old_end))
+    window_end = old_window_end + delta
+
+    old_events = state.events
+    before = [event for event in old_events if event.end <= window_start]
+    after = [event for event in old_events if event.start >= old_window_end]
+    if delta or line_delta:
+        after = [
+            TagEvent(
+                event.kind,
+                event.name,
+                event.start + delta,
+                event.end + delta,
+                event.line + line_delta,
+            )
+            for event in after
+        ]
+    events = before
+    events.extend(lex_tags(content, window_start, line_index, window_end))
+    events.extend(after)
+
+    _check_tag_balance(events, result, config)
+
+    # Tags: reuse the objects of pairs that lie entirely outside the window
+    pairs = pair_events(events)
+    tags = TagList()
+    tags_by_span: dict[tuple[int, int], Tag] = {}
+    old_tags = state.tags_by_span
+    for open_event, close_event in pairs:
+        tag = None
+        if close_event.end <= window_start:
+            tag = old_tags.get((open_event.start, close_event.start))
+        elif open_event.start >= window_end:
+            tag = old_tags.get((open_event.start - delta, close_event.start - delta))
+            if tag is not None and line_delta:
+                tag = Tag(
+                    tag.name,
+                    tag.content,
+                    tag.start_line + line_delta,
+                    tag.end_line + line_delta,
+                )
+        if tag is None:
+            tag = _make_tag(content, open_event, close_event)
+        elif tag.token_count is not None:
+            # Counted in the previous text; counted again below if needed
+            tag = Tag(tag.name, tag.content, tag.start_line, tag.end_line)
+        tags.append(tag)
+        tags_by_span[(open_event.start, close_event.start)] = tag
+    new_parsed.tags = tags
+
+    skip_required_tags = file_rule and file_rule.skip_required_tags
+    _check_tag_structure(new_parsed, events, result, config, skip_required_tags)
+
+    token_count, segment_counts = tokens.count_tokens_incremental(
+        content, state.segment_counts, config.validation.tokens.tokenizer
+    )
+    token_count = _count_tokens_by_block(
+        content, new_parsed, pairs, body_start, result, config, file_rule, token_count
+    )
+    _set_token_count(token_count, result, config)
+    _check_token_limits(result, config)
+
+    new_parsed._state = _ParseState(
+        key=state.key,
+        config=config,
+        file_rule=file_rule,
+        file_path=result.file_path,
+        line_index=line_index,
+        events=events,
+        frontmatter_match=frontmatter_match,
+        frontmatter_errors=state.frontmatter_errors,
+        tags_by_span=tags_by_span,
+        segment_counts=segment_counts,
+    )
+    return new_parsed, result
+
+
+def _apply_edits(content: str, edits: list[TextEdit]) -> tuple[str, int, int, int]:
+    """Apply edits in order.
+
+    Returns:
+        Tuple of (new content, start, old_end, new_end): the smallest range
+        outside of which the old and new content are identical.
+    """
+    start = len(content)
+    end = 0  # In the coordinates of the current content
+    for edit in edits:
+        if not 0 <= edit.start <= edit.end <= len(content):
+            raise ValueError(
+                f"Edit range {edit.start}-{edit.end} outside content of "
+                f"length {len(content)}"
+            )
+        content = content[: edit.start] + edit.text + content[edit.end :]
+        edit_delta = len(edit.text) - (edit.end - edit.start)
+        if end >= edit.end:
+            end += edit_delta
+        elif end > edit.start:
+            end = edit.start + len(edit.text)
+        start = min(start, edit.start)
+        end = max(end, edit.start + len(edit.text))
+
+    if not edits:
+        return content, 0, 0, 0
+    old_length = len(content) - sum(
+        len(edit.text) - (edit.end - edit.start) for edit in edits
+    )
+    return content, start, end - (len(content) - old_length), end
+
+
+def _frontmatter_match(content: str, skip_frontmatter) -> str | None:
+    """Return the frontmatter block (with delimiters) that parsing would use."""
+    if skip_frontmatter or not content.startswith("---"):
+        return None
+    match = FRONTMATTER_PATTERN.match(content)
+    return match.group(0) if match else None
+
+
 def _parse_frontmatter(
     content: str,
-    lines: list[str],
     result: ValidationResult,
     config: Config,
 ) -> tuple[dict | None, int]:
@@ -184,10 +976,9 @@ def _parse_frontmatter(
     frontmatter_text = match.group(0)
     end_line = frontmatter_text.count("\n")
 
-    # Parse YAML
     try:
-        frontmatter = yaml.safe_load(yaml_content)
-    except yaml.YAMLError as e:
+        frontmatter = load_frontmatter(yaml_content)
+    except FrontmatterError as e:
         result.add_error(1, f"Invalid YAML in frontmatter: {e}")
         return None, end_line
 
@@ -203,132 +994,150 @@ def _parse_frontmatter(
     return frontmatter, end_line
 
 
-def _extract_tags(
-    body: str,
-    body_start_line: int,
-    all_lines: list[str],
+def _make_tag(content: str, open_event: TagEvent, close_event: TagEvent) -> Tag:
+    """Build the Tag for a matched pair of tag events."""
+    return Tag(
+        name=open_event.name,
+        content=content[open_event.end : close_event.start].strip(),
+        start_line=open_event.line,
+        end_line=close_event.line,
+    )
+
+
+def _make_tag_from(
+    text: str, text_start: int, open_event: TagEvent, close_event: TagEvent
+) -> Tag:
+    """Build a Tag from text that starts at offset text_start of the input."""
+    return Tag(
+        name=open_event.name,
+        content=text[
+            open_event.end - text_start : close_event.start - text_start
+        ].strip(),
+        start_line=open_event.line,
+        end_line=close_event.line,
+    )
+
+
+def _check_tag_balance(
+    events: list[TagEvent],
     result: ValidationResult,
     config: Config,
-) -> list[Tag]:
-    """Extract XML tags from body content.
+) -> None:
+    """Report unrecognized, unclosed and extra closing tags."""
+    balance = _TagBalance(config)
+    for event in events:
+        balance.add(event)
+    balance.report(result)
 
-    Returns:
-        List of Tag objects.
+
+class _TagBalance:
+    """Unrecognized, unclosed and extra closing tag check, fed event by event.
+
+    Only the tags not yet matched by count are remembered, so a balanced
+    stream needs memory for its distinct tag names only.
     """
-    tags: list[Tag] = []
-    recognized_tags = config.validation.all_tags
-
-    # Find all opening tags
-    open_tags: dict[str, list[int]] = {}  # tag_name -> [line_numbers]
-    for i, line in enumerate(all_lines[body_start_line:], start=body_start_line + 1):
-        for match in OPEN_TAG_PATTERN.finditer(line):
-            tag_name = match.group(1).lower()
-            if tag_name not in open_tags:
-                open_tags[tag_name] = []
-            open_tags[tag_name].append(i)
-
-    # Find all closing tags
-    close_tags: dict[str, list[int]] = {}  # tag_name -> [line_numbers]
-    for i, line in enumerate(all_lines[body_start_line:], start=body_start_line + 1):
-        for match in CLOSE_TAG_PATTERN.finditer(line):
-            tag_name = match.group(1).lower()
-            if tag_name not in close_tags:
-                close_tags[tag_name] = []
-            close_tags[tag_name].append(i)
-
-    # Check for unrecognized tags
-    all_found_tags = set(open_tags.keys()) | set(close_tags.keys())
-    for tag_name in all_found_tags:
-        if tag_name not in recognized_tags:
-            line_num = (open_tags.get(tag_name, [0]) + close_tags.get(tag_name, [0]))[0]
-            result.add_error(line_num, f"Unrecognized tag: <{tag_name}>")
-
-    # Check for unclosed tags
-    for tag_name, open_lines in open_tags.items():
-        close_lines = close_tags.get(tag_name, [])
-        if len(open_lines) > len(close_lines):
-            for line_num in open_lines[len(close_lines) :]:
+
+    def __init__(self, config: Config) -> None:
+        self.recognized_tags = config.compiled.recognized_tags
+        # First line of each name, in first-appearance order
+        self.first_open: dict[str, int] = {}
+        self.first_close: dict[str, int] = {}
+        self.seen_tags: dict[str, None] = {}
+        # Lines of opening (or closing) tags in excess of the other kind
+        self.open_lines: dict[str, deque[int]] = {}
+        self.close_lines: dict[str, deque[int]] = {}
+
+    def add(self, event: TagEvent) -> None:
+        name = event.name
+        self.seen_tags.setdefault(name)
+        if event.kind == "open":
+            self.first_open.setdefault(name, event.line)
+            excess, other = self.open_lines, self.close_lines
+        else:
+            self.first_close.setdefault(name, event.line)
+            excess, other = self.close_lines, self.open_lines
+        lines = other.get(name)
+        if lines:
+            lines.popleft()
+        else:
+            excess.setdefault(name, deque()).append(event.line)
+
+    def report(self, result: ValidationResult) -> None:
+        # Check for unrecognized tags
+        for tag_name in self.seen_tags:
+            if tag_name not in self.recognized_tags:
+                # Line of the first opening tag (0 when there is none)
+                line_num = self.first_open.get(tag_name, 0)
+                result.add_error(line_num, f"Unrecognized tag: <{tag_name}>")
+
+        # Check for unclosed tags: the last opening tags beyond the closing count
+        for tag_name in self.first_open:
+            for line_num in self.open_lines.get(tag_name, ()):
                 result.add_error(line_num, f"Unclosed tag: <{tag_name}>")
 
-    # Check for extra closing tags
-    for tag_name, close_lines in close_tags.items():
-        open_lines = open_tags.get(tag_name, [])
-        if len(close_lines) > len(open_lines):
-            for line_num in close_lines[len(open_lines) :]:
+        # Check for extra closing tags
+        for tag_name in self.first_close:
+            for line_num in self.close_lines.get(tag_name, ()):
                 result.add_error(line_num, f"Extra closing tag: </{tag_name}>")
 
-    # Extract matched tag pairs with content
-    for match in TAG_PAIR_PATTERN.finditer(body):
-        tag_name = match.group(1).lower()
-        tag_content = match.group(2)
-
-        # Calculate line numbers
-        start_pos = match.start()
-        end_pos = match.end()
-        start_line = body[:start_pos].count("\n") + body_start_line + 1
-        end_line = body[:end_pos].count("\n") + body_start_line + 1
-
-        tags.append(
-            Tag(
-                name=tag_name,
-                content=tag_content.strip(),
-                start_line=start_line,
-                end_line=end_line,
-            )
-        )
 
-    return tags
+def _check_tag_structure(
+    parsed: ParsedPrompt,
+    events: list[TagEvent],
+    result: ValidationResult,
+    config: Config,
+    skip_required_tags: bool,
+) -> None:
+    """Check nesting, required tags and tag order."""
+    _check_nesting(events, result, config)
+    if not skip_required_tags:
+        _check_required_tags(parsed, result, config)
+    _check_tag_order(parsed, result, config)
 
 
 def _check_nesting(
-    body: str,
-    body_start_line: int,
-    all_lines: list[str],
+    events: list[TagEvent],
     result: ValidationResult,
     config: Config,
 ) -> None:
     """Check for illegally nested tags."""
-    recognized_tags = config.validation.all_tags
-
-    # Track open tags as we scan
-    open_stack: list[tuple[str, int]] = []  # (tag_name, line_number)
-
-    for i, line in enumerate(all_lines[body_start_line:], start=body_start_line + 1):
-        # Process in order of appearance
-        events: list[tuple[int, str, str]] = []  # (position, type, tag_name)
-
-        for match in OPEN_TAG_PATTERN.finditer(line):
-            tag_name = match.group(1).lower()
-            if tag_name in recognized_tags:
-                events.append((match.start(), "open", tag_name))
-
-        for match in CLOSE_TAG_PATTERN.finditer(line):
-            tag_name = match.group(1).lower()
-            if tag_name in recognized_tags:
-                events.append((match.start(), "close", tag_name))
-
-        # Sort by position in line
-        events.sort(key=lambda x: x[0])
-
-        for _, event_type, tag_name in events:
-            if event_type == "open":
-                if open_stack:
-                    parent_tag, parent_line = open_stack[-1]
-                    result.add_error(
-                        i,
-                        f"Nested tag detected: <{tag_name}> inside <{parent_tag}> (opened at line {parent_line})",
-                    )
-                open_stack.append((tag_name, i))
-            else:  # close
-                if open_stack and open_stack[-1][0] == tag_name:
-                    open_stack.pop()
-                elif open_stack:
-                    # Mismatched close tag
-                    expected_tag, _ = open_stack[-1]
-                    result.add_error(
-                        i,
-                        f"Mismatched closing tag: expected </{expected_tag}>, found </{tag_name}>",
-                    )
+    nesting = _TagNesting(config)
+    for event in events:
+        nesting.add(event, result)
+
+
+class _TagNesting:
+    """Nesting check, fed event by event."""
+
+    def __init__(self, config: Config) -> None:
+        self.recognized_tags = config.compiled.recognized_tags
+        # Track open tags as we scan
+        self.open_stack: list[tuple[str, int]] = []  # (tag_name, line_number)
+
+    def add(self, event: TagEvent, result: ValidationResult) -> None:
+        tag_name = event.name
+        if tag_name not in self.recognized_tags:
+            return
+
+        open_stack = self.open_stack
+        if event.kind == "open":
+            if open_stack:
+                parent_tag, parent_line = open_stack[-1]
+                result.add_error(
+                    event.line,
+                    f"Nested tag detected: <{tag_name}> inside <{parent_tag}> (opened at line {parent_line})",
+                )
+            open_stack.append((tag_name, event.line))
+        else:  # close
+            if open_stack and open_stack[-1][0] == tag_name:
+                open_stack.pop()
+            elif open_stack:
+                # Mismatched close tag
+                expected_tag, _ = open_stack[-1]
+                result.add_error(
+                    event.line,
+                    f"Mismatched closing tag: expected </{expected_tag}>, found </{tag_name}>",
+                )
 
 
 def _check_required_tags(
@@ -351,27 +1160,27 @@ def _check_tag_order(
     if not config.validation.enforce_tag_order:
         return
 
-    tag_order = config.validation.tag_order
-    if not tag_order:
+    tag_positions = config.compiled.tag_positions
+    if not tag_positions:
         return
 
-    # Get actual tag names in document order
-    actual_tags = [tag.name.lower() for tag in parsed.tags]
-
-    # Filter to only tags that are in the configured order
-    actual_ordered = [t for t in actual_tags if t in tag_order]
+    # Get actual tags in document order, filtered to those in the configured order
+    ordered_tag_objs = [
+        tag for tag in parsed.tags if tag.name.lower() in tag_positions
+    ]
+    actual_ordered = [tag.name.lower() for tag in ordered_tag_objs]
+    actual_tags = set(actual_ordered)
 
     # Get expected order for tags that are present
-    expected_ordered = [t for t in tag_order if t in actual_tags]
+    expected_ordered = [t for t in config.validation.tag_order if t in actual_tags]
 
     # Compare
     if actual_ordered != expected_ordered:
         # Find the first out-of-order tag
         for i, actual_tag in enumerate(actual_ordered):
             if i >= len(expected_ordered) or actual_tag != expected_ordered[i]:
-                # Find the tag object to get line number
-                tag_obj = parsed.get_tag(actual_tag)
-                line_num = tag_obj.start_line if tag_obj else 0
+                # Use the offending occurrence for the line number
+                line_num = ordered_tag_objs[i].start_line
 
                 # Determine what was expected
                 if i < len(expected_ordered):
@@ -388,32 +1197,171 @@ def _check_tag_order(
                 break
 
 
-def _count_tokens(content: str) -> int:
-    """Count tokens in content using tiktoken."""
-    if not TIKTOKEN_AVAILABLE:
-        # Fallback: rough estimate (1 token ≈ 4 chars)
-        return len(content) // 4
+def _count_tokens(content: str, config: Config) -> int:
+    """Count tokens in content using the configured tokenizer."""
+    tokens_config = config.validation.tokens
+    return tokens.count_tokens(
+        content, tokens_config.tokenizer, tokens_config.count_bound
+    )
 
-    try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(content))
-    except Exception:
-        return len(content) // 4
 
+def _count_tokens_by_block(
+    content: str,
+    parsed: ParsedPrompt,
+    pairs: list[tuple[TagEvent, TagEvent]],
+    body_start: int,
+    result: ValidationResult,
+    config: Config,
+    file_rule: FileRule | None,
+    token_count: int | None = None,
+) -> int:
+    """Count tokens in content, and per block if it reaches a limit.
+
+    Blocks are counted when the total reaches warn_at or the lowest tag
+    limit that applies to the file. The counts of the frontmatter and
+    each tag come from the same single encoding as the total (see
+    tokens.count_tokens_by_span). They are set on parsed and its tags,
+    summed by tag name in result's token_breakdown (largest first), and
+    checked against the tag limits.
+
+    Unless counting is exact, encoding stops once the count reaches
+    fail_at. Only the blocks that end before that point are then counted
+    and checked, and the breakdown covers just those; the others keep a
+    token_count of None.
+
+    Args:
+        token_count: Token count of content, if already counted. Content
+            is then only encoded to count blocks.
+    """
+    tag_limits = _tag_token_limits(config, file_rule)
+    min_tokens = _block_count_threshold(config, tag_limits)
+    if token_count is not None and token_count < min_tokens:
+        return token_count
 
-def _check_token_limits(
+    spans = [(open_event.start, close_event.end) for open_event, close_event in pairs]
+    if body_start:
+        spans.append((0, body_start))
+
+    tokens_config = config.validation.tokens
+    token_count, span_counts = tokens.count_tokens_by_span(
+        content, spans, tokens_config.tokenizer, min_tokens, tokens_config.count_bound
+    )
+    if span_counts is None:
+        return token_count
+
+    breakdown: dict[str, int] = {}
+    if body_start:
+        parsed.frontmatter_token_count = span_counts.pop()
+        if parsed.frontmatter_token_count is not None:
+            breakdown["frontmatter"] = parsed.frontmatter_token_count
+    for tag, span_count in zip(parsed.tags, span_counts):
+        tag.token_count = span_count
+        if span_count is not None:
+            label = f"<{tag.name}>"
+            breakdown[label] = breakdown.get(label, 0) + span_count
+    result.token_breakdown = dict(
+        sorted(breakdown.items(), key=lambda item: item[1], reverse=True)
+    )
+    _check_tag_token_limits(parsed.tags, token_count, tag_limits, result, config)
+    return token_count
+
+
+def _tag_token_limits(
+    config: Config, file_rule: FileRule | None
+) -> dict[str, TagTokenLimits]:
+    """Return the token limits by tag name that apply to a file."""
+    tag_limits = config.validation.tokens.tags
+    if file_rule and file_rule.tag_tokens:
+        tag_limits = {**tag_limits, **file_rule.tag_tokens}
+    return tag_limits
+
+
+def _block_count_threshold(
+    config: Config, tag_limits: dict[str, TagTokenLimits]
+) -> int:
+    """Return the token count from which a file's blocks are counted.
+
+    That is warn_at or the lowest limit in tag_limits, whichever is lower.
+    """
+    return min(
+        [config.validation.tokens.warn_at]
+        + [
+            limit
+            for limits in tag_limits.values()
+            for limit in (limits.warn_at, limits.fail_at)
+            if limit is not None
+        ]
+    )
+
+
+def _check_tag_token_limits(
+    tags: list[Tag],
+    token_count: int,
+    tag_limits: dict[str, TagTokenLimits],
+    result: ValidationResult,
+    config: Config,
+) -> None:
+    """Check the token count of each tag block against its tag's limits.
+
+    Tags whose block was not counted are skipped. When the file's count
+    stopped at fail_at, blocks are reported against that bound without
+    a share.
+    """
+    bound = config.validation.tokens.count_bound
+    for tag in tags:
+        limits = tag_limits.get(tag.name.lower())
+        if limits is None or tag.token_count is None:
+            continue
+        if bound is not None and token_count >= bound:
+            count_text = f"{tag.token_count} of >= {bound}"
+        else:
+            share = tag.token_count / token_count if token_count else 0.0
+            count_text = f"{tag.token_count}, {share:.0%} of {token_count}"
+        if limits.fail_at is not None and tag.token_count >= limits.fail_at:
+            result.add_error(
+                tag.start_line,
+                f"<{tag.name}> token count ({count_text}) exceeds fail threshold "
+                f"({limits.fail_at})",
+            )
+        elif limits.warn_at is not None and tag.token_count >= limits.warn_at:
+            result.add_warning(
+                tag.start_line,
+                f"<{tag.name}> token count ({count_text}) exceeds warn threshold "
+                f"({limits.warn_at})",
+            )
+
+
+def _set_token_count(
     token_count: int, result: ValidationResult, config: Config
 ) -> None:
-    """Check token count against configured limits."""
+    """Record a token count, as a bound if counting may have stopped early.
+
+    Unless counting is exact, any count reaching fail_at is recorded as
+    fail_at and marked inexact, whether or not it was counted in full, so
+    results do not depend on which counts happened to be cached.
+    """
+    bound = config.validation.tokens.count_bound
+    if bound is not None and token_count >= bound:
+        result.token_count = bound
+        result.token_count_exact = False
+    else:
+        result.token_count = token_count
+        result.token_count_exact = True
+
+
+def _check_token_limits(result: ValidationResult, config: Config) -> None:
+    """Check the recorded token count against configured limits."""
     tokens_config = config.validation.tokens
+    token_count = result.token_count
+    count_text = result.token_count_text
 
     if token_count >= tokens_config.fail_at:
         result.add_error(
             0,
-            f"Token count ({token_count}) exceeds fail threshold ({tokens_config.fail_at})",
+            f"Token count ({count_text}) exceeds fail threshold ({tokens_config.fail_at})",
         )
     elif token_count >= tokens_config.warn_at:
         result.add_warning(
             0,
-            f"Token count ({token_count}) exceeds warn threshold ({tokens_config.warn_at})",
+            f"Token count ({count_text}) exceeds warn threshold ({tokens_config.warn_at})",
         )
@@ -8,13 +8,16 @@ Performs LLM-assisted and pattern-based validation:
 
 import re
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator
 
-from .config import Config, load_config
+from .config import Config, shared_config
 from .errors import ValidationResult
+from .lexer import LineIndex
 from .parser import ParsedPrompt, Tag
 
 
-@dataclass
+@dataclass(slots=True)
 class AmbiguousMatch:
     """A detected ambiguous language pattern."""
 
@@ -39,18 +42,18 @@ def check_ambiguous_language(
         List of AmbiguousMatch objects found.
     """
     if config is None:
-        config = load_config()
+        config = shared_config()
 
     matches: list[AmbiguousMatch] = []
 
-    # Get instructions tag
-    instructions = parsed.get_tag("instructions")
-    if instructions is None:
-        return matches
-
-    # Check for ambiguous patterns
-    patterns = config.validation.ambiguous_patterns
-    matches = _find_ambiguous_patterns(instructions, patterns)
+    # Check every instructions block for ambiguous patterns
+    compiled = config.compiled
+    for instructions in parsed.get_tags("instructions"):
+        matches.extend(
+            _match_ambiguous_patterns(
+                instructions, compiled.ambiguous_patterns, compiled.ambiguous_matcher
+            )
+        )
 
     # Add errors for each match
     for match in matches:
@@ -64,6 +67,9 @@ def check_ambiguous_language(
 def _find_ambiguous_patterns(tag: Tag, patterns: list[str]) -> list[AmbiguousMatch]:
     """Find ambiguous patterns in a tag's content.
 
+    Reports each pattern at most once per line, ordered by line and then by
+    the pattern's position in the configuration.
+
     Args:
         tag: The tag to search.
         patterns: List of ambiguous patterns to match.
@@ -71,29 +77,134 @@ def _find_ambiguous_patterns(tag: Tag, patterns: list[str]) -> list[AmbiguousMat
     Returns:
         List of AmbiguousMatch objects.
     """
+    return _match_ambiguous_patterns(
+        tag, patterns, compile_ambiguous_patterns(tuple(patterns))
+    )
+
+
+def _match_ambiguous_patterns(
+    tag: Tag, patterns: list[str] | tuple[str, ...], matcher: "AmbiguousMatcher"
+) -> list[AmbiguousMatch]:
+    """Find ambiguous patterns in a tag's content with a compiled matcher."""
+    content = tag.content
+    content_lower = content.lower()
+
+    # Collect (line_number, pattern_position) hits, one per pattern per line
+    hits: set[tuple[int, int]] = set()
+    line_index = None
+    for offset, position in matcher.finditer(content_lower):
+        if line_index is None:
+            line_index = LineIndex(content_lower, first_line=tag.start_line)
+        hits.add((line_index.line_of(offset), position))
+
     matches: list[AmbiguousMatch] = []
-    lines = tag.content.split("\n")
-
-    for i, line in enumerate(lines):
-        line_number = tag.start_line + i
-        line_lower = line.lower()
-
-        for pattern in patterns:
-            # Use word boundary matching to avoid false positives
-            # e.g., "delivery" shouldn't match "maybe"
-            regex = _pattern_to_regex(pattern)
-            if regex.search(line_lower):
-                matches.append(
-                    AmbiguousMatch(
-                        pattern=pattern,
-                        line=line_number,
-                        context=line.strip(),
-                    )
-                )
+    if not hits:
+        return matches
+
+    # Lowercasing can change lengths for some characters; context comes
+    # from the original content
+    if len(content_lower) != len(content):
+        line_index = LineIndex(content, first_line=tag.start_line)
+
+    for line_number, position in sorted(hits):
+        line_start = line_index.line_start(line_number)
+        line_end = line_index.line_end(line_number)
+        matches.append(
+            AmbiguousMatch(
+                pattern=patterns[position],
+                line=line_number,
+                context=content[line_start:line_end].strip(),
+            )
+        )
 
     return matches
 
 
+class AmbiguousMatcher:
+    """Finds every configured ambiguous pattern in a single scan.
+
+    The patterns are merged into one word-bounded alternation, arranged as a
+    prefix trie so the regex engine never retries shared prefixes. The
+    alternation sits in a lookahead, so the scan stops at every position
+    where some pattern starts, including overlapping ones. Only those
+    positions are checked against the individual patterns.
+    """
+
+    def __init__(self, patterns: tuple[str, ...]) -> None:
+        self.patterns = patterns
+
+        # Individual patterns, grouped by lowercase first character
+        self._candidates: dict[str, list[tuple[int, re.Pattern]]] = {}
+        for position, pattern in enumerate(patterns):
+            self._candidates.setdefault(pattern[:1].lower(), []).append(
+                (position, _pattern_to_regex(pattern))
+            )
+        # An empty pattern can match anywhere
+        self._anywhere = self._candidates.pop("", [])
+
+        self._scan = None
+        if patterns:
+            alternation = _trie_regex([p.lower() for p in patterns])
+            self._scan = re.compile(rf"\b(?=(?:{alternation})\b)", re.IGNORECASE)
+
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yield (offset, pattern_position) for every pattern occurrence.
+
+        Args:
+            text: Text to search (expected to be lowercased).
+        """
+        if self._scan is None:
+            return
+
+        for match in self._scan.finditer(text):
+            offset = match.start()
+            candidates = self._candidates.get(text[offset : offset + 1], [])
+            for position, regex in candidates + self._anywhere:
+                if regex.match(text, offset):
+                    yield offset, position
+
+
+@lru_cache(maxsize=32)
+def compile_ambiguous_patterns(patterns: tuple[str, ...]) -> AmbiguousMatcher:
+    """Return the (cached) matcher for a tuple of ambiguous patterns."""
+    return AmbiguousMatcher(patterns)
+
+
+def _trie_regex(words: list[str]) -> str:
+    """Build a regex alternation of words arranged as a prefix trie.
+
+    Args:
+        words: Literal strings to match.
+
+    Returns:
+        Regex source matching any of the words.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # End of word
+
+    def build(node: dict) -> str:
+        branches = []
+        optional = False
+        for char, child in sorted(node.items()):
+            if char == "":
+                optional = True
+                continue
+            branches.append(re.escape(char) + build(child))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            # Prefer the longer match, but allow stopping here
+            body = f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
 def _pattern_to_regex(pattern: str) -> re.Pattern:
     """Convert an ambiguous pattern to a word-boundary regex.
 
@@ -127,7 +238,7 @@ def validate_semantic(
         Updated ValidationResult.
     """
     if config is None:
-        config = load_config()
+        config = shared_config()
 
     # Skip semantic checks if disabled
     if not config.validation.semantic_check:
@@ -0,0 +1,175 @@
+"""Tests for the persistent result cache."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from prompt_lang import cache as cache_module
+from prompt_lang import tokens
+from prompt_lang import validate as validate_module
+from prompt_lang.cache import ResultCache
+from prompt_lang.config import FileRule, load_config
+from prompt_lang.errors import ValidationResult
+from prompt_lang.validate import main, validate_directory, validate_file
+
+# Test fixtures directory
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+VALID_DIR = FIXTURES_DIR / "valid"
+INVALID_DIR = FIXTURES_DIR / "invalid"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "cache")
+
+
+class TestResultCache:
+    """Tests for ResultCache storage."""
+
+    def test_put_then_get(self, cache):
+        config = load_config()
+        key = cache.make_key(b"content", [], config)
+        result = ValidationResult(file_path="a.md", token_count=12)
+        result.add_error(3, "Unclosed tag: <purpose>")
+        result.add_warning(0, "Token count (12) exceeds warn threshold (10)")
+
+        cache.put(key, result)
+        cached = cache.get(key, "b.md")
+
+        assert cached.file_path == "b.md"
+        assert cached.errors == result.errors
+        assert cached.warnings == result.warnings
+        assert cached.token_count == 12
+        assert cached.cached
+
+    def test_miss_returns_none(self, cache):
+        assert cache.get("0" * 64, "a.md") is None
+
+    def test_corrupt_entry_is_a_miss(self, cache):
+        key = cache.make_key(b"content", [], load_config())
+        cache.put(key, ValidationResult(file_path="a.md"))
+        entry = next((cache.cache_dir / key[:2]).glob("*.json"))
+        entry.write_text("{not json")
+
+        assert cache.get(key, "a.md") is None
+
+    def test_key_depends_on_inputs(self, cache):
+        config = load_config()
+        base = cache.make_key(b"content", [], config)
+
+        assert cache.make_key(b"content", [], config) == base
+        assert cache.make_key(b"changed", [], config) != base
+        assert cache.make_key(b"content", [FileRule(pattern="*.md")], config) != base
+
+        changed = load_config()
+        changed.validation.tokens.fail_at = 1
+        assert cache.make_key(b"content", [], changed) != base
+
+    def test_config_fingerprinted_once(self, cache, monkeypatch):
+        config = load_config()
+        calls = []
+        monkeypatch.setattr(
+            cache_module,
+            "config_fingerprint",
+            lambda config: calls.append(config) or "fingerprint",
+        )
+        for content in (b"a", b"b", b"c"):
+            cache.make_key(content, [], config)
+        assert calls == [config]
+
+    def test_prune_removes_least_recently_used(self, tmp_path):
+        cache = ResultCache(tmp_path / "cache", max_bytes=0)
+        config = load_config()
+        keys = [cache.make_key(str(i).encode(), [], config) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, ValidationResult(file_path="a.md"))
+            path = cache.cache_dir / key[:2] / f"{key}.json"
+            os.utime(path, (i, i))
+
+        size = (cache.cache_dir / keys[2][:2] / f"{keys[2]}.json").stat().st_size
+        cache.max_bytes = size
+
+        assert cache.prune() == 2
+        assert cache.get(keys[2], "a.md") is not None
+        assert cache.get(keys[0], "a.md") is None
+
+
+class TestCachedValidation:
+    """Tests for validation through the cache."""
+
+    def test_unchanged_file_not_parsed(self, cache, monkeypatch):
+        config = load_config()
+        first = validate_file(INVALID_DIR / "unclosed-tag.md", config, cache)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("file should be answered from the cache")
+
+        monkeypatch.setattr(validate_module, "parse_content", fail)
+        second = validate_file(INVALID_DIR / "unclosed-tag.md", config, cache)
+
+        assert not first.cached
+        assert second.cached
+        assert second.errors == first.errors
+        assert second.file_path == first.file_path
+
+    def test_changed_file_revalidated(self, cache, tmp_path):
+        config = load_config()
+        prompt = tmp_path / "prompt.md"
+        prompt.write_text((VALID_DIR / "minimal.md").read_text())
+        assert validate_file(prompt, config, cache).passed
+
+        prompt.write_text((INVALID_DIR / "unclosed-tag.md").read_text())
+        result = validate_file(prompt, config, cache)
+
+        assert not result.cached
+        assert not result.passed
+
+    def test_hit_when_tokenizer_fails_to_load(self, cache, monkeypatch):
+        tiktoken = pytest.importorskip("tiktoken")
+
+        def get_encoding(name):
+            raise ConnectionError(f"cannot download {name}")
+
+        monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+        monkeypatch.setattr(tokens, "_encoders", {})
+        config = load_config()
+        validate_file(VALID_DIR / "minimal.md", config, cache)
+
+        monkeypatch.setattr(tokens, "_encoders", {})
+        assert validate_file(VALID_DIR / "minimal.md", config, cache).cached
+
+    def test_directory_results_match_uncached(self, cache):
+        config = load_config()
+        uncached = validate_directory(FIXTURES_DIR, config)
+        validate_directory(FIXTURES_DIR, config, cache=cache)
+        cached = validate_directory(FIXTURES_DIR, config, cache=cache)
+
+        assert all(r.cached for r in cached)
+        assert [(r.file_path, r.errors, r.warnings) for r in cached] == [
+            (r.file_path, r.errors, r.warnings) for r in uncached
+        ]
+
+    def test_main_no_cache(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        main([str(VALID_DIR / "minimal.md"), "--no-cache"])
+        assert not (tmp_path / ".prompt_lang_cache").exists()
+
+        main([str(VALID_DIR / "minimal.md")])
+        assert (tmp_path / ".prompt_lang_cache").exists()
+
+    def test_main_persists_token_counts(self, tmp_path, monkeypatch):
+        class SplitEncoding:
+            def encode(self, text):
+                return text.split()
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(tokens, "_encoders", {"cl100k_base": SplitEncoding()})
+        monkeypatch.setattr(tokens, "COUNT_CACHE", tokens.TokenCountCache())
+        main([str(VALID_DIR / "minimal.md"), "--no-daemon"])
+
+        saved = tokens.TokenCountCache()
+        saved.load(ResultCache(".prompt_lang_cache").token_counts_path)
+        content = (VALID_DIR / "minimal.md").read_text()
+        key = saved.make_key(content, "tiktoken:cl100k_base")
+        assert saved.get(key) == len(content.split())
@@ -0,0 +1,246 @@
+"""Tests for configuration loading."""
+
+import os
+import pickle
+
+import pytest
+
+from prompt_lang import config as config_module
+from prompt_lang.config import (
+    Config,
+    TagTokenLimits,
+    clear_config_cache,
+    load_config,
+    shared_config,
+)
+
+CONFIG_TEMPLATE = """validation:
+  tokens:
+    warn_at: {warn_at}
+    fail_at: 4000
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "prompt-lang.config.yaml"
+    path.write_text(CONFIG_TEMPLATE.format(warn_at=100))
+    return path
+
+
+class TestConfigCache:
+    """Tests for memoized config loading."""
+
+    def test_file_read_once(self, config_file, monkeypatch):
+        reads = []
+        read_config = config_module._read_config
+        monkeypatch.setattr(
+            config_module,
+            "_read_config",
+            lambda path: reads.append(path) or read_config(path),
+        )
+
+        load_config(config_file)
+        load_config(config_file)
+        shared_config(config_file)
+
+        assert len(reads) == 1
+
+    def test_shared_config_is_reused(self, config_file):
+        assert shared_config(config_file) is shared_config(config_file)
+
+    def test_load_config_returns_private_copy(self, config_file):
+        first = load_config(config_file)
+        first.validation.tokens.warn_at = 1
+        first.validation.required_tags.append("context")
+
+        second = load_config(config_file)
+        assert second.validation.tokens.warn_at == 100
+        assert "context" not in second.validation.required_tags
+
+    def test_edited_file_reloaded(self, config_file):
+        assert load_config(config_file).validation.tokens.warn_at == 100
+
+        config_file.write_text(CONFIG_TEMPLATE.format(warn_at=2500))
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert load_config(config_file).validation.tokens.warn_at == 2500
+
+    def test_clear_config_cache(self, config_file):
+        first = shared_config(config_file)
+        clear_config_cache()
+        assert shared_config(config_file) is not first
+
+    def test_missing_file_uses_defaults(self, tmp_path):
+        config = load_config(tmp_path / "missing.yaml")
+        assert config == Config()
+
+
+class TestCompiledConfig:
+    """Tests for the precompiled configuration."""
+
+    def test_recognized_tags(self):
+        compiled = load_config().compiled
+        assert isinstance(compiled.recognized_tags, frozenset)
+        assert {"purpose", "instructions", "examples"} <= compiled.recognized_tags
+
+    def test_copies_share_compiled_form(self):
+        assert load_config().compiled is load_config().compiled
+
+    def test_modification_recompiles(self):
+        config = load_config()
+        before = config.compiled
+        config.validation.optional_tags.append("custom")
+
+        assert config.compiled is not before
+        assert "custom" in config.compiled.recognized_tags
+        assert "custom" not in before.recognized_tags
+
+    @pytest.mark.parametrize(
+        "modify",
+        [
+            lambda c: c.validation.tag_order.insert(0, "context"),
+            lambda c: setattr(c.validation, "enforce_tag_order", False),
+            lambda c: c.validation.directives.patterns.update(DEFAULT="^X$"),
+            lambda c: c.file_rules.append(config_module.FileRule("*.txt")),
+            lambda c: c.file_rules[0].tag_tokens.clear(),
+            lambda c: c.validation.ambiguous_patterns.remove("maybe"),
+        ],
+    )
+    def test_nested_modification_recompiles(self, modify):
+        config = load_config()
+        config.validation.enforce_tag_order = True
+        config.validation.tag_order = ["purpose", "instructions"]
+        config.file_rules = [
+            config_module.FileRule("*.md", tag_tokens={"x": TagTokenLimits(1)})
+        ]
+        before = config.compiled
+
+        modify(config)
+
+        assert config.compiled is not before
+
+    def test_unchanged_config_not_fingerprinted(self, monkeypatch):
+        config = load_config()
+        config.compiled
+        calls = []
+        original = config_module._fingerprint
+        monkeypatch.setattr(
+            config_module, "_fingerprint", lambda c: calls.append(c) or original(c)
+        )
+
+        for _ in range(3):
+            config.compiled
+        assert calls == []
+
+    def test_pickled_config_recompiles(self):
+        config = pickle.loads(pickle.dumps(load_config()))
+        assert "purpose" in config.compiled.recognized_tags
+
+    def test_tag_positions_follow_order(self):
+        config = load_config()
+        config.validation.enforce_tag_order = True
+        config.validation.tag_order = ["purpose", "context", "instructions"]
+
+        assert dict(config.compiled.tag_positions) == {
+            "purpose": 0,
+            "context": 1,
+            "instructions": 2,
+        }
+
+    def test_tag_positions_empty_when_not_enforced(self):
+        config = load_config()
+        config.validation.enforce_tag_order = False
+        assert not config.compiled.tag_positions
+
+    def test_file_rule_matching(self):
+        compiled = load_config().compiled
+
+        rules = compiled.matching_file_rules("repo/agents/developer.md")
+        assert [rule.pattern for rule in rules] == ["*agents/*.md"]
+        assert compiled.first_file_rule("repo/CLAUDE.md").pattern == "*CLAUDE.md"
+        assert compiled.first_file_rule("repo/skills/x/SKILL.md") is None
+
+    def test_directive_patterns_compiled(self):
+        compiled = load_config().compiled
+        assert compiled.directive_patterns["DEFAULT"].match("DEFAULT @orchestrator")
+
+    def test_tag_token_limits(self, tmp_path):
+        path = tmp_path / "prompt-lang.config.yaml"
+        path.write_text(
+            "validation:\n"
+            "  tokens:\n"
+            "    tags:\n"
+            "      Examples: {warn_at: 800, fail_at: 1500}\n"
+            "      context: {fail_at: 500}\n"
+            "file_rules:\n"
+            "  - pattern: '*agents/*.md'\n"
+            "    tag_tokens:\n"
+            "      examples: {warn_at: 200}\n"
+        )
+        config = load_config(path)
+
+        assert config.validation.tokens.tags == {
+            "examples": TagTokenLimits(warn_at=800, fail_at=1500),
+            "context": TagTokenLimits(fail_at=500),
+        }
+        assert config.file_rules[0].tag_tokens == {
+            "examples": TagTokenLimits(warn_at=200)
+        }
+
+    def test_tokenizer_backends(self, tmp_path):
+        path = tmp_path / "prompt-lang.config.yaml"
+        path.write_text(
+            "validation:\n"
+            "  tokens:\n"
+            "    backend: bpe\n"
+            "    encoding: o200k_base\n"
+            "    bpe_file: vocab/o200k.tiktoken\n"
+            "    estimator: {words: 1.2, letters: 0.05}\n"
+            "    encoding_cache: encodings\n"
+        )
+        tokens = load_config(path).validation.tokens
+
+        assert tokens.tokenizer == f"bpe:o200k_base:{tmp_path}/vocab/o200k.tiktoken"
+        tokens.backend = "estimator"
+        assert tokens.tokenizer == "estimator:letters=0.05,words=1.2"
+        tokens.backend = "tiktoken"
+        assert tokens.tokenizer == f"o200k_base:{tmp_path}/encodings"
+        tokens.encoding_cache = None
+        assert tokens.tokenizer == "o200k_base"
+        assert load_config().validation.tokens.tokenizer == "cl100k_base"
+
+    @pytest.mark.parametrize(
+        "tokens_yaml, message",
+        [
+            ("backend: sentencepiece", "Unknown tokens.backend 'sentencepiece'"),
+            ("backend: bpe", "tokens.backend bpe needs tokens.bpe_file"),
+            ("estimator: {wordz: 1}", "Unknown tokens.estimator feature 'wordz'"),
+            ("estimator: {words: lots}", "tokens.estimator.words must be a number"),
+            ("fail_at: abc", "tokens.fail_at must be a number"),
+            ("tags: {examples: {warn_at: yes}}", "tokens.tags.examples.warn_at"),
+        ],
+    )
+    def test_invalid_token_settings_rejected(self, tmp_path, tokens_yaml, message):
+        path = tmp_path / "prompt-lang.config.yaml"
+        path.write_text(f"validation:\n  tokens:\n    {tokens_yaml}\n")
+
+        with pytest.raises(ValueError, match=message):
+            load_config(path)
+
+    def test_invalid_file_rule_tag_limit_rejected(self, tmp_path):
+        path = tmp_path / "prompt-lang.config.yaml"
+        path.write_text(
+            "file_rules:\n"
+            "  - pattern: '*.md'\n"
+            "    tag_tokens:\n"
+            "      examples: {fail_at: many}\n"
+        )
+
+        with pytest.raises(ValueError, match="tag_tokens.examples.fail_at"):
+            load_config(path)
+
+    def test_ambiguous_matcher(self):
+        matcher = load_config().compiled.ambiguous_matcher
+        assert list(matcher.finditer("do it, maybe")) == [(7, 0)]
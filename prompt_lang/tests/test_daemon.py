@@ -0,0 +1,160 @@
+"""Tests for the validation daemon."""
+
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from prompt_lang import daemon
+from prompt_lang.validate import (
+    EXIT_FILE_NOT_FOUND,
+    EXIT_SUCCESS,
+    EXIT_VALIDATION_ERROR,
+    main,
+    parse_args,
+    run_validation,
+)
+
+# Test fixtures directory
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+VALID_DIR = FIXTURES_DIR / "valid"
+INVALID_DIR = FIXTURES_DIR / "invalid"
+
+
+@pytest.fixture
+def socket_path(tmp_path, monkeypatch):
+    path = tmp_path / "d.sock"
+    monkeypatch.setenv(daemon.SOCKET_ENV_VAR, str(path))
+    return path
+
+
+@pytest.fixture
+def server(socket_path):
+    server = daemon.make_server(socket_path)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class TestDaemon:
+    """Tests for requests answered by a running daemon."""
+
+    def test_ping(self, server, socket_path):
+        response = daemon.request({"command": "ping"}, socket_path)
+        assert response["ok"] is True
+        assert response["pid"] == os.getpid()
+
+    def test_no_daemon_returns_none(self, socket_path):
+        assert daemon.request({"command": "ping"}, socket_path) is None
+        args = parse_args([str(VALID_DIR / "minimal.md")])
+        assert daemon.validate_remote(args) is None
+
+    def test_validate_matches_in_process(self, server):
+        """Results from the daemon equal an in-process run."""
+        args = parse_args([str(INVALID_DIR), "--no-cache"])
+        remote = daemon.validate_remote(args)
+        local = run_validation(args)
+
+        assert remote == local
+        assert any(not result.passed for result in remote)
+
+    def test_validate_runs_in_client_directory(self, server, tmp_path, monkeypatch):
+        """Relative paths are resolved against the client's working directory."""
+        (tmp_path / "prompt.md").write_text((VALID_DIR / "minimal.md").read_text())
+        monkeypatch.chdir(tmp_path)
+
+        results = daemon.validate_remote(parse_args(["prompt.md", "--no-cache"]))
+
+        assert [result.file_path for result in results] == ["prompt.md"]
+        assert results[0].passed
+
+    def test_validate_content(self, server):
+        content = (INVALID_DIR / "unclosed-tag.md").read_text()
+        result = daemon.validate_content_remote(content, "draft.md")
+
+        assert result.file_path == "draft.md"
+        assert not result.passed
+
+    def test_stale_daemon_is_not_used(self, server, socket_path):
+        response = daemon.request(
+            {"command": "validate", "fingerprint": "old", "cwd": ".", "args": {}},
+            socket_path,
+        )
+        assert response == {"stale": True}
+
+    def test_second_daemon_refused(self, server, socket_path):
+        with pytest.raises(RuntimeError):
+            daemon.make_server(socket_path)
+
+    def test_leftover_socket_replaced(self, socket_path):
+        """A socket file with no daemon behind it does not block startup."""
+        daemon.make_server(socket_path).server_close()
+        server = daemon.make_server(socket_path)
+        server.server_close()
+
+
+class TestThinClient:
+    """Tests for the CLI using the daemon."""
+
+    def test_main_uses_daemon(self, server, monkeypatch, capsys):
+        handled = []
+        handle_request = daemon.handle_request
+
+        def record(payload):
+            handled.append(payload["command"])
+            return handle_request(payload)
+
+        monkeypatch.setattr(daemon, "handle_request", record)
+        exit_code = main([str(VALID_DIR / "minimal.md"), "--no-cache"])
+
+        assert exit_code == EXIT_SUCCESS
+        assert handled == ["validate"]
+        assert "passed validation" in capsys.readouterr().out
+
+    def test_main_reports_daemon_errors(self, server, capsys):
+        exit_code = main(["missing.md", "--no-cache"])
+
+        assert exit_code == EXIT_FILE_NOT_FOUND
+        assert "Path not found" in capsys.readouterr().err
+
+    def test_main_falls_back_without_daemon(self, socket_path):
+        exit_code = main([str(INVALID_DIR / "unclosed-tag.md"), "--no-cache"])
+        assert exit_code == EXIT_VALIDATION_ERROR
+
+    def test_socket_of_another_user_not_used(self, server, monkeypatch):
+        """A socket another user created could serve forged results."""
+        handled = []
+        monkeypatch.setattr(daemon, "handle_request", handled.append)
+        uid = os.getuid()
+        monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+
+        exit_code = main([str(INVALID_DIR / "unclosed-tag.md"), "--no-cache"])
+
+        assert exit_code == EXIT_VALIDATION_ERROR
+        assert handled == []
+
+    def test_non_socket_not_used(self, socket_path):
+        socket_path.write_text("not a socket")
+        assert daemon.request({"command": "ping"}, socket_path) is None
+
+    def test_no_daemon_flag_validates_in_process(self, server, monkeypatch):
+        def fail(payload, socket_path=None):
+            raise AssertionError("contacted the daemon")
+
+        monkeypatch.setattr(daemon, "request", fail)
+        exit_code = main([str(VALID_DIR / "minimal.md"), "--no-cache", "--no-daemon"])
+        assert exit_code == EXIT_SUCCESS
+
+    def test_stop(self, socket_path):
+        server = daemon.make_server(socket_path)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+
+        assert main(["serve", "--stop", "--socket", str(socket_path)]) == 0
+        thread.join(timeout=5)
+        server.server_close()
+        assert not thread.is_alive()
@@ -0,0 +1,162 @@
+"""Tests for preloaded encodings."""
+
+import base64
+
+import pytest
+
+from prompt_lang import tokens
+from prompt_lang.encoding_cache import (
+    entry_path,
+    load_encoding,
+    tokenizer_cache_main,
+    write_encoding,
+)
+from prompt_lang.validate import main
+
+tiktoken = pytest.importorskip("tiktoken")
+
+
+@pytest.fixture
+def rank_file(tmp_path):
+    """Write a small rank file in tiktoken's format."""
+    path = tmp_path / "vendored.tiktoken"
+    ranks = [bytes([i]) for i in range(256)] + [b"ab", b" ab"]
+    lines = [f"{base64.b64encode(t).decode()} {r}\n" for r, t in enumerate(ranks)]
+    path.write_text("".join(lines))
+    return path
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Make tiktoken's own loading fail, as without network, and reset encoders."""
+
+    from tiktoken_ext import openai_public
+
+    def get_encoding(name):
+        raise ConnectionError(f"cannot download {name}")
+
+    def load_tiktoken_bpe(url, expected_hash=None):
+        raise ConnectionError(f"cannot download {url.rpartition('/')[2]}")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    monkeypatch.setattr(openai_public, "load_tiktoken_bpe", load_tiktoken_bpe)
+    monkeypatch.setattr(tokens, "_encoders", {})
+    monkeypatch.setattr(tokens, "COUNT_CACHE", tokens.TokenCountCache())
+
+
+class TestEncodingCache:
+    """Tests for write_encoding and load_encoding."""
+
+    def test_round_trip_from_rank_file(self, tmp_path, rank_file):
+        path = write_encoding(tmp_path / "cache", "cl100k_base", rank_file)
+        assert path == entry_path(tmp_path / "cache", "cl100k_base")
+
+        encoding = load_encoding(tmp_path / "cache", "cl100k_base")
+        assert encoding.name == "cl100k_base"
+        assert encoding.encode("ab ab abc") == [256, 257, 257, 99]
+        assert encoding.special_tokens_set == set(
+            tokens.BPE_SPECIAL_TOKENS["cl100k_base"]
+        )
+
+    def test_from_tiktoken(self, tmp_path, rank_file, monkeypatch):
+        from tiktoken_ext import openai_public
+
+        local = {
+            "name": "o200k_base",
+            "pat_str": tokens.BPE_PATTERNS["o200k_base"],
+            "mergeable_ranks": tiktoken.load.load_tiktoken_bpe(str(rank_file)),
+            "special_tokens": {"<|endoftext|>": 258},
+        }
+        monkeypatch.setitem(
+            openai_public.ENCODING_CONSTRUCTORS, "o200k_base", lambda: local
+        )
+
+        write_encoding(tmp_path, "o200k_base")
+        encoding = load_encoding(tmp_path, "o200k_base")
+        assert encoding.encode("ab ab<|endoftext|>", allowed_special="all") == [
+            256,
+            257,
+            258,
+        ]
+
+    def test_unknown_encoding(self, tmp_path):
+        with pytest.raises(ValueError, match="Unknown encoding"):
+            write_encoding(tmp_path, "cl200k_base")
+
+    @pytest.mark.parametrize("data", [b"", b"other", b"prompt_lang encoding v1\n\xff"])
+    def test_unreadable_entry_ignored(self, tmp_path, data):
+        entry_path(tmp_path, "cl100k_base").write_bytes(data)
+        assert load_encoding(tmp_path, "cl100k_base") is None
+        assert load_encoding(tmp_path / "missing", "cl100k_base") is None
+
+    def test_counting_uses_cache_offline(self, tmp_path, rank_file, offline):
+        write_encoding(tmp_path, "cl100k_base", rank_file)
+        name = f"cl100k_base:{tmp_path}"
+
+        assert tokens.count_tokens("ab ab abc", name) == 4
+        tokenizer = tokens.tokenizer_id(name)
+        assert tokenizer.startswith(f"{name}:")
+        assert tokenizer != tokens.tokenizer_id("cl100k_base")
+
+        # A rewritten entry does not share cached counts with the old one
+        path = entry_path(tmp_path, "cl100k_base")
+        path.write_bytes(path.read_bytes() + b"\n")
+        assert tokens.tokenizer_id(name) != tokenizer
+
+    @pytest.mark.parametrize("data", [None, b"prompt_lang encoding v1\n\xff"])
+    def test_missing_entry_raises(self, tmp_path, offline, data):
+        """A configured cache without the entry never downloads or estimates."""
+        if data is not None:
+            entry_path(tmp_path, "cl100k_base").write_bytes(data)
+
+        with pytest.raises(tokens.TokenizerError, match="tokenizer-cache"):
+            tokens.count_tokens("x" * 40, f"cl100k_base:{tmp_path}")
+
+    def test_missing_entry_is_config_error(self, tmp_path, offline, capsys):
+        config = tmp_path / "prompt-lang.config.yaml"
+        config.write_text("validation:\n  tokens:\n    encoding_cache: enc\n")
+        (tmp_path / "enc").mkdir()
+        prompt = tmp_path / "prompt.md"
+        prompt.write_text("---\nname: a\ndescription: b\n---\n")
+
+        argv = [str(prompt), "-c", str(config), "--no-daemon", "--no-cache"]
+        assert main(argv) == 2
+        assert "cl100k_base.bpe" in capsys.readouterr().err
+
+
+class TestTokenizerCacheCommand:
+    """Tests for prompt_lang tokenizer-cache."""
+
+    def test_writes_vendored_file(self, tmp_path, rank_file, capsys):
+        cache_dir = tmp_path / "cache"
+        argv = ["cl100k_base", "--from", str(rank_file), "--dir", str(cache_dir)]
+
+        assert tokenizer_cache_main(argv) == 0
+        assert load_encoding(cache_dir, "cl100k_base") is not None
+        out = capsys.readouterr().out
+        assert f"Wrote cl100k_base to {entry_path(cache_dir, 'cl100k_base')}" in out
+        assert "Set validation.tokens.encoding_cache" in out
+
+    def test_uses_configured_directory(self, tmp_path, rank_file, capsys):
+        config = tmp_path / "prompt-lang.config.yaml"
+        config.write_text(
+            "validation:\n  tokens:\n    encoding: p50k_base\n    encoding_cache: enc\n"
+        )
+
+        argv = ["--config", str(config), "--from", str(rank_file)]
+        assert main(["tokenizer-cache", *argv]) == 0
+        assert entry_path(tmp_path / "enc", "p50k_base").exists()
+        assert "Set validation" not in capsys.readouterr().out
+
+    def test_failure(self, tmp_path, offline, capsys):
+        assert tokenizer_cache_main(["cl100k_base", "--dir", str(tmp_path)]) == 1
+        assert "cannot download cl100k_base" in capsys.readouterr().err
+
+    def test_from_needs_known_encoding(self, tmp_path, rank_file, capsys):
+        argv = ["gpt9", "--from", str(rank_file), "--dir", str(tmp_path)]
+        assert tokenizer_cache_main(argv) == 1
+        assert "No split pattern for gpt9" in capsys.readouterr().err
+
+    def test_from_needs_one_encoding(self, rank_file):
+        with pytest.raises(SystemExit):
+            tokenizer_cache_main(["a", "b", "--from", str(rank_file)])
@@ -0,0 +1,139 @@
+"""Tests for frontmatter loading."""
+
+import pytest
+import yaml
+
+from prompt_lang import frontmatter
+from prompt_lang.frontmatter import FrontmatterError, FrontmatterStats, load_frontmatter
+
+# Differential corpus: every entry must load exactly as yaml.safe_load does
+CORPUS = [
+    # Flat mappings (fast path)
+    "",
+    "# only a comment",
+    "name: deploy\ndescription: Deploy the service",
+    "name: deploy\n\n# comment\n  # indented comment\ndescription: x",
+    "name:\ndescription:   \nmodel: # no value",
+    "on: push\nyes: 1x\nNo: off\nnull: Null\nTRUE: tRue",
+    "name: 'it''s'\ndescription: \"a: #b\"",
+    "name: C#\ndescription: uses [x] and {y}, too",
+    "url: http://example.com/a?b=c",
+    "name: trailing spaces   \ndescription: a  b",
+    "name: café\ndescription: naïve résumé",
+    "name: a\xa0\ndescription: \xa0a",
+    "name: first\nname: second",
+    "a-b: x\n_private: y\nk1: z",
+    # Everything else (libyaml, then pure Python)
+    "version: 1.0\ncount: 3\nhex: 0x1F\nsexagesimal: 1:30",
+    "created: 2024-01-01\nupdated: 2024-01-01 10:00:00",
+    "tools: [Read, Write]",
+    "tools:\n  - Read\n  - Write",
+    "nested:\n  key: value",
+    "description: >\n  folded\n  text",
+    "description: |\n  literal\n  text",
+    "description: first line\n  continued",
+    "name: \"escaped\\ttab \\u00e9\"",
+    "anchor: &a x\nalias: *a",
+    "base: &b {k: 1}\nmerged:\n  <<: *b",
+    "name: value # comment",
+    "'quoted key': x\n\"other\": y",
+    "key with spaces: x",
+    "- just\n- a list",
+    "plain scalar",
+    "name: ~",
+    "name: =",
+    "name:\tvalue",
+    "\ufeffname: value",
+    "name: !!str 3",
+    "name: !\nx: y",
+    "name: |#\n  text",
+    "name: {a: b?}",
+    "name: what?",
+    # Invalid YAML
+    "name: a: b",
+    "name: [unclosed",
+    "name: 'unclosed",
+    "  name: x\nother: y",
+    "name: @reserved",
+    "name: `reserved",
+    "name: x\n\tindented: y",
+]
+
+
+def safe_load_outcome(text):
+    try:
+        return "ok", repr(yaml.safe_load(text))
+    except yaml.YAMLError as e:
+        return "error", str(e)
+
+
+def load_outcome(text):
+    try:
+        return "ok", repr(load_frontmatter(text))
+    except FrontmatterError as e:
+        return "error", str(e)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """Count loading paths from zero."""
+    counts = FrontmatterStats()
+    monkeypatch.setattr(frontmatter, "STATS", counts)
+    return counts
+
+
+class TestLoadFrontmatter:
+    """Tests for load_frontmatter."""
+
+    @pytest.mark.parametrize("text", CORPUS)
+    def test_matches_safe_load(self, text):
+        assert load_outcome(text) == safe_load_outcome(text)
+
+    def test_flat_mapping_takes_fast_path(self, stats):
+        result = load_frontmatter("name: deploy\ndescription: Deploy it\nmodel: opus")
+        assert result == {"name": "deploy", "description": "Deploy it", "model": "opus"}
+        assert (stats.fast_path, stats.libyaml, stats.pure_python) == (1, 0, 0)
+
+    def test_booleans_and_nulls_on_fast_path(self, stats):
+        result = load_frontmatter("reference: true\nhidden: no\nmodel: null\ntools:")
+        assert result == {
+            "reference": True,
+            "hidden": False,
+            "model": None,
+            "tools": None,
+        }
+        assert stats.fast_path == 1
+
+    @pytest.mark.parametrize(
+        "text",
+        ["version: 1", "tools: [Read]", "tools:\n  - Read", "date: 2024-01-01"],
+    )
+    def test_other_documents_fall_back(self, stats, text):
+        assert load_frontmatter(text) == yaml.safe_load(text)
+        assert stats.fast_path == 0
+        assert stats.libyaml + stats.pure_python == 1
+
+    @pytest.mark.skipif(not yaml.__with_libyaml__, reason="libyaml not available")
+    def test_libyaml_used_when_available(self, stats):
+        load_frontmatter("tools: [Read, Write]")
+        assert stats.libyaml == 1
+
+    @pytest.mark.parametrize("text", ["name:\tvalue", "\ufeffname: value", "name: |#"])
+    def test_libyaml_divergences_use_safe_loader(self, stats, text):
+        assert load_outcome(text) == safe_load_outcome(text)
+        assert stats.pure_python == 1
+
+    def test_without_libyaml(self, stats, monkeypatch):
+        monkeypatch.setattr(yaml, "__with_libyaml__", False)
+        assert load_frontmatter("tools: [Read]") == {"tools": ["Read"]}
+        assert stats.pure_python == 1
+
+    def test_error_message_is_safe_loaders(self, stats):
+        with pytest.raises(FrontmatterError) as excinfo:
+            load_frontmatter("name: [unclosed")
+        assert excinfo.value.args == safe_load_outcome("name: [unclosed")[1:]
+        assert stats.pure_python == 1
+
+    def test_stats_format(self):
+        stats = FrontmatterStats(fast_path=3, libyaml=2, pure_python=1)
+        assert str(stats) == "Frontmatter: 3 fast path, 2 libyaml, 1 pure-Python YAML"
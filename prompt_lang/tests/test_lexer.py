@@ -0,0 +1,179 @@
+"""Tests for the single-pass tag lexer."""
+
+import re
+
+import pytest
+
+from prompt_lang.lexer import (
+    ChunkLexer,
+    LineIndex,
+    lex_tags,
+    lex_tags_bytes,
+    pair_events,
+)
+
+# Reference pattern the pairing logic must agree with
+TAG_PAIR_PATTERN = re.compile(
+    r"<([a-z][a-z0-9-]*)>(.*?)</\1>", re.DOTALL | re.IGNORECASE
+)
+
+
+class TestLexTags:
+    """Tests for lex_tags function."""
+
+    def test_events_in_document_order(self):
+        text = "<purpose>\nText\n</purpose>\n<instructions>1. Do</instructions>"
+        events = lex_tags(text)
+        assert [(e.kind, e.name, e.line) for e in events] == [
+            ("open", "purpose", 1),
+            ("close", "purpose", 3),
+            ("open", "instructions", 4),
+            ("close", "instructions", 4),
+        ]
+
+    def test_offsets_cover_tag_text(self):
+        text = "abc <purpose> def"
+        (event,) = lex_tags(text)
+        assert text[event.start : event.end] == "<purpose>"
+
+    def test_names_are_lowercased(self):
+        events = lex_tags("<PURPOSE></Purpose>")
+        assert [e.name for e in events] == ["purpose", "purpose"]
+
+    def test_names_are_interned(self):
+        first, second = lex_tags("<Purpose>\n<purpose>")
+        assert first.name is second.name
+
+    def test_first_line_offset(self):
+        text = "\n\n<purpose>"
+        events = lex_tags(text, line_index=LineIndex(text, first_line=10))
+        assert events[0].line == 12
+
+    def test_start_position(self):
+        text = "<purpose>\n<context>"
+        events = lex_tags(text, pos=1)
+        assert [(e.name, e.line) for e in events] == [("context", 2)]
+
+    def test_end_position(self):
+        text = "<purpose>\n<context>"
+        events = lex_tags(text, endpos=9)
+        assert [e.name for e in events] == ["purpose"]
+
+    def test_non_tags_ignored(self):
+        assert lex_tags("a < b and c > d, <1tag>, <>, </ purpose>") == []
+
+
+class TestLexTagsBytes:
+    """Tests for lexing UTF-8 bytes."""
+
+    def test_matches_lex_tags(self):
+        text = "é\n<Purpose>\nDéjà\n</purpose> <x-1></X-1>\n<context>"
+        data = text.encode("utf-8")
+
+        events = lex_tags_bytes(data)
+
+        expected = lex_tags(text)
+        assert [(e.kind, e.name, e.line) for e in events] == [
+            (e.kind, e.name, e.line) for e in expected
+        ]
+        assert [data[e.start : e.end].decode() for e in events] == [
+            text[e.start : e.end] for e in expected
+        ]
+
+    def test_first_line(self):
+        (event,) = lex_tags_bytes(b"a\n\n<purpose>", first_line=5)
+        assert event.line == 7
+
+
+class TestChunkLexer:
+    """Tests for lexing text fed in chunks."""
+
+    TEXT = "intro\n<purpose>\nText <b>\n</purpose>\n<context></context>"
+
+    @pytest.mark.parametrize("size", [1, 2, 5, 100])
+    def test_matches_lex_tags(self, size):
+        lexer = ChunkLexer(offset=3)
+        events = []
+        scanned = ""
+        for start in range(3, len(self.TEXT), size):
+            text, offset, found = lexer.feed(self.TEXT[start : start + size])
+            assert offset == 3 + len(scanned)
+            scanned += text
+            events.extend(found)
+        text, _, found = lexer.close()
+        events.extend(found)
+
+        assert scanned + text == self.TEXT[3:]
+        assert events == lex_tags(self.TEXT, pos=3)
+
+    def test_partial_line_carried(self):
+        lexer = ChunkLexer()
+        assert lexer.feed("<purp") == ("", 0, [])
+        text, offset, events = lexer.feed("ose>\nx")
+        assert (text, offset) == ("<purpose>\n", 0)
+        assert [(e.name, e.line) for e in events] == [("purpose", 1)]
+        assert lexer.close() == ("x", 10, [])
+
+
+class TestLineIndex:
+    """Tests for LineIndex."""
+
+    def test_line_of(self):
+        index = LineIndex("ab\ncd\n\nef")
+        assert [index.line_of(i) for i in range(10)] == [1, 1, 1, 2, 2, 2, 3, 4, 4, 4]
+
+    def test_line_bounds(self):
+        text = "ab\ncd\n\nef"
+        index = LineIndex(text)
+        assert len(index) == 4
+        spans = [text[index.line_start(n) : index.line_end(n)] for n in range(1, 5)]
+        assert spans == ["ab", "cd", "", "ef"]
+
+    def test_first_line(self):
+        index = LineIndex("a\nb", first_line=7)
+        assert index.line_of(2) == 8
+        assert index.line_start(8) == 2
+
+    @pytest.mark.parametrize(
+        "text,start,end,new",
+        [
+            ("ab\ncd\nef", 4, 4, "x\ny\n"),
+            ("ab\ncd\nef", 2, 6, ""),
+            ("ab\ncd\nef", 0, 8, "z"),
+            ("ab\n\n\ncd", 3, 4, "q"),
+            ("", 0, 0, "\n\n"),
+        ],
+    )
+    def test_replaced_matches_rebuild(self, text, start, end, new):
+        edited = text[:start] + new + text[end:]
+        index = LineIndex(text, first_line=3).replaced(
+            edited, start, end, start + len(new)
+        )
+        expected = LineIndex(edited, first_line=3)
+        assert len(index) == len(expected)
+        assert [index.line_of(i) for i in range(len(edited) + 1)] == [
+            expected.line_of(i) for i in range(len(edited) + 1)
+        ]
+
+
+class TestPairEvents:
+    """Tests for pair_events function."""
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "<a>1</a><b>2</b>",
+            "<a><b>x</b></a>",
+            "<a>1<a>2</a>3</a>",
+            "<a>unclosed<b>x</b>",
+            "</a><a>x</a>",
+            "<a>x</A><A>y</a>",
+            "<a><b></a></b>",
+            "<a>\nmulti\nline\n</a>",
+        ],
+    )
+    def test_matches_pair_regex(self, text):
+        """Pairs should match a non-greedy backreference scan."""
+        expected = [(m.start(), m.end()) for m in TAG_PAIR_PATTERN.finditer(text)]
+        pairs = pair_events(lex_tags(text))
+        assert [(o.start, c.end) for o, c in pairs] == expected
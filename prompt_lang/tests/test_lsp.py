@@ -0,0 +1,351 @@
+"""Tests for the Language Server Protocol server."""
+
+import json
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from prompt_lang import lsp
+from prompt_lang.config import load_config
+from prompt_lang.lexer import LineIndex
+from prompt_lang.lsp import (
+    SEVERITY_ERROR,
+    Document,
+    LanguageServer,
+    read_message,
+    serve_stdio,
+    to_diagnostics,
+    validate_document,
+)
+from prompt_lang.validate import validate_content
+
+# Test fixtures directory
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+VALID_DIR = FIXTURES_DIR / "valid"
+INVALID_DIR = FIXTURES_DIR / "invalid"
+
+TWO_BLOCKS = """---
+name: two-blocks
+description: Two instruction blocks
+---
+
+# Two Blocks
+
+<purpose>
+Exercise block reuse.
+</purpose>
+
+<instructions>
+1. EXECUTE maybe run the tests
+2. CHECK the logs
+</instructions>
+
+<directives>
+@import ./shared.md
+</directives>
+
+<instructions>
+1. VERIFY the output
+</instructions>
+"""
+
+
+def frame(message: dict) -> bytes:
+    body = json.dumps(message).encode("utf-8")
+    return f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+
+
+def read_all(data: bytes) -> list[dict]:
+    stream = BytesIO(data)
+    messages = []
+    while (message := read_message(stream)) is not None:
+        messages.append(message)
+    return messages
+
+
+def position(text: str, offset: int) -> dict:
+    """LSP position of an offset in ASCII text."""
+    line = text.count("\n", 0, offset)
+    return {"line": line, "character": offset - (text.rfind("\n", 0, offset) + 1)}
+
+
+def replace(document: Document, old: str, new: str) -> None:
+    """Apply an incremental change replacing the first occurrence of old."""
+    start = document.text.index(old)
+    document.apply_change(
+        {
+            "range": {
+                "start": position(document.text, start),
+                "end": position(document.text, start + len(old)),
+            },
+            "text": new,
+        }
+    )
+
+
+@pytest.fixture
+def config():
+    return load_config()
+
+
+class TestDocument:
+    """Tests for applying text edits."""
+
+    def test_incremental_change(self):
+        document = Document("file:///a.md", "line one\nline two\n")
+        document.apply_change(
+            {
+                "range": {
+                    "start": {"line": 1, "character": 5},
+                    "end": {"line": 1, "character": 8},
+                },
+                "text": "2",
+            }
+        )
+        assert document.text == "line one\nline 2\n"
+
+    def test_full_change(self):
+        document = Document("file:///a.md", "old")
+        document.apply_change({"text": "new"})
+        assert document.text == "new"
+
+    def test_utf16_positions(self):
+        """Characters outside the BMP count as two UTF-16 code units."""
+        document = Document("file:///a.md", "a\U0001f600b\n")
+        document.apply_change(
+            {
+                "range": {
+                    "start": {"line": 0, "character": 3},
+                    "end": {"line": 0, "character": 4},
+                },
+                "text": "c",
+            }
+        )
+        assert document.text == "a\U0001f600c\n"
+
+    def test_line_index_follows_changes(self, config):
+        document = Document("file:///a.md", TWO_BLOCKS)
+        validate_document(document, config)
+        assert document.line_index is document.parsed.line_index
+
+        replace(document, "maybe run", "run\n\nthen")
+        replace(document, "CHECK the logs\n", "")
+        replace(document, "</directives>", "</directives>\n")
+        expected = LineIndex(document.text)
+        assert len(document.line_index) == len(expected)
+        assert [document.line_index.line_start(n) for n in range(1, 20)] == [
+            expected.line_start(n) for n in range(1, 20)
+        ]
+
+    def test_position_past_end(self):
+        document = Document("file:///a.md", "one\ntwo")
+        assert document.offset_at({"line": 5, "character": 0}) == 7
+        assert document.offset_at({"line": 1, "character": 9}) == 7
+
+    def test_path_from_uri(self):
+        document = Document("file:///work/agents/my%20agent.md", "")
+        assert document.path == Path("/work/agents/my agent.md")
+
+
+class TestValidateDocument:
+    """Tests for validation with reused block results."""
+
+    @pytest.mark.parametrize(
+        "fixture",
+        sorted(VALID_DIR.glob("*.md")) + sorted(INVALID_DIR.glob("*.md")),
+        ids=lambda path: path.name,
+    )
+    def test_matches_validate_content(self, fixture, config):
+        text = fixture.read_text()
+        document = Document(fixture.as_uri(), text)
+
+        result = validate_document(document, config)
+        expected = validate_content(text, fixture, config)
+
+        assert result.errors == expected.errors
+        assert result.warnings == expected.warnings
+
+    def test_only_changed_block_rechecked(self, config):
+        document = Document("file:///two.md", TWO_BLOCKS)
+        validate_document(document, config)
+        assert document.blocks_checked == 5
+
+        replace(document, "VERIFY the output", "VERIFY perhaps the output")
+        result = validate_document(document, config)
+
+        # Semantic and step checks of the edited block only
+        assert document.blocks_checked == 2
+        expected = validate_content(document.text, Path("/two.md"), config)
+        assert result.errors == expected.errors
+
+    def test_shifted_blocks_reuse_results(self, config):
+        """Blocks that only moved keep their results, on their new lines."""
+        document = Document("file:///two.md", TWO_BLOCKS)
+        validate_document(document, config)
+
+        replace(document, "# Two Blocks\n", "# Two Blocks\n\nIntro.\n\n")
+        result = validate_document(document, config)
+
+        assert document.blocks_checked == 0
+        expected = validate_content(document.text, Path("/two.md"), config)
+        assert result.errors == expected.errors
+        assert any("maybe" in error.message for error in result.errors)
+
+    def test_diagnostics(self, config):
+        text = (INVALID_DIR / "unclosed-tag.md").read_text()
+        document = Document("file:///unclosed.md", text)
+        diagnostics = to_diagnostics(document, validate_document(document, config))
+
+        unclosed = [d for d in diagnostics if d["message"].startswith("Unclosed")]
+        assert unclosed[0]["severity"] == SEVERITY_ERROR
+        assert unclosed[0]["range"]["start"] == {"line": 11, "character": 0}
+        assert unclosed[0]["range"]["end"]["character"] == len("<instructions>")
+
+
+class TestLanguageServer:
+    """Tests for the JSON-RPC message flow."""
+
+    def test_session(self, config):
+        uri = "file:///two.md"
+        stdin = BytesIO(
+            frame({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+            + frame({"jsonrpc": "2.0", "method": "initialized", "params": {}})
+            + frame(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "textDocument/didOpen",
+                    "params": {
+                        "textDocument": {
+                            "uri": uri,
+                            "languageId": "markdown",
+                            "version": 1,
+                            "text": TWO_BLOCKS,
+                        }
+                    },
+                }
+            )
+            + frame(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "textDocument/didChange",
+                    "params": {
+                        "textDocument": {"uri": uri, "version": 2},
+                        "contentChanges": [
+                            {
+                                "range": {
+                                    "start": {"line": 11, "character": 11},
+                                    "end": {"line": 11, "character": 17},
+                                },
+                                "text": "",
+                            }
+                        ],
+                    },
+                }
+            )
+            + frame({"jsonrpc": "2.0", "id": 2, "method": "hover", "params": {}})
+            + frame({"jsonrpc": "2.0", "id": 3, "method": "shutdown"})
+            + frame({"jsonrpc": "2.0", "method": "exit"})
+        )
+        stdout = BytesIO()
+
+        assert serve_stdio(config, stdin, stdout) == 0
+
+        messages = read_all(stdout.getvalue())
+        assert messages[0]["id"] == 1
+        assert messages[0]["result"]["capabilities"]["textDocumentSync"]["change"] == 2
+
+        published = [m["params"] for m in messages if "method" in m]
+        assert [p["version"] for p in published] == [1, 2]
+        assert any("maybe" in d["message"] for d in published[0]["diagnostics"])
+        assert not any("maybe" in d["message"] for d in published[1]["diagnostics"])
+
+        assert messages[-2]["error"]["code"] == -32601
+        assert messages[-1] == {"jsonrpc": "2.0", "id": 3, "result": None}
+
+    def test_close_clears_diagnostics(self, config):
+        stdout = BytesIO()
+        server = LanguageServer(config, stdout)
+        text_document = {"uri": "file:///a.md", "version": 1, "text": "no frontmatter"}
+        server.handle(
+            {"method": "textDocument/didOpen", "params": {"textDocument": text_document}}
+        )
+        server.handle(
+            {
+                "method": "textDocument/didClose",
+                "params": {"textDocument": {"uri": "file:///a.md"}},
+            }
+        )
+
+        messages = read_all(stdout.getvalue())
+        assert messages[0]["params"]["diagnostics"]
+        assert messages[1]["params"] == {"uri": "file:///a.md", "diagnostics": []}
+        assert server.documents == {}
+
+    def test_bad_messages_answered_and_skipped(self, config):
+        body = b'{"jsonrpc": "2.0", "id": 1,'
+        stdin = BytesIO(
+            f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+            + body
+            + b"Content-Length: abc\r\n\r\n"
+            + frame({"jsonrpc": "2.0", "method": "textDocument/didChange"})
+            + frame({"jsonrpc": "2.0", "id": 2, "method": "shutdown"})
+            + frame({"jsonrpc": "2.0", "method": "exit"})
+        )
+        stdout = BytesIO()
+
+        assert serve_stdio(config, stdin, stdout) == 0
+
+        messages = read_all(stdout.getvalue())
+        assert [m["error"]["code"] for m in messages[:2]] == [-32700, -32700]
+        assert messages[0]["id"] is None
+        assert messages[2] == {"jsonrpc": "2.0", "id": 2, "result": None}
+
+    def test_failed_request_answered(self, config, monkeypatch):
+        stdout = BytesIO()
+        server = LanguageServer(config, stdout)
+
+        def fail(*args):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(server, "_respond", fail)
+        assert server.handle({"jsonrpc": "2.0", "id": 7, "method": "initialize"})
+
+        (message,) = read_all(stdout.getvalue())
+        assert message["id"] == 7
+        assert message["error"] == {"code": -32603, "message": "Internal error: boom"}
+
+    def test_failed_notification_reparses(self, config, monkeypatch, capsys):
+        stdout = BytesIO()
+        server = LanguageServer(config, stdout)
+        uri = "file:///a.md"
+        text_document = {"uri": uri, "version": 1, "text": TWO_BLOCKS}
+        server.handle(
+            {"method": "textDocument/didOpen", "params": {"textDocument": text_document}}
+        )
+        document = server.documents[uri]
+        assert document.parsed is not None
+
+        validate = lsp.validate_document
+        monkeypatch.setattr(lsp, "validate_document", lambda *args: 1 / 0)
+        change = {
+            "method": "textDocument/didChange",
+            "params": {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [{"text": TWO_BLOCKS.replace("maybe ", "")}],
+            },
+        }
+        assert server.handle(change)
+        assert "ZeroDivisionError" in capsys.readouterr().err
+        assert document.parsed is None
+
+        monkeypatch.setattr(lsp, "validate_document", validate)
+        change["params"]["textDocument"]["version"] = 3
+        server.handle(change)
+        published = read_all(stdout.getvalue())[-1]["params"]
+        assert published["version"] == 3
+        assert not any("maybe" in d["message"] for d in published["diagnostics"])
+
+    def test_exit_without_shutdown(self, config):
+        stdin = BytesIO(frame({"jsonrpc": "2.0", "method": "exit"}))
+        assert serve_stdio(config, stdin, BytesIO()) == 1
@@ -1,12 +1,22 @@
 """Tests for the structural parser."""
 
+from io import StringIO
 from pathlib import Path
 
 import pytest
 
-from prompt_lang.config import Config, load_config
+from prompt_lang.config import Config, FileRule, TagTokenLimits, load_config
 from prompt_lang.errors import ValidationResult
-from prompt_lang.parser import ParsedPrompt, parse_content, parse_file
+from prompt_lang.parser import (
+    ParsedPrompt,
+    SpanTag,
+    Tag,
+    TextEdit,
+    parse_content,
+    parse_file,
+    parse_stream,
+    reparse,
+)
 
 # Test fixtures directory
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
@@ -248,6 +258,227 @@ Test token counting.
         assert not result.passed
         assert any("token" in e.message.lower() for e in result.errors)
 
+    def test_count_stops_at_fail_threshold(self):
+        """Counting stops at fail_at, which is reported as a lower bound."""
+        content = "---\nname: a\ndescription: b\n---\n" + "word " * 4000
+        config = load_config()
+        config.validation.tokens.fail_at = 100
+
+        parsed, result = parse_content(
+            content, ValidationResult(file_path="test.md"), config
+        )
+
+        assert (result.token_count, result.token_count_exact) == (100, False)
+        assert result.token_count_text == ">= 100"
+        assert "Token count (>= 100) exceeds fail threshold (100)" in [
+            e.message for e in result.errors
+        ]
+        assert result.token_breakdown == {"frontmatter": parsed.frontmatter_token_count}
+
+    def test_blocks_before_bound_counted(self, tmp_path):
+        """Past fail_at, blocks encoded before counting stopped are checked."""
+        pytest.importorskip("tiktoken")
+        import base64
+
+        bpe_file = tmp_path / "bytes.tiktoken"
+        ranks = [f"{base64.b64encode(bytes([i])).decode()} {i}\n" for i in range(256)]
+        bpe_file.write_text("".join(ranks))
+        content = (
+            "---\nname: a\ndescription: b\n---\n\n"
+            "<purpose>\nTest.\n</purpose>\n\n"
+            "<instructions>\n" + "1. Do something. " * 50 + "\n</instructions>\n\n"
+            "<examples>\n" + "word " * 10000 + "\n</examples>\n"
+        )
+        config = load_config()
+        config.validation.tokens.backend = "bpe"
+        config.validation.tokens.bpe_file = str(bpe_file)
+        config.validation.tokens.fail_at = 1000
+        config.validation.tokens.tags = {
+            "instructions": TagTokenLimits(fail_at=100),
+            "examples": TagTokenLimits(fail_at=100),
+        }
+
+        parsed, result = parse_content(
+            content, ValidationResult(file_path="test.md"), config
+        )
+
+        purpose, instructions, examples = parsed.tags
+        assert not result.token_count_exact
+        assert examples.token_count is None
+        assert result.token_breakdown == {
+            "<instructions>": instructions.token_count,
+            "frontmatter": parsed.frontmatter_token_count,
+            "<purpose>": purpose.token_count,
+        }
+        assert [e.message for e in result.errors] == [
+            f"<instructions> token count ({instructions.token_count} of >= 1000) "
+            "exceeds fail threshold (100)",
+            "Token count (>= 1000) exceeds fail threshold (1000)",
+        ]
+
+    def test_exact_count_past_fail_threshold(self):
+        """With exact counting, files past fail_at get their full count."""
+        content = "---\nname: a\ndescription: b\n---\n" + "word " * 4000
+        config = load_config()
+        config.validation.tokens.fail_at = 100
+        config.validation.tokens.exact = True
+
+        parsed, result = parse_content(
+            content, ValidationResult(file_path="test.md"), config
+        )
+
+        assert result.token_count > 100
+        assert result.token_count_exact
+        assert result.token_breakdown == {"frontmatter": parsed.frontmatter_token_count}
+
+    def test_token_breakdown_past_warn_threshold(self):
+        """Files reaching warn_at get token counts per block."""
+        content = (
+            "---\nname: a\ndescription: b\n---\n\n"
+            "<purpose>\nTest.\n</purpose>\n\n"
+            "<instructions>\n" + "1. Do something. " * 50 + "\n</instructions>\n"
+        )
+        config = load_config()
+        config.validation.tokens.warn_at = 10
+
+        parsed, result = parse_content(
+            content, ValidationResult(file_path="test.md"), config
+        )
+
+        purpose, instructions = parsed.tags
+        assert parsed.frontmatter_token_count > 0
+        assert 0 < purpose.token_count < instructions.token_count
+        assert result.token_breakdown == {
+            "<instructions>": instructions.token_count,
+            "frontmatter": parsed.frontmatter_token_count,
+            "<purpose>": purpose.token_count,
+        }
+        assert sum(result.token_breakdown.values()) <= result.token_count
+
+    def test_no_token_breakdown_below_warn_threshold(self):
+        """Files below warn_at only get a total."""
+        parsed, result = parse_file(VALID_DIR / "minimal.md")
+
+        assert result.token_breakdown is None
+        assert parsed.frontmatter_token_count is None
+        assert all(tag.token_count is None for tag in parsed.tags)
+
+
+class TestTagTokenLimits:
+    """Tests for per-tag token limits."""
+
+    CONTENT = (
+        "---\nname: a\ndescription: b\n---\n\n"
+        "<purpose>\nTest.\n</purpose>\n\n"
+        "<instructions>\n" + "1. EXECUTE something. " * 20 + "\n</instructions>\n"
+    )
+
+    def parse(self, config, file_rule=None):
+        return parse_content(
+            self.CONTENT, ValidationResult(file_path="test.md"), config, file_rule
+        )
+
+    def test_fail_threshold_reports_line_and_share(self):
+        config = load_config()
+        config.validation.tokens.tags = {"instructions": TagTokenLimits(fail_at=50)}
+
+        parsed, result = self.parse(config)
+
+        instructions = parsed.get_tag("instructions")
+        share = instructions.token_count / result.token_count
+        assert [(e.line, e.message) for e in result.errors] == [
+            (
+                instructions.start_line,
+                f"<instructions> token count ({instructions.token_count}, "
+                f"{share:.0%} of {result.token_count}) exceeds fail threshold (50)",
+            )
+        ]
+        assert result.token_count < config.validation.tokens.warn_at
+
+    def test_warn_threshold(self):
+        config = load_config()
+        config.validation.tokens.tags = {
+            "instructions": TagTokenLimits(warn_at=50, fail_at=10000),
+            "purpose": TagTokenLimits(warn_at=50),
+        }
+
+        parsed, result = self.parse(config)
+
+        assert result.passed
+        assert [w.line for w in result.warnings] == [
+            parsed.get_tag("instructions").start_line
+        ]
+
+    def test_under_limits(self):
+        config = load_config()
+        config.validation.tokens.tags = {"instructions": TagTokenLimits(fail_at=1000)}
+
+        parsed, result = self.parse(config)
+
+        assert result.passed
+        assert not result.warnings
+        assert result.token_breakdown is None
+
+    def test_file_rule_overrides(self):
+        config = load_config()
+        config.validation.tokens.tags = {"instructions": TagTokenLimits(fail_at=50)}
+        file_rule = FileRule(
+            pattern="*.md", tag_tokens={"instructions": TagTokenLimits(warn_at=50)}
+        )
+
+        parsed, result = self.parse(config, file_rule)
+
+        assert result.passed
+        assert len(result.warnings) == 1
+
+    def test_reparse_matches_parse_content(self):
+        config = load_config()
+        config.validation.tokens.tags = {"instructions": TagTokenLimits(fail_at=50)}
+        before, _ = self.parse(config)
+        change = edit(self.CONTENT, "</instructions>", "More.\n</instructions>")
+
+        parsed, result = reparse(before, [change], ValidationResult("test.md"))
+
+        expected, expected_result = parse_content(
+            apply(self.CONTENT, [change]), ValidationResult("test.md"), config
+        )
+        assert parsed == expected
+        assert result == expected_result
+        assert [tag.token_count for tag in parsed.tags] == [
+            tag.token_count for tag in expected.tags
+        ]
+        assert before.get_tag("purpose").token_count is not None
+
+    @pytest.mark.parametrize("memory_map", [False, True], ids=["stream", "mmap"])
+    def test_checked_without_holding_file(self, tmp_path, memory_map):
+        """Streamed and memory-mapped files count limited blocks one by one."""
+        config = load_config()
+        config.validation.tokens.tags = {
+            "instructions": TagTokenLimits(fail_at=50),
+            "purpose": TagTokenLimits(warn_at=50),
+        }
+        if memory_map:
+            prompt = tmp_path / "prompt.md"
+            prompt.write_text(self.CONTENT)
+            parsed, result = parse_file(prompt, config, memory_map=True)
+        else:
+            parsed, result = parse_stream(
+                StringIO(self.CONTENT),
+                ValidationResult("test.md"),
+                config,
+                chunk_chars=16,
+            )
+
+        expected, expected_result = self.parse(config)
+        instructions = parsed.get_tag("instructions")
+        assert [e.line for e in result.errors] == [instructions.start_line]
+        assert "exceeds fail threshold (50)" in result.errors[0].message
+        assert not result.warnings
+        assert abs(
+            instructions.token_count - expected.get_tag("instructions").token_count
+        ) <= 1
+        assert result.token_breakdown is None
+
 
 class TestParsedPrompt:
     """Tests for ParsedPrompt helper methods."""
@@ -282,6 +513,55 @@ class TestParsedPrompt:
         assert not parsed.has_tag("variables")
         assert not parsed.has_tag("nonexistent")
 
+    def test_get_tags_returns_every_occurrence(self):
+        """get_tags should return repeated blocks in document order."""
+        content = """---
+name: test
+description: Repeated blocks
+---
+
+<purpose>
+The purpose.
+</purpose>
+
+<instructions>
+1. EXECUTE first
+</instructions>
+
+<instructions>
+1. EXECUTE second
+</instructions>
+"""
+        result = ValidationResult(file_path="test.md")
+        parsed, result = parse_content(content, result, load_config())
+
+        blocks = parsed.get_tags("instructions")
+        assert [t.content for t in blocks] == ["1. EXECUTE first", "1. EXECUTE second"]
+        assert parsed.get_tag("INSTRUCTIONS") is blocks[0]
+        assert parsed.get_tags("variables") == []
+
+    def test_index_follows_appended_tags(self):
+        """Tags appended after parsing should be found by lookups."""
+        parsed, result = parse_file(VALID_DIR / "minimal.md")
+
+        parsed.tags.append(Tag("variables", "x", 1, 1))
+        assert parsed.has_tag("variables")
+
+        parsed.tags.extend([Tag("purpose", "second", 2, 2)])
+        assert len(parsed.get_tags("purpose")) == 2
+
+        del parsed.tags[0]
+        assert len(parsed.get_tags("purpose")) == 1
+
+    def test_index_follows_assigned_list(self):
+        """Assigning a plain list should keep lookups working."""
+        parsed = ParsedPrompt()
+        parsed.tags = [Tag("context", "c", 1, 3)]
+
+        assert parsed.get_tag("context").content == "c"
+        parsed.tags.append(Tag("output", "o", 4, 6))
+        assert parsed.has_tag("output")
+
 
 class TestTagOrder:
     """Tests for tag order validation."""
@@ -599,3 +879,216 @@ Missing required tags should fail.
 
         assert not result.passed
         assert any("<purpose>" in e.message for e in result.errors)
+
+
+def edit(text: str, old: str, new: str) -> TextEdit:
+    """Edit replacing the first occurrence of old with new."""
+    start = text.index(old)
+    return TextEdit(start, start + len(old), new)
+
+
+def apply(text: str, edits: list[TextEdit]) -> str:
+    for change in edits:
+        text = text[: change.start] + change.text + text[change.end :]
+    return text
+
+
+class TestReparse:
+    """Tests for incremental reparsing after edits."""
+
+    def assert_matches_parse_content(self, text, edits, config):
+        before, _ = parse_content(text, ValidationResult("test.md"), config)
+        parsed, result = reparse(before, edits, ValidationResult("test.md"))
+        expected, expected_result = parse_content(
+            apply(text, edits), ValidationResult("test.md"), config
+        )
+        assert parsed == expected
+        assert result == expected_result
+        return before, parsed
+
+    @pytest.mark.parametrize(
+        "old,new",
+        [
+            ("# Deploy Service\n", "# Deploy Service\nwith more lines\n"),
+            ("<context>", "<contxt>"),
+            ("</instructions>", ""),
+            ("\n<", "\n<purpose>\n</purpose>\n<"),
+            ("1.", "<output>1.</output>"),
+        ],
+    )
+    def test_matches_parse_content(self, old, new):
+        config = load_config()
+        text = (VALID_DIR / "deploy-service.md").read_text()
+        self.assert_matches_parse_content(text, [edit(text, old, new)], config)
+
+    def test_multiple_edits_in_sequence(self):
+        config = load_config()
+        text = (VALID_DIR / "full.md").read_text()
+        first = edit(text, "<", "\n\n<")
+        second = edit(apply(text, [first]), "</purpose>", "</context>")
+        self.assert_matches_parse_content(text, [first, second], config)
+
+    def test_unchanged_tags_reused(self):
+        config = load_config()
+        text = (VALID_DIR / "full.md").read_text()
+        before, parsed = self.assert_matches_parse_content(
+            text, [edit(text, "</purpose>", "More purpose.\n</purpose>")], config
+        )
+        assert parsed.frontmatter is before.frontmatter
+        purpose_index = [tag.name for tag in before.tags].index("purpose")
+        assert parsed.tags[:purpose_index] == before.tags[:purpose_index]
+        assert all(
+            old is new
+            for old, new in zip(
+                before.tags[:purpose_index], parsed.tags[:purpose_index]
+            )
+        )
+        # Later tags keep their content on shifted lines
+        later = before.tags[purpose_index + 1 :]
+        assert [tag.start_line + 1 for tag in later] == [
+            tag.start_line for tag in parsed.tags[purpose_index + 1 :]
+        ]
+
+    def test_frontmatter_edit(self):
+        config = load_config()
+        text = (VALID_DIR / "minimal.md").read_text()
+        before, parsed = self.assert_matches_parse_content(
+            text, [edit(text, "name:", "title:")], config
+        )
+        assert parsed.frontmatter != before.frontmatter
+
+    def test_without_state_falls_back(self):
+        config = load_config()
+        text = (VALID_DIR / "minimal.md").read_text()
+        parsed, result = reparse(
+            ParsedPrompt(raw_content=text), [], ValidationResult("test.md"), config
+        )
+        expected, _ = parse_content(text, ValidationResult("test.md"), config)
+        assert parsed == expected
+        assert result.passed
+
+    def test_out_of_range_edit(self):
+        config = load_config()
+        before, _ = parse_content("abc", ValidationResult("test.md"), config)
+        with pytest.raises(ValueError):
+            reparse(before, [TextEdit(2, 10, "")])
+
+
+class TestParseStream:
+    """Tests for parsing from a stream in chunks."""
+
+    @pytest.mark.parametrize(
+        "fixture",
+        sorted(VALID_DIR.glob("*.md")) + sorted(INVALID_DIR.glob("*.md")),
+        ids=lambda path: path.name,
+    )
+    @pytest.mark.parametrize("chunk_chars", [1, 16, 4096])
+    def test_matches_parse_content(self, fixture, chunk_chars):
+        config = load_config()
+        text = fixture.read_text()
+
+        parsed, result = parse_stream(
+            StringIO(text), ValidationResult("test.md"), config, chunk_chars=chunk_chars
+        )
+        expected, expected_result = parse_content(
+            text, ValidationResult("test.md"), config
+        )
+
+        assert result == expected_result
+        assert parsed.tags == expected.tags
+        assert parsed.frontmatter == expected.frontmatter
+        assert parsed.frontmatter_end_line == expected.frontmatter_end_line
+
+    def test_on_tag_receives_tags_as_parsed(self):
+        config = load_config()
+        text = (VALID_DIR / "full.md").read_text()
+        seen = []
+
+        parsed, _ = parse_stream(
+            StringIO(text), ValidationResult("test.md"), config, on_tag=seen.append
+        )
+
+        expected, _ = parse_content(text, ValidationResult("test.md"), config)
+        assert seen == list(expected.tags)
+        assert parsed.tags == []
+
+    def test_unclosed_tag_pairs_tags_after_it(self):
+        """An opening tag that never closes does not hide the pairs after it."""
+        config = load_config()
+        text = "---\nname: a\ndescription: b\n---\n<context>\n<purpose>x</purpose>\n"
+
+        parsed, result = parse_stream(
+            StringIO(text), ValidationResult("test.md"), config, chunk_chars=8
+        )
+
+        assert [(tag.name, tag.content) for tag in parsed.tags] == [("purpose", "x")]
+        assert result == parse_content(text, ValidationResult("test.md"), config)[1]
+
+    def test_frontmatter_needing_more_input(self):
+        """The frontmatter match is only settled once it cannot change."""
+        config = load_config()
+        text = "---\n  \n---\nname: a\ndescription: b\n---\n\n<purpose>x</purpose>\n"
+
+        parsed, _ = parse_stream(
+            StringIO(text), ValidationResult("test.md"), config, chunk_chars=1
+        )
+
+        expected, _ = parse_content(text, ValidationResult("test.md"), config)
+        assert parsed.frontmatter == {"name": "a", "description": "b"}
+        assert parsed.frontmatter_end_line == expected.frontmatter_end_line
+        assert parsed.tags == expected.tags
+
+
+class TestMemoryMap:
+    """Tests for parse_file with memory_map."""
+
+    @pytest.mark.parametrize(
+        "fixture",
+        sorted(VALID_DIR.glob("*.md")) + sorted(INVALID_DIR.glob("*.md")),
+        ids=lambda path: path.name,
+    )
+    def test_matches_read(self, fixture):
+        parsed, result = parse_file(fixture, memory_map=True)
+        expected, expected_result = parse_file(fixture)
+
+        assert result == expected_result
+        assert parsed.tags == expected.tags
+        assert parsed.frontmatter == expected.frontmatter
+        assert parsed.frontmatter_end_line == expected.frontmatter_end_line
+
+    def test_tags_are_spans(self):
+        parsed, _ = parse_file(VALID_DIR / "full.md", memory_map=True)
+        purpose = parsed.get_tag("purpose")
+
+        assert isinstance(purpose, SpanTag)
+        assert purpose.content == parse_file(VALID_DIR / "full.md")[0].get_tag(
+            "purpose"
+        ).content
+        assert parsed.raw_content == ""
+
+    def test_non_ascii_content(self, tmp_path):
+        prompt = tmp_path / "prompt.md"
+        prompt.write_text(
+            "---\nname: é\ndescription: ü\n---\n"
+            "<purpose>\n  Déjà vu 😀  \n</purpose>\n",
+            encoding="utf-8",
+        )
+        parsed, _ = parse_file(prompt, memory_map=True)
+        assert parsed.get_tag("purpose").content == "Déjà vu 😀"
+
+    @pytest.mark.parametrize(
+        "data",
+        [b"", b"---\r\nname: a\r\n---\r\n<purpose>x</purpose>", b"<\xc5\xbfx></x>"],
+        ids=["empty", "crlf", "folded-letter"],
+    )
+    def test_falls_back_to_read(self, tmp_path, data):
+        prompt = tmp_path / "prompt.md"
+        prompt.write_bytes(data)
+
+        parsed, result = parse_file(prompt, memory_map=True)
+        expected, expected_result = parse_file(prompt)
+
+        assert not any(isinstance(tag, SpanTag) for tag in parsed.tags)
+        assert parsed == expected
+        assert result == expected_result
+
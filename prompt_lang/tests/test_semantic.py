@@ -6,11 +6,12 @@ import pytest
 
 from prompt_lang.config import Config, load_config
 from prompt_lang.errors import ValidationResult
-from prompt_lang.parser import parse_content, parse_file
+from prompt_lang.parser import Tag, parse_content, parse_file
 from prompt_lang.semantic import (
     _find_ambiguous_patterns,
     _pattern_to_regex,
     check_ambiguous_language,
+    compile_ambiguous_patterns,
     validate_semantic,
 )
 
@@ -150,6 +151,42 @@ class TestPatternMatching:
         assert regex.search("It would be good to verify")
 
 
+class TestAmbiguousMatcher:
+    """Tests for the compiled single-scan matcher."""
+
+    def test_overlapping_patterns_all_reported(self):
+        """Patterns that overlap or share a prefix should each be reported."""
+        tag = Tag("instructions", "You could try to do it", 1, 1)
+        patterns = ["could", "you could", "try", "try to"]
+
+        matches = _find_ambiguous_patterns(tag, patterns)
+
+        assert [m.pattern for m in matches] == patterns
+
+    def test_one_match_per_pattern_per_line(self):
+        """Repeated occurrences on a line should be reported once."""
+        tag = Tag("instructions", "maybe this, maybe that\nmaybe", 4, 6)
+
+        matches = _find_ambiguous_patterns(tag, ["maybe"])
+
+        assert [(m.line, m.context) for m in matches] == [
+            (4, "maybe this, maybe that"),
+            (5, "maybe"),
+        ]
+
+    def test_matcher_compiled_once(self):
+        """The same pattern tuple should reuse one compiled matcher."""
+        patterns = ("maybe", "perhaps")
+        assert compile_ambiguous_patterns(patterns) is compile_ambiguous_patterns(
+            patterns
+        )
+
+    def test_no_patterns(self):
+        """An empty pattern list should match nothing."""
+        tag = Tag("instructions", "maybe", 1, 1)
+        assert _find_ambiguous_patterns(tag, []) == []
+
+
 class TestValidateSemantic:
     """Tests for the main validate_semantic function."""
 
@@ -370,3 +407,33 @@ Test purpose.
         patterns_found = [m.pattern for m in matches]
         assert "kinda" in patterns_found
         assert "sorta" in patterns_found
+
+    def test_repeated_instructions_blocks_checked(self):
+        """Ambiguous language in any instructions block should be detected."""
+        content = """---
+name: test
+description: Repeated instructions
+---
+
+# Test
+
+<purpose>
+Test purpose.
+</purpose>
+
+<instructions>
+1. Do the first thing
+</instructions>
+
+<instructions>
+1. Maybe do the second thing
+</instructions>
+"""
+        result = ValidationResult(file_path="test.md")
+        config = load_config()
+        parsed, result = parse_content(content, result, config)
+
+        matches = check_ambiguous_language(parsed, result, config)
+
+        assert [m.pattern for m in matches] == ["maybe"]
+        assert matches[0].line == 16
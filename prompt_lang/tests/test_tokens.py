@@ -0,0 +1,506 @@
+"""Tests for token counting."""
+
+import sys
+import types
+
+import pytest
+
+from prompt_lang import tokens
+from prompt_lang.config import load_config
+from prompt_lang.errors import ValidationResult
+from prompt_lang.parser import parse_content
+
+
+class FakeEncoding:
+    """Encoder stand-in that splits on whitespace."""
+
+    def encode(self, content):
+        return content.split()
+
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    """Install a fake tiktoken module and reset the encoder cache."""
+    loads: list[str] = []
+
+    def get_encoding(name):
+        loads.append(name)
+        if name == "missing":
+            raise ValueError(f"Unknown encoding {name}")
+        return FakeEncoding()
+
+    module = types.ModuleType("tiktoken")
+    module.get_encoding = get_encoding
+    monkeypatch.setitem(sys.modules, "tiktoken", module)
+    monkeypatch.setattr(tokens, "_encoders", {})
+    monkeypatch.setattr(tokens, "COUNT_CACHE", tokens.TokenCountCache())
+    return loads
+
+
+class TestEncoderCache:
+    """Tests for the shared encoder."""
+
+    def test_encoder_loaded_once(self, fake_tiktoken):
+        tokens.count_tokens("one two", "cl100k_base")
+        tokens.count_tokens("three", "cl100k_base")
+        assert fake_tiktoken == ["cl100k_base"]
+
+    def test_encoders_cached_per_name(self, fake_tiktoken):
+        tokens.get_encoder("cl100k_base")
+        tokens.get_encoder("o200k_base")
+        tokens.get_encoder("cl100k_base")
+        assert fake_tiktoken == ["cl100k_base", "o200k_base"]
+
+    def test_failed_load_not_retried(self, fake_tiktoken):
+        assert tokens.get_encoder("missing") is None
+        assert tokens.get_encoder("missing") is None
+        assert fake_tiktoken == ["missing"]
+
+    def test_warm_up(self, fake_tiktoken):
+        assert tokens.warm_up("cl100k_base") is True
+        assert tokens.warm_up("missing") is False
+        tokens.count_tokens("a b", "cl100k_base")
+        assert fake_tiktoken == ["cl100k_base", "missing"]
+
+
+class TestCountTokens:
+    """Tests for count_tokens function."""
+
+    def test_uses_encoder(self, fake_tiktoken):
+        assert tokens.count_tokens("one two three") == 3
+
+    def test_fallback_estimate(self, fake_tiktoken):
+        assert tokens.count_tokens("x" * 40, "missing") == 10
+
+    def test_stats_track_load_and_counting(self, fake_tiktoken, monkeypatch):
+        monkeypatch.setattr(tokens, "STATS", tokens.TokenStats())
+        tokens.warm_up("cl100k_base")
+        tokens.count_tokens("a b")
+        tokens.count_tokens("c")
+        assert tokens.STATS.files_counted == 2
+        assert tokens.STATS.encoder_load_seconds >= 0
+        assert "encoder load" in str(tokens.STATS)
+
+    def test_parser_uses_configured_encoding(self, fake_tiktoken):
+        config = load_config()
+        config.validation.tokens.encoding = "o200k_base"
+        result = ValidationResult(file_path="test.md")
+
+        parse_content("---\nname: a\ndescription: b\n---\n", result, config)
+
+        assert fake_tiktoken == ["o200k_base"]
+        assert result.token_count == 6
+
+
+class TestTokenizerBackends:
+    """Tests for the local BPE file and estimator backends."""
+
+    def test_estimator_needs_no_tiktoken(self, fake_tiktoken):
+        text = "Count these words, 12345 of them.\n\n    indented"
+        assert tokens.count_tokens(text, "estimator") == tokens.TokenEstimator().count(
+            text
+        )
+        assert fake_tiktoken == []
+
+    def test_estimator_features(self):
+        features = tokens.TokenEstimator.features("Héllo wörld, 1234!\n\n  | a |")
+        assert dict(zip(tokens.ESTIMATOR_FEATURES, features)) == {
+            "words": 5,
+            "letters": 9,
+            "numbers": 1,
+            "digits": 4,
+            "punctuation_runs": 4,
+            "punctuation": 4,
+            "line_breaks": 1,
+            "indents": 1,
+            "non_ascii": 2,
+        }
+
+    def test_estimator_weights_from_name(self, fake_tiktoken):
+        name = "estimator:words=2,letters=0,punctuation_runs=0,punctuation=0"
+        assert tokens.count_tokens("one two, three", name) == 6
+        assert tokens.tokenizer_id(name) == name
+
+    @pytest.mark.parametrize("name", ["estimator:vowels=1", "estimator:words=x"])
+    def test_bad_estimator_raises(self, fake_tiktoken, name):
+        with pytest.raises(tokens.TokenizerError):
+            tokens.count_tokens("x" * 40, name)
+        with pytest.raises(tokens.TokenizerError):
+            tokens.warm_up(name)  # Remembered, and raised again
+
+    def test_estimator_spans(self, fake_tiktoken):
+        content = "intro text <a>one two three</a>"
+        count, span_counts = tokens.count_tokens_by_span(
+            content, [(11, 31)], "estimator"
+        )
+        estimator = tokens.TokenEstimator()
+        assert count == estimator.count(content)
+        assert span_counts == [estimator.count(content[11:31])]
+
+    def test_calibrate_recovers_weights(self):
+        texts = ["one two", "three 1234", "a, b; c", "x\n\ny", "long words here"]
+        features = [tokens.TokenEstimator.features(text) for text in texts]
+        counts = [2 * f[0] + f[2] + 3 * f[4] for f in features]
+
+        weights, error = tokens.calibrate_estimator(texts, counts)
+
+        assert weights["words"] == pytest.approx(2)
+        assert weights["numbers"] == pytest.approx(1)
+        assert weights["punctuation_runs"] == pytest.approx(3)
+        assert all(weight >= 0 for weight in weights.values())
+        assert error == pytest.approx(0)
+
+    def test_local_bpe_file(self, tmp_path, monkeypatch):
+        pytest.importorskip("tiktoken")
+        import base64
+
+        monkeypatch.setattr(tokens, "_encoders", {})
+        monkeypatch.setattr(tokens, "COUNT_CACHE", tokens.TokenCountCache())
+        path = tmp_path / "local.tiktoken"
+        ranks = [bytes([i]) for i in range(256)] + [b"ab", b" ab"]
+        lines = [f"{base64.b64encode(t).decode()} {r}\n" for r, t in enumerate(ranks)]
+        path.write_text("".join(lines))
+        name = f"bpe:cl100k_base:{path}"
+
+        assert tokens.count_tokens("ab ab abc", name) == 4
+        tokenizer = tokens.tokenizer_id(name)
+        assert tokenizer.startswith(name)
+        path.write_text(path.read_text() + f"{base64.b64encode(b'abc').decode()} 258\n")
+        assert tokens.tokenizer_id(name) != tokenizer
+
+    def test_missing_bpe_file_raises(self, tmp_path, monkeypatch):
+        pytest.importorskip("tiktoken")
+        monkeypatch.setattr(tokens, "_encoders", {})
+        name = f"bpe:cl100k_base:{tmp_path / 'missing.tiktoken'}"
+        with pytest.raises(tokens.TokenizerError, match="missing.tiktoken"):
+            tokens.count_tokens("x" * 40, name)
+
+
+class TestIncrementalCounting:
+    """Tests for count_tokens_incremental and split_segments."""
+
+    TEXT = "# Title\n\nFirst paragraph.\n<purpose>\nText\n</purpose>\n\n  indented\n"
+
+    def test_segments_rejoin(self):
+        segments = tokens.split_segments(self.TEXT)
+        assert "".join(segments) == self.TEXT
+        assert segments == [
+            "# Title\n\n",
+            "First paragraph.\n",
+            "<purpose>\nText\n",
+            "</purpose>\n\n  indented\n",
+        ]
+
+    def test_total_matches_count_tokens(self, fake_tiktoken):
+        total, counts = tokens.count_tokens_incremental(self.TEXT, None)
+        assert total == tokens.count_tokens(self.TEXT)
+        assert set(counts) == set(tokens.split_segments(self.TEXT))
+
+    def test_unchanged_segments_not_encoded(self, fake_tiktoken, monkeypatch):
+        _, counts = tokens.count_tokens_incremental(self.TEXT, None)
+        encoded = []
+        monkeypatch.setattr(
+            FakeEncoding, "encode", lambda self, text: encoded.append(text) or []
+        )
+        edited = self.TEXT.replace("Text", "More text")
+
+        tokens.count_tokens_incremental(edited, counts)
+
+        assert encoded == ["<purpose>\nMore text\n"]
+
+    def test_fallback_estimate(self, fake_tiktoken):
+        total, counts = tokens.count_tokens_incremental("x" * 40, None, "missing")
+        assert total == 10
+        assert counts == {}
+
+
+class TestTokenCounter:
+    """Tests for counting text fed in pieces."""
+
+    TEXT = "# Title\n\n" + "Some words here.\n<purpose>\nText\n</purpose>\n\n" * 20
+
+    @pytest.mark.parametrize("piece", [1, 7, 1000])
+    def test_total_matches_count_tokens(self, fake_tiktoken, piece):
+        counter = tokens.TokenCounter(batch_chars=32)
+        for start in range(0, len(self.TEXT), piece):
+            counter.feed(self.TEXT[start : start + piece])
+        assert counter.total() == tokens.count_tokens(self.TEXT)
+
+    def test_encodes_in_batches(self, fake_tiktoken, monkeypatch):
+        encoded = []
+
+        def encode(self, text):
+            encoded.append(text)
+            return text.split()
+
+        monkeypatch.setattr(FakeEncoding, "encode", encode)
+        counter = tokens.TokenCounter(batch_chars=64)
+        counter.feed(self.TEXT)
+        counter.total()
+
+        assert len(encoded) > 1
+        assert "".join(encoded) == self.TEXT
+
+    def test_fallback_estimate(self, fake_tiktoken):
+        counter = tokens.TokenCounter("missing")
+        counter.feed("x" * 21)
+        counter.feed("x" * 19)
+        assert counter.total() == 10
+
+    def test_stops_at_max_tokens(self, fake_tiktoken, monkeypatch):
+        encoded = []
+
+        def encode(self, text):
+            encoded.append(text)
+            return text.split()
+
+        monkeypatch.setattr(FakeEncoding, "encode", encode)
+        counter = tokens.TokenCounter(batch_chars=64, max_tokens=10)
+        for _ in range(10):
+            counter.feed(self.TEXT)
+
+        assert 10 <= counter.total() < len((self.TEXT * 10).split())
+        assert len("".join(encoded)) <= len(self.TEXT)
+
+
+class TestBoundedCounting:
+    """Tests for counts bounded with max_tokens."""
+
+    TEXT = "Some words here.\n\n" * 200
+
+    @pytest.fixture
+    def encoded(self, fake_tiktoken, monkeypatch):
+        """Record the texts encoded, in chunks of about 64 characters."""
+        texts = []
+
+        def encode(self, text):
+            texts.append(text)
+            return text.split()
+
+        monkeypatch.setattr(FakeEncoding, "encode", encode)
+        monkeypatch.setattr(tokens, "BOUNDED_CHUNK_CHARS", 64)
+        return texts
+
+    def test_stops_at_max_tokens(self, encoded):
+        count = tokens.count_tokens(self.TEXT, max_tokens=30)
+        assert 30 <= count < 600
+        assert len("".join(encoded)) < len(self.TEXT) // 2
+        assert len(tokens.COUNT_CACHE) == 0
+
+    def test_counts_below_bound_are_exact(self, encoded):
+        assert tokens.count_tokens(self.TEXT, max_tokens=601) == 600
+        assert "".join(encoded) == self.TEXT
+        assert tokens.count_tokens(self.TEXT) == 600
+        assert len(encoded) > 1  # Chunked, then answered from the cache
+
+    def test_batch(self, encoded):
+        counts = tokens.count_tokens_batch(["a b", self.TEXT], max_tokens=30)
+        assert counts[0] == 2
+        assert 30 <= counts[1] < 600
+
+    def test_spans_counted_up_to_bound(self, encoded, monkeypatch):
+        """Only spans ending in the encoded part of the text are counted."""
+        monkeypatch.setattr(FakeEncoding, "encode", lambda self, text: list(text))
+        monkeypatch.setattr(
+            FakeEncoding,
+            "decode_tokens_bytes",
+            lambda self, tokens: [token.encode("utf-8") for token in tokens],
+            raising=False,
+        )
+        count, span_counts = tokens.count_tokens_by_span(
+            self.TEXT, [(0, 10), (18, 36), (0, len(self.TEXT))], max_tokens=30
+        )
+        assert 30 <= count < len(self.TEXT)
+        assert span_counts == [10, 18, None]
+
+
+
+class TestBatchCounting:
+    """Tests for count_tokens_batch."""
+
+    TEXTS = [f"text number {i} " * (i % 7 + 1) for i in range(40)]
+
+    @pytest.mark.parametrize("threads", [1, 4])
+    def test_matches_count_tokens(self, fake_tiktoken, monkeypatch, threads):
+        monkeypatch.setattr(tokens, "COUNT_BATCH_CHARS", 64)
+        counts = tokens.count_tokens_batch(self.TEXTS, threads=threads)
+        assert counts == [len(text.split()) for text in self.TEXTS]
+
+    def test_counts_cached(self, fake_tiktoken, monkeypatch):
+        tokens.count_tokens_batch(self.TEXTS[:2])
+        encoded = []
+        monkeypatch.setattr(
+            FakeEncoding, "encode", lambda self, text: encoded.append(text) or []
+        )
+        tokens.count_tokens(self.TEXTS[0])
+        tokens.count_tokens_batch(self.TEXTS[:3] + self.TEXTS[2:3])
+        assert encoded == [self.TEXTS[2]]
+
+    def test_failed_text_estimated_alone(self, fake_tiktoken, monkeypatch):
+        def encode(self, text):
+            if "<|endoftext|>" in text:
+                raise ValueError("special token")
+            return text.split()
+
+        monkeypatch.setattr(FakeEncoding, "encode", encode)
+        counts = tokens.count_tokens_batch(["a b", "x <|endoftext|>", "c"])
+        assert counts == [2, len("x <|endoftext|>") // 4, 1]
+
+    def test_fallback_estimate(self, fake_tiktoken):
+        assert tokens.count_tokens_batch(["x" * 40, ""], "missing") == [10, 0]
+
+
+class TestCountBySpan:
+    """Tests for count_tokens_by_span."""
+
+    @pytest.fixture
+    def char_encoding(self, fake_tiktoken, monkeypatch):
+        """Encode one token per character, recording encoded texts."""
+        encoded = []
+
+        def encode(self, text):
+            encoded.append(text)
+            return list(text)
+
+        monkeypatch.setattr(FakeEncoding, "encode", encode)
+        monkeypatch.setattr(
+            FakeEncoding,
+            "decode_tokens_bytes",
+            lambda self, tokens: [token.encode("utf-8") for token in tokens],
+            raising=False,
+        )
+        return encoded
+
+    def test_tokens_attributed_to_spans(self, char_encoding):
+        text = "é<a>ü x</a> <b>y</b>"
+        spans = [(1, 11), (12, 20), (0, 20), (5, 5)]
+        count, span_counts = tokens.count_tokens_by_span(text, spans)
+        assert count == len(text)
+        assert span_counts == [10, 8, 20, 0]
+
+    def test_single_encoding(self, char_encoding):
+        tokens.count_tokens_by_span("abc", [(0, 1)])
+        tokens.count_tokens_by_span("abcd", [(0, 1)], min_tokens=100)
+        assert char_encoding == ["abc", "abcd"]
+
+    def test_cached_text_below_min_tokens_not_encoded(self, char_encoding):
+        assert tokens.count_tokens("abcd") == 4
+        assert tokens.count_tokens_by_span("abcd", [(0, 2)], min_tokens=5) == (4, None)
+        assert tokens.count_tokens_by_span("abcd", [(0, 2)], min_tokens=4) == (4, [2])
+        assert char_encoding == ["abcd", "abcd"]
+
+    def test_fallback_estimate(self, fake_tiktoken):
+        count, span_counts = tokens.count_tokens_by_span(
+            "x" * 40, [(0, 8), (8, 40)], "missing"
+        )
+        assert (count, span_counts) == (10, [2, 8])
+
+
+class TestTokenCountCache:
+    """Tests for the token count cache."""
+
+    @pytest.fixture
+    def stats(self, monkeypatch):
+        counts = tokens.TokenStats()
+        monkeypatch.setattr(tokens, "STATS", counts)
+        return counts
+
+    def test_repeated_content_not_encoded(self, fake_tiktoken, monkeypatch, stats):
+        encoded = []
+        monkeypatch.setattr(
+            FakeEncoding, "encode", lambda self, text: encoded.append(text) or [1, 2]
+        )
+        assert tokens.count_tokens("same text") == 2
+        assert tokens.count_tokens("same text") == 2
+        assert encoded == ["same text"]
+        assert (stats.cache_hits, stats.cache_misses) == (1, 1)
+        assert "Token count cache: 1 hit(s), 1 miss(es)" in str(stats)
+
+    def test_namespaced_by_encoding(self, fake_tiktoken, stats):
+        tokens.count_tokens("a b", "cl100k_base")
+        tokens.count_tokens("a b", "o200k_base")
+        assert stats.cache_misses == 2
+
+    def test_estimates_not_cached(self, fake_tiktoken, stats):
+        tokens.count_tokens("x" * 40, "missing")
+        assert len(tokens.COUNT_CACHE) == 0
+        assert stats.cache_misses == 0
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            "---\nname: a\ndescription: b\n---\n<purpose>\nx\n</purpose>\n",
+            "---\nname: a\ndescription: b\nreference: true\n---\nAnything\n",
+        ],
+    )
+    def test_parser_reuses_counts(self, fake_tiktoken, stats, content):
+        config = load_config()
+        first = ValidationResult(file_path="a.md")
+        second = ValidationResult(file_path="b.md")
+        parse_content(content, first, config)
+        parse_content(content, second, config)
+        assert first.token_count == second.token_count
+        assert (stats.cache_hits, stats.cache_misses) == (1, 1)
+
+    def test_least_recently_used_evicted(self):
+        cache = tokens.TokenCountCache(max_entries=2)
+        cache.put(b"a", 1)
+        cache.put(b"b", 2)
+        cache.get(b"a")
+        cache.put(b"c", 3)
+        assert cache.get(b"b") is None
+        assert (cache.get(b"a"), cache.get(b"c")) == (1, 3)
+
+    def test_save_and_load(self, tmp_path):
+        path = tmp_path / "cache" / tokens.COUNT_CACHE_FILE
+        cache = tokens.TokenCountCache()
+        key = cache.make_key("text", "tiktoken:cl100k_base")
+        cache.put(key, 7)
+        cache.save(path)
+
+        loaded = tokens.TokenCountCache()
+        loaded.load(path)
+        assert loaded.get(key) == 7
+        assert path.stat().st_size == len(tokens._COUNT_CACHE_MAGIC) + 20
+
+    def test_save_merges_other_runs(self, tmp_path):
+        path = tmp_path / tokens.COUNT_CACHE_FILE
+        first, second = tokens.TokenCountCache(), tokens.TokenCountCache()
+        first.load(path)
+        second.load(path)
+        first.put(b"a" * 16, 1)
+        second.put(b"b" * 16, 2)
+        first.save(path)
+        second.save(path)
+
+        loaded = tokens.TokenCountCache()
+        loaded.load(path)
+        assert (loaded.get(b"a" * 16), loaded.get(b"b" * 16)) == (1, 2)
+
+    def test_saved_file_keeps_most_recent(self, tmp_path):
+        path = tmp_path / tokens.COUNT_CACHE_FILE
+        cache = tokens.TokenCountCache(max_entries=2)
+        for i in range(3):
+            cache.put(bytes([i]) * 16, i)
+        cache.save(path)
+        loaded = tokens.TokenCountCache()
+        loaded.load(path)
+        assert len(loaded) == 2
+        assert loaded.get(bytes([0]) * 16) is None
+
+    @pytest.mark.parametrize("data", [b"", b"not a cache file", b"\x00" * 40])
+    def test_unreadable_file_ignored(self, tmp_path, data):
+        path = tmp_path / tokens.COUNT_CACHE_FILE
+        path.write_bytes(data)
+        cache = tokens.TokenCountCache()
+        cache.load(path)
+        assert len(cache) == 0
+
+    def test_take_added(self):
+        cache = tokens.TokenCountCache()
+        cache.put(b"a", 1)
+        assert cache.take_added() == {b"a": 1}
+        assert cache.take_added() == {}
+        other = tokens.TokenCountCache()
+        other.update({b"a": 1})
+        assert other.get(b"a") == 1
@@ -1,12 +1,17 @@
 """Tests for the CLI validation tool."""
 
+import os
+import subprocess
 import sys
 from io import StringIO
 from pathlib import Path
 
 import pytest
 
+from prompt_lang import frontmatter, tokens
+from prompt_lang import validate as validate_module
 from prompt_lang.config import load_config
+from prompt_lang.errors import ValidationResult
 from prompt_lang.validate import (
     EXIT_CONFIG_ERROR,
     EXIT_FILE_NOT_FOUND,
@@ -15,14 +20,17 @@ from prompt_lang.validate import (
     main,
     parse_args,
     print_results,
+    validate_content,
     validate_directory,
     validate_file,
+    validate_stream,
 )
 
 # Test fixtures directory
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
 VALID_DIR = FIXTURES_DIR / "valid"
 INVALID_DIR = FIXTURES_DIR / "invalid"
+REPO_ROOT = Path(__file__).parent.parent.parent
 
 
 class TestParseArgs:
@@ -66,6 +74,24 @@ class TestParseArgs:
         assert args.no_semantic is True
         assert args.verbose is True
 
+    def test_parse_exact_tokens(self):
+        """Parse --exact-tokens and its default."""
+        assert parse_args(["path", "--exact-tokens"]).exact_tokens is True
+        assert parse_args(["path"]).exact_tokens is False
+
+    def test_parse_tokenizer(self):
+        """Parse --tokenizer, which accepts only known backends."""
+        assert parse_args(["path", "--tokenizer", "estimator"]).tokenizer == "estimator"
+        assert parse_args(["path"]).tokenizer is None
+        with pytest.raises(SystemExit):
+            parse_args(["path", "--tokenizer", "words"])
+
+    def test_parse_jobs(self):
+        """Parse --jobs and its default."""
+        assert parse_args(["path", "--jobs", "3"]).jobs == 3
+        assert parse_args(["path", "-j", "1"]).jobs == 1
+        assert parse_args(["path"]).jobs >= 1
+
 
 class TestValidateFile:
     """Tests for single file validation."""
@@ -105,6 +131,69 @@ class TestValidateFile:
         assert result.passed
 
 
+    def test_validate_repeated_instructions_blocks(self, tmp_path):
+        """Every instructions block should be checked for action keywords."""
+        prompt = tmp_path / "repeated.md"
+        prompt.write_text("""---
+name: repeated
+description: Repeated instructions
+---
+
+<purpose>Test</purpose>
+<instructions>1. EXECUTE the task</instructions>
+<instructions>1. Run the task</instructions>
+""")
+        config = load_config()
+        config.validation.enforce_tag_order = False
+        result = validate_file(prompt, config)
+
+        assert [e.line for e in result.errors] == [9]
+        assert "action keyword" in result.errors[0].message
+
+
+class TestMemoryMappedValidation:
+    """Tests for validate_file with memory-mapped files."""
+
+    @pytest.mark.parametrize(
+        "fixture",
+        sorted(VALID_DIR.glob("*.md")) + sorted(INVALID_DIR.glob("*.md")),
+        ids=lambda path: path.name,
+    )
+    def test_matches_read(self, fixture):
+        config = load_config()
+        result = validate_file(fixture, config, memory_map=True)
+        assert result == validate_file(fixture, config)
+
+
+class TestValidateStream:
+    """Tests for validating large files as a stream."""
+
+    @pytest.mark.parametrize(
+        "fixture",
+        sorted(VALID_DIR.glob("*.md")) + sorted(INVALID_DIR.glob("*.md")),
+        ids=lambda path: path.name,
+    )
+    @pytest.mark.parametrize("name", ["prompt.md", "agents/prompt.md", "CLAUDE.md"])
+    def test_matches_validate_content(self, fixture, name):
+        config = load_config()
+        text = fixture.read_text()
+
+        result = validate_stream(StringIO(text), Path(name), config)
+
+        assert result == validate_content(text, Path(name), config)
+
+    def test_large_files_are_streamed(self, tmp_path, monkeypatch):
+        """Files above the threshold are not read whole, nor cached."""
+        monkeypatch.setattr(validate_module, "STREAMING_MIN_BYTES", 0)
+        monkeypatch.setattr(validate_module, "validate_content", None)
+        cache = validate_module.ResultCache(tmp_path / "cache")
+
+        result = validate_file(INVALID_DIR / "unclosed-tag.md", load_config(), cache)
+
+        assert any(e.message.startswith("Unclosed") for e in result.errors)
+        assert not (tmp_path / "cache").exists()
+
+
 class TestValidateDirectory:
     """Tests for directory validation."""
 
@@ -135,10 +224,92 @@ class TestValidateDirectory:
         assert len(passed) == 3  # 3 valid
         assert len(failed) == 8  # 8 invalid
 
+    def test_parallel_matches_serial(self, monkeypatch):
+        """Parallel validation should return the same results in the same order."""
+        config = load_config()
+        serial = validate_directory(FIXTURES_DIR, config)
+
+        monkeypatch.setattr(validate_module, "PARALLEL_MIN_FILES", 0)
+        parallel = validate_directory(FIXTURES_DIR, config, jobs=2)
+
+        assert [r.file_path for r in parallel] == [r.file_path for r in serial]
+        assert [r.errors for r in parallel] == [r.errors for r in serial]
+        assert [r.token_count for r in parallel] == [r.token_count for r in serial]
+
+    def test_parallel_stats_include_workers(self, monkeypatch):
+        """--stats counts the work done in worker processes."""
+        monkeypatch.setattr(validate_module, "PARALLEL_MIN_FILES", 0)
+        monkeypatch.setattr(tokens, "STATS", tokens.TokenStats(files_counted=100))
+        monkeypatch.setattr(frontmatter, "STATS", frontmatter.FrontmatterStats())
+        results = validate_directory(FIXTURES_DIR, load_config(), jobs=2)
+
+        assert tokens.STATS.files_counted == 100 + len(results)
+        paths = frontmatter.STATS
+        assert paths.fast_path + paths.libyaml + paths.pure_python > 0
+
+    def test_small_directory_runs_serially(self, monkeypatch):
+        """Directories below the threshold should not start a pool."""
+
+        def fail(*args, **kwargs):
+            raise AssertionError("process pool should not be used")
+
+        monkeypatch.setattr(validate_module, "_validate_parallel", fail)
+        results = validate_directory(VALID_DIR, load_config(), jobs=4)
+
+        assert len(results) == 3
+
+    def test_batched_counting_matches_single_files(self, tmp_path, monkeypatch):
+        """Small directories count tokens in one batch, with the same results."""
+        for source in sorted(FIXTURES_DIR.glob("*/*.md")):
+            (tmp_path / source.name).write_text(source.read_text())
+        (tmp_path / "long.md").write_text(
+            (VALID_DIR / "minimal.md").read_text() + "word " * 40000
+        )
+        config = load_config()
+        paths = sorted(tmp_path.glob("*.md"))
+        expected = [validate_file(path, config) for path in paths]
+
+        batches = []
+        count_tokens_batch = validate_module.tokens.count_tokens_batch
+        monkeypatch.setattr(
+            validate_module.tokens,
+            "count_tokens_batch",
+            lambda contents, *args, **kwargs: batches.append(len(contents))
+            or count_tokens_batch(contents, *args, **kwargs),
+        )
+        results = validate_directory(tmp_path, config, jobs=1)
+
+        assert batches == [len(expected)]
+        assert results == expected
+        (long,) = [r for r in results if r.file_path.endswith("long.md")]
+        assert any("Token count" in e.message for e in long.errors)
+
+    def test_results_share_repeated_messages(self):
+        """Errors with the same message in different files share one string."""
+        config = load_config()
+        results = [
+            validate_content("# Missing frontmatter\n", Path(f"{i}.md"), config)
+            for i in range(2)
+        ]
+        first, second = (result.errors[0] for result in results)
+        assert first == second
+        assert first.message is second.message
+
+    def test_results_have_no_attribute_dicts(self):
+        """Results and their errors are slotted records."""
+        result = validate_file(INVALID_DIR / "ambiguous-language.md", load_config())
+        assert not hasattr(result, "__dict__")
+        assert not hasattr(result.errors[0], "__dict__")
+
 
 class TestMainCLI:
     """Tests for main CLI entry point."""
 
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, monkeypatch):
+        """Keep each test's result cache out of the repository."""
+        monkeypatch.chdir(tmp_path)
+
     def test_main_valid_file_returns_success(self):
         """Valid file should return EXIT_SUCCESS."""
         exit_code = main([str(VALID_DIR / "minimal.md")])
@@ -170,6 +341,61 @@ class TestMainCLI:
         exit_code = main([str(INVALID_DIR / "ambiguous-language.md"), "--no-semantic"])
         assert exit_code == EXIT_SUCCESS
 
+    def test_main_exact_tokens(self, tmp_path, capsys):
+        """Token counts stop at fail_at unless --exact-tokens is given."""
+        path = tmp_path / "long.md"
+        path.write_text((VALID_DIR / "minimal.md").read_text() + "word " * 40000)
+
+        main([str(path), "--no-cache", "--no-daemon"])
+        assert "Token count: >= 4000 (--exact-tokens" in capsys.readouterr().out
+
+        main([str(path), "--no-cache", "--no-daemon", "--exact-tokens"])
+        out = capsys.readouterr().out
+        assert "Token count: >= " not in out
+        assert "  <purpose>: " in out
+
+    def test_main_tokenizer(self, tmp_path, capsys):
+        """--tokenizer estimator counts with the character-class estimator."""
+        content = (VALID_DIR / "minimal.md").read_text() + "word " * 5000
+        path = tmp_path / "long.md"
+        path.write_text(content)
+
+        argv = [str(path), "--no-cache", "--no-daemon", "--exact-tokens"]
+        main([*argv, "--tokenizer", "estimator"])
+        expected = tokens.TokenEstimator().count(content)
+        assert f"Token count: {expected}\n" in capsys.readouterr().out
+
+    @pytest.mark.parametrize(
+        "tokens_yaml, message",
+        [
+            ("backend: bpe", "needs tokens.bpe_file"),
+            ("backend: bpe\n    bpe_file: missing.tiktoken", "missing.tiktoken"),
+            ("backend: estimator\n    estimator: {wordz: 1}", "'wordz'"),
+        ],
+    )
+    def test_main_unusable_tokenizer_is_config_error(
+        self, tmp_path, capsys, tokens_yaml, message
+    ):
+        """A tokenizer that cannot be used fails the run instead of estimating."""
+        config_path = tmp_path / "prompt-lang.config.yaml"
+        config_path.write_text(f"validation:\n  tokens:\n    {tokens_yaml}\n")
+
+        exit_code = main(
+            [str(VALID_DIR / "minimal.md"), "-c", str(config_path), "--no-daemon"]
+        )
+
+        assert exit_code == EXIT_CONFIG_ERROR
+        assert message in capsys.readouterr().err
+
+    def test_main_tokenizer_override_checked(self, capsys):
+        """--tokenizer bpe needs a bpe_file in the config."""
+        exit_code = main(
+            [str(VALID_DIR / "minimal.md"), "--tokenizer", "bpe", "--no-daemon"]
+        )
+
+        assert exit_code == EXIT_CONFIG_ERROR
+        assert "needs tokens.bpe_file" in capsys.readouterr().err
+
     def test_main_with_verbose(self, capsys):
         """Verbose mode should show passing files."""
         exit_code = main([str(VALID_DIR / "minimal.md"), "-v"])
@@ -205,6 +431,35 @@ class TestPrintResults:
         assert "FAIL:" in captured.out
         assert "ERRORS:" in captured.out
 
+    def test_print_failure_shows_token_breakdown(self, capsys):
+        """Failures past warn_at list tokens by block."""
+        result = ValidationResult(
+            file_path="big.md",
+            token_count=5000,
+            token_breakdown={"<examples>": 4000, "frontmatter": 20},
+        )
+        result.add_error(0, "Token count (5000) exceeds fail threshold (4000)")
+
+        print_results([result])
+
+        out = capsys.readouterr().out
+        assert "Token count: 5000\n  <examples>: 4000\n  frontmatter: 20\n" in out
+
+    def test_print_failure_labels_partial_breakdown(self, capsys):
+        """A breakdown of a count stopped at fail_at is marked as partial."""
+        result = ValidationResult(
+            file_path="big.md",
+            token_count=4000,
+            token_count_exact=False,
+            token_breakdown={"<purpose>": 30, "frontmatter": 20},
+        )
+        result.add_error(0, "Token count (>= 4000) exceeds fail threshold (4000)")
+
+        print_results([result])
+
+        out = capsys.readouterr().out
+        assert "  Blocks counted before it stopped:\n  <purpose>: 30\n" in out
+
     def test_print_verbose_shows_passing(self, capsys):
         """Verbose mode shows passing files."""
         config = load_config()
@@ -283,3 +538,38 @@ description: Nested file
 
         assert len(results) == 2
         assert all(r.passed for r in results)
+
+
+class TestStartup:
+    """Tests for the fast-start import path."""
+
+    def test_import_defers_heavy_modules(self):
+        """Importing the CLI does not load yaml, semantic or multiprocessing."""
+        code = (
+            "import sys, prompt_lang.validate; "
+            "print(sorted(m for m in ('yaml', 'tiktoken', 'prompt_lang.semantic', "
+            "'concurrent.futures.process') if m in sys.modules))"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=REPO_ROOT,
+        )
+        assert proc.stdout.strip() == "[]"
+
+    def test_semantic_not_imported_when_disabled(self, tmp_path):
+        """--no-semantic runs never import the semantic checker."""
+        code = (
+            "import sys; from prompt_lang.validate import main; "
+            f"main([{str(VALID_DIR / 'minimal.md')!r}, '--no-semantic', '--no-cache']); "
+            "print('prompt_lang.semantic' in sys.modules)"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=tmp_path,
+            env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        )
+        assert proc.stdout.strip().endswith("False")
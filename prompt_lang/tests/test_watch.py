@@ -0,0 +1,264 @@
+"""Tests for watch mode."""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from prompt_lang import validate as validate_module
+from prompt_lang.errors import ValidationError
+from prompt_lang.validate import parse_args
+from prompt_lang.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    WatchSession,
+    diff_messages,
+)
+
+# Test fixtures directory
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+VALID_DIR = FIXTURES_DIR / "valid"
+INVALID_DIR = FIXTURES_DIR / "invalid"
+
+
+def error(line: int, message: str) -> ValidationError:
+    return ValidationError(line, message, "error")
+
+
+def touch(path: Path, content: str) -> None:
+    """Write content and move the mtime forward so polling sees the change."""
+    path.write_text(content)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def prompts(tmp_path):
+    root = tmp_path / "prompts"
+    root.mkdir()
+    shutil.copy(VALID_DIR / "minimal.md", root / "good.md")
+    shutil.copy(INVALID_DIR / "unclosed-tag.md", root / "bad.md")
+    return root
+
+
+def inotify_watcher(root, extra_files):
+    try:
+        return InotifyWatcher(root, extra_files)
+    except (OSError, AttributeError):
+        pytest.skip("inotify is not available")
+
+
+class TestDiffMessages:
+    """Tests for comparing error lists between runs."""
+
+    def test_introduced_and_fixed(self):
+        old = [error(3, "Unclosed tag: <purpose>")]
+        new = [error(5, "Unrecognized tag: <foo>")]
+
+        introduced, fixed = diff_messages(old, new)
+
+        assert introduced == new
+        assert fixed == old
+
+    def test_moved_error_is_unchanged(self):
+        """An error that only moved to another line is not reported."""
+        introduced, fixed = diff_messages(
+            [error(3, "Unclosed tag: <purpose>")], [error(4, "Unclosed tag: <purpose>")]
+        )
+        assert introduced == []
+        assert fixed == []
+
+    def test_repeated_messages_counted(self):
+        old = [error(3, "Invalid directive")]
+        new = [error(3, "Invalid directive"), error(9, "Invalid directive")]
+
+        introduced, fixed = diff_messages(old, new)
+
+        assert introduced == [new[1]]
+        assert fixed == []
+
+
+class TestWatchers:
+    """Tests for change detection."""
+
+    def test_polling_detects_modification(self, prompts):
+        watcher = PollingWatcher(prompts, [], interval=0.01)
+        touch(prompts / "good.md", "changed")
+        assert watcher.read(timeout=1) == {prompts / "good.md"}
+
+    def test_polling_detects_new_and_removed_files(self, prompts):
+        watcher = PollingWatcher(prompts, [], interval=0.01)
+        (prompts / "new.md").write_text("new")
+        (prompts / "bad.md").unlink()
+        assert watcher.read(timeout=1) == {prompts / "new.md", prompts / "bad.md"}
+
+    def test_polling_timeout_without_changes(self, prompts):
+        watcher = PollingWatcher(prompts, [], interval=0.01)
+        assert watcher.read(timeout=0.05) == set()
+
+    def test_inotify_detects_modification(self, prompts):
+        watcher = inotify_watcher(prompts, [])
+        try:
+            (prompts / "good.md").write_text("changed")
+            assert watcher.read(timeout=1) == {prompts / "good.md"}
+        finally:
+            watcher.close()
+
+    def test_inotify_ignores_other_files(self, prompts):
+        watcher = inotify_watcher(prompts, [])
+        try:
+            (prompts / "notes.txt").write_text("ignored")
+            assert watcher.read(timeout=0.1) == set()
+        finally:
+            watcher.close()
+
+    def test_inotify_watches_new_directories(self, prompts):
+        watcher = inotify_watcher(prompts, [])
+        try:
+            (prompts / "sub").mkdir()
+            watcher.read(timeout=0.2)
+            (prompts / "sub" / "nested.md").write_text("nested")
+            changed = set()
+            deadline = time.monotonic() + 1
+            while prompts / "sub" / "nested.md" not in changed:
+                assert time.monotonic() < deadline
+                changed |= watcher.read(timeout=0.2)
+        finally:
+            watcher.close()
+
+    def test_inotify_reports_config_file(self, prompts, tmp_path):
+        config = tmp_path / "custom.yaml"
+        config.write_text("validation: {}\n")
+        watcher = inotify_watcher(prompts, [config])
+        try:
+            config.write_text("validation:\n  semantic_check: false\n")
+            assert watcher.read(timeout=1) == {config}
+        finally:
+            watcher.close()
+
+
+class TestWatchSession:
+    """Tests for incremental revalidation."""
+
+    def test_reports_new_and_fixed_errors(self, prompts, capsys):
+        session = WatchSession(parse_args([str(prompts), "--no-cache"]))
+        session.initial()
+        capsys.readouterr()
+
+        shutil.copy(VALID_DIR / "minimal.md", prompts / "bad.md")
+        shutil.copy(INVALID_DIR / "unrecognized-tag.md", prompts / "good.md")
+        session.update({prompts / "bad.md", prompts / "good.md"})
+
+        out = capsys.readouterr().out
+        assert f"PASS: {prompts / 'bad.md'}" in out
+        assert "- Line 12: Unclosed tag: <instructions> (fixed)" in out
+        assert f"FAIL: {prompts / 'good.md'}" in out
+        assert "+ Line" in out
+        assert "2 file(s), 1 failing" in out
+
+    def test_only_changed_files_revalidated(self, prompts, monkeypatch, capsys):
+        session = WatchSession(parse_args([str(prompts), "--no-cache"]))
+        session.initial()
+
+        validated = []
+        original = validate_module.validate_file
+
+        def record(path, config, cache=None):
+            validated.append(path)
+            return original(path, config, cache)
+
+        monkeypatch.setattr(validate_module, "validate_file", record)
+        session.update({prompts / "good.md"})
+
+        assert validated == [prompts / "good.md"]
+
+    def test_config_change_revalidates_everything(self, prompts, tmp_path, capsys):
+        config = tmp_path / "custom.yaml"
+        config.write_text("validation:\n  semantic_check: true\n")
+        args = parse_args([str(prompts), "-c", str(config), "--no-cache"])
+        session = WatchSession(args)
+        session.initial()
+
+        config.write_text("validation:\n  required_tags: []\n")
+        session.update({config})
+
+        out = capsys.readouterr().out
+        assert "Config changed" in out
+        assert "- Line 0: Missing required tag: <instructions> (fixed)" in out
+
+    @pytest.mark.parametrize(
+        "invalid",
+        [
+            "validation:\n  tokens:\n    fail_at: abc\n",
+            "validation:\n  tokens:\n    backend: bpe\n    bpe_file: missing\n",
+            "directives:\n  patterns:\n    DEFAULT: '^DEFAULT ('\n",
+        ],
+    )
+    def test_invalid_config_keeps_previous(self, prompts, tmp_path, invalid, capsys):
+        config = tmp_path / "custom.yaml"
+        config.write_text("validation:\n  required_tags: []\n")
+        args = parse_args([str(prompts), "-c", str(config), "--no-cache"])
+        session = WatchSession(args)
+        session.initial()
+        previous = session.config
+
+        config.write_text(invalid)
+        session.update({config})
+
+        assert f"Error in config {config}" in capsys.readouterr().err
+        assert session.config is previous
+
+        shutil.copy(VALID_DIR / "minimal.md", prompts / "bad.md")
+        session.update({prompts / "bad.md"})
+        assert "2 file(s)" in capsys.readouterr().out
+
+    @pytest.mark.parametrize(
+        "make",
+        [
+            lambda root, extra: PollingWatcher(root, extra, interval=0.01),
+            inotify_watcher,
+        ],
+        ids=["polling", "inotify"],
+    )
+    def test_absolute_root_relative_config(self, prompts, monkeypatch, make, capsys):
+        """Paths are compared in one form however the arguments spell them."""
+        monkeypatch.chdir(prompts)
+        Path("custom.yaml").write_text("validation: {}\n")
+        session = WatchSession(
+            parse_args([str(prompts), "-c", "custom.yaml", "--no-cache"])
+        )
+        session.initial()
+        capsys.readouterr()
+        watcher = make(session.root, [Path("custom.yaml")])
+        try:
+            touch(prompts / "good.md", (VALID_DIR / "minimal.md").read_text())
+            changed = watcher.read(timeout=1)
+            assert changed == {prompts / "good.md"}
+            session.update(changed)
+
+            touch(Path("custom.yaml"), "validation:\n  semantic_check: false\n")
+            changed = watcher.read(timeout=1)
+            while more := watcher.read(0.1):
+                changed |= more
+            session.update(changed)
+        finally:
+            watcher.close()
+
+        out = capsys.readouterr().out
+        assert "Config changed" in out
+        assert "+ Line" not in out
+        assert "2 file(s), 1 failing" in out
+        assert set(session.results) == {prompts / "bad.md", prompts / "good.md"}
+
+    def test_removed_file_dropped(self, prompts, capsys):
+        session = WatchSession(parse_args([str(prompts), "--no-cache"]))
+        session.initial()
+
+        (prompts / "bad.md").unlink()
+        session.update({prompts / "bad.md"})
+
+        out = capsys.readouterr().out
+        assert f"REMOVED: {prompts / 'bad.md'}" in out
+        assert "1 file(s), 0 failing" in out
@@ -0,0 +1,978 @@
+"""Token counting with a lazily loaded, process-wide encoder.
+
+The encoder is loaded on the first count (or an explicit warm_up call),
+then shared by every later count in the process. Encoder load time and
+per-file counting time are tracked separately.
+
+Counting functions take a tokenizer name, which selects the backend:
+a tiktoken encoding name ("cl100k_base", or "cl100k_base:<directory>"
+to load it from an encoding_cache directory instead), a local
+BPE ranks file ("bpe:<encoding>:<path>", split the way <encoding>
+splits text), or the character-class estimator ("estimator", or
+"estimator:<feature>=<weight>,..." with calibrated weights).
+
+Without tiktoken or its encoding, counts fall back to an estimate of 4
+characters per token; a BPE file, encoding_cache entry or estimator
+that cannot be loaded raises TokenizerError instead.
+
+Whole-text counts are remembered by content hash (COUNT_CACHE), so
+unchanged text is not encoded again; the CLI persists the cache between
+runs.
+"""
+
+import hashlib
+import math
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Prefixes of tokenizer names that do not name a tiktoken encoding
+BPE_PREFIX = "bpe:"
+ESTIMATOR = "estimator"
+
+# Split patterns and special tokens of tiktoken's encodings (copied from
+# tiktoken_ext.openai_public), for local BPE files of the same kind
+_R50K_PATTERN = (
+    r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}++| ?\p{N}++| ?[^\s\p{L}\p{N}]++|\s++$|\s+(?!\S)|\s"""
+)
+BPE_PATTERNS = {
+    "r50k_base": _R50K_PATTERN,
+    "p50k_base": _R50K_PATTERN,
+    "cl100k_base": (
+        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+|"""
+        r""" ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+    ),
+    "o200k_base": "|".join(
+        [
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""\p{N}{1,3}""",
+            r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+            r"""\s*[\r\n]+""",
+            r"""\s+(?!\S)""",
+            r"""\s+""",
+        ]
+    ),
+}
+BPE_SPECIAL_TOKENS = {
+    "r50k_base": {"<|endoftext|>": 50256},
+    "p50k_base": {"<|endoftext|>": 50256},
+    "cl100k_base": {
+        "<|endoftext|>": 100257,
+        "<|fim_prefix|>": 100258,
+        "<|fim_middle|>": 100259,
+        "<|fim_suffix|>": 100260,
+        "<|endofprompt|>": 100276,
+    },
+    "o200k_base": {"<|endoftext|>": 199999, "<|endofprompt|>": 200018},
+}
+
+# Where text can be split without changing its total token count: the
+# tiktoken encodings never merge a newline with a following non-space
+# character (other than '/', which o200k may attach after newlines).
+# Cutting only at paragraph starts and tag lines keeps segments large
+# and their boundaries stable under edits elsewhere in the text.
+SEGMENT_BOUNDARY_PATTERN = re.compile(r"(?<=\n\n)(?=[^\s/])|(?<=\n)(?=<)")
+
+# Characters TokenCounter buffers before encoding what it has
+ENCODE_BATCH_CHARS = 1 << 20
+
+# Characters encoded at a time by counts bounded with max_tokens, which
+# stop at the first chunk that reaches the bound
+BOUNDED_CHUNK_CHARS = 1 << 15
+
+# Characters of text each count_tokens_batch task encodes, and the
+# number of threads encoding them (as Encoding.encode_batch defaults to)
+COUNT_BATCH_CHARS = 1 << 18
+COUNT_THREADS = min(8, os.cpu_count() or 1)
+
+# Counts TokenCountCache keeps, in memory and on disk
+COUNT_CACHE_MAX_ENTRIES = 1 << 16
+# Name of the token count file in the CLI's cache directory
+COUNT_CACHE_FILE = "token-counts.bin"
+# File header, then one record per entry, least recently used first
+_COUNT_CACHE_MAGIC = b"prompt_lang token counts v1\n"
+_COUNT_RECORD = struct.Struct("<16sI")  # Key digest, token count
+
+# What the estimator counts in text: runs of ASCII letters, ASCII
+# letters, runs of digits, digits, runs of ASCII punctuation, ASCII
+# punctuation, runs of line breaks, line breaks followed by indentation,
+# and UTF-8 bytes of non-ASCII characters past their first
+ESTIMATOR_FEATURES = (
+    "words",
+    "letters",
+    "numbers",
+    "digits",
+    "punctuation_runs",
+    "punctuation",
+    "line_breaks",
+    "indents",
+    "non_ascii",
+)
+# Tokens per occurrence of each feature, derived from cl100k_base's
+# split pattern (most words and punctuation runs are one token, numbers
+# are split every 3 digits) rather than fitted; calibrate on a corpus
+# for weights with a measured error
+DEFAULT_ESTIMATOR_WEIGHTS = {
+    "words": 1.0,
+    "letters": 0.04,
+    "numbers": 0.7,
+    "digits": 0.3,
+    "punctuation_runs": 0.9,
+    "punctuation": 0.1,
+    "line_breaks": 0.6,
+    "indents": 0.9,
+    "non_ascii": 0.5,
+}
+
+
+def _class_table(members: bytes) -> bytes:
+    """Return a bytes.translate table mapping members to b"x", others to b"_"."""
+    return bytes(ord("x") if byte in members else ord("_") for byte in range(256))
+
+
+_LETTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_DIGITS = b"0123456789"
+_LETTER_TABLE = _class_table(_LETTERS)
+_DIGIT_TABLE = _class_table(_DIGITS)
+_PUNCTUATION_TABLE = _class_table(
+    bytes(b for b in range(0x21, 0x7F) if b not in _LETTERS + _DIGITS)
+)
+_LINE_BREAK_TABLE = _class_table(b"\n\r")
+
+
+@dataclass
+class TokenStats:
+    """Timing for encoder loading and token counting."""
+
+    encoder_load_seconds: float = 0.0
+    count_seconds: float = 0.0
+    files_counted: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Tokenizer: encoder load {self.encoder_load_seconds * 1000:.1f} ms, "
+            f"counting {self.count_seconds * 1000:.1f} ms "
+            f"over {self.files_counted} file(s)\n"
+            f"Token count cache: {self.cache_hits} hit(s), {self.cache_misses} miss(es)"
+        )
+
+    def add(self, other: "TokenStats") -> None:
+        """Add the counters of another process's stats to these."""
+        for stat in fields(self):
+            value = getattr(self, stat.name) + getattr(other, stat.name)
+            setattr(self, stat.name, value)
+
+
+STATS = TokenStats()
+
+
+class TokenCountCache:
+    """Token counts by content hash, evicting the least recently used.
+
+    Keys are digests of the tokenizer id and the text, so counts from
+    different encodings never mix. Entries live in memory; load and save
+    persist them to a file of fixed-size records. save merges the file's
+    current entries, so concurrent runs add to it rather than replace it.
+    """
+
+    def __init__(self, max_entries: int = COUNT_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._counts: OrderedDict[bytes, int] = OrderedDict()
+        self._added: dict[bytes, int] = {}  # Entries added since take_added
+        self._loaded: set[Path] = set()
+        self._changed = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content: str, tokenizer: str) -> bytes:
+        """Return the key for the count of content made by tokenizer."""
+        digest = hashlib.blake2b(tokenizer.encode("utf-8"), digest_size=16)
+        digest.update(b"\0")
+        digest.update(content.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def get(self, key: bytes) -> int | None:
+        """Return the count stored under key, or None on a miss."""
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None:
+                STATS.cache_misses += 1
+                return None
+            self._counts.move_to_end(key)
+            self._changed = True
+            STATS.cache_hits += 1
+            return count
+
+    def put(self, key: bytes, count: int) -> None:
+        """Store a count, evicting the least recently used if full."""
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            self._added[key] = count
+            self._changed = True
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def update(self, entries: dict[bytes, int]) -> None:
+        """Store counts made elsewhere, such as in a worker process."""
+        for key, count in entries.items():
+            self.put(key, count)
+
+    def take_added(self) -> dict[bytes, int]:
+        """Return the entries stored since the last call, and forget them."""
+        with self._lock:
+            added, self._added = self._added, {}
+            return added
+
+    def load(self, path: Path | str) -> None:
+        """Add the entries of a cache file, once per file and process.
+
+        Entries already in memory count as more recently used. A missing or
+        unreadable file is ignored.
+        """
+        path = Path(path)
+        if path in self._loaded:
+            return
+        self._loaded.add(path)
+        entries = _read_count_file(path)
+        with self._lock:
+            entries.update(self._counts)
+            self._counts = OrderedDict(entries)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def save(self, path: Path | str) -> None:
+        """Write the cache to path, merged with the file's current entries.
+
+        Does nothing if no count was used or added since the last save.
+        Failures to write are ignored.
+        """
+        import tempfile
+
+        path = Path(path)
+        with self._lock:
+            if not self._changed:
+                return
+            self._changed = False
+            entries = _read_count_file(path)
+            for key in self._counts:
+                entries.pop(key, None)
+            entries.update(self._counts)
+
+        records = list(entries.items())[-self.max_entries :]
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_COUNT_CACHE_MAGIC)
+                    f.write(b"".join(_COUNT_RECORD.pack(*r) for r in records))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Remove every entry from memory."""
+        with self._lock:
+            self._counts.clear()
+            self._added.clear()
+            self._loaded.clear()
+            self._changed = False
+
+
+def _read_count_file(path: Path) -> dict[bytes, int]:
+    """Read the entries of a token count file, oldest first."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return {}
+    if not data.startswith(_COUNT_CACHE_MAGIC):
+        return {}
+    body = memoryview(data)[len(_COUNT_CACHE_MAGIC) :]
+    body = body[: len(body) - len(body) % _COUNT_RECORD.size]
+    return dict(_COUNT_RECORD.iter_unpack(body))
+
+
+COUNT_CACHE = TokenCountCache()
+
+
+class TokenEstimator:
+    """Estimates token counts from character-class statistics.
+
+    The estimate is a weighted sum of the ESTIMATOR_FEATURES of the text,
+    rounded, so it is additive over text cut at token-safe boundaries
+    (up to rounding) like the encodings' counts. encode returns a range
+    of the estimated length, so an estimator stands in for an encoder
+    wherever only the number of tokens is used.
+    """
+
+    def __init__(self, weights: dict[str, float] | None = None) -> None:
+        unknown = set(weights or ()) - set(ESTIMATOR_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown estimator features: {sorted(unknown)}")
+        self.weights = {**DEFAULT_ESTIMATOR_WEIGHTS, **(weights or {})}
+        self._weights = [self.weights[name] for name in ESTIMATOR_FEATURES]
+
+    @classmethod
+    def from_name(cls, name: str) -> "TokenEstimator":
+        """Build the estimator a tokenizer name such as "estimator:words=1.1" names."""
+        _, _, spec = name.partition(":")
+        weights = {}
+        for item in filter(None, spec.split(",")):
+            feature, _, weight = item.partition("=")
+            weights[feature.strip()] = float(weight)
+        return cls(weights)
+
+    @staticmethod
+    def features(text: str) -> list[int]:
+        """Return the count of each of ESTIMATOR_FEATURES in text."""
+        data = text.encode("utf-8", "surrogatepass")
+        features = []
+        for table in (_LETTER_TABLE, _DIGIT_TABLE, _PUNCTUATION_TABLE):
+            # Bytes of the class become b"x"; each run ends at b"x_" or the end
+            classes = data.translate(table)
+            runs = classes.count(b"x_") + classes.endswith(b"x")
+            features += [runs, classes.count(b"x")]
+        classes = data.translate(_LINE_BREAK_TABLE)
+        features.append(classes.count(b"x_") + classes.endswith(b"x"))
+        features.append(data.count(b"\n ") + data.count(b"\n\t"))
+        features.append(len(data) - len(text))
+        return features
+
+    def count(self, text: str) -> int:
+        """Return the estimated token count of text."""
+        features = self.features(text)
+        return round(sum(w * n for w, n in zip(self._weights, features)))
+
+    def encode(self, text: str) -> range:
+        """Return a stand-in encoding of text: range(self.count(text))."""
+        return range(self.count(text))
+
+
+def calibrate_estimator(
+    texts: list[str], counts: list[int]
+) -> tuple[dict[str, float], float]:
+    """Fit estimator weights to exact token counts.
+
+    Solves the least-squares problem over the features of texts,
+    dropping features whose weight comes out negative, so every weight
+    is at least 0.
+
+    Args:
+        texts: Calibration texts, typical of the files to be counted.
+        counts: Exact token count of each text.
+
+    Returns:
+        Tuple of (weights by feature, largest relative error of the fitted
+        estimate over texts).
+    """
+    rows = [TokenEstimator.features(text) for text in texts]
+    active = [i for i in range(len(ESTIMATOR_FEATURES)) if any(r[i] for r in rows)]
+    while True:
+        solution = _least_squares([[r[i] for i in active] for r in rows], counts)
+        negative = [i for i, w in zip(active, solution) if w < 0]
+        if not negative:
+            break
+        active = [i for i in active if i not in negative]
+
+    weights = dict.fromkeys(ESTIMATOR_FEATURES, 0.0)
+    for i, weight in zip(active, solution):
+        weights[ESTIMATOR_FEATURES[i]] = round(weight, 4)
+    return weights, estimator_error(TokenEstimator(weights), texts, counts)
+
+
+def estimator_error(
+    estimator: TokenEstimator, texts: list[str], counts: list[int]
+) -> float:
+    """Return the largest relative error of estimator's counts of texts."""
+    return max(
+        (
+            abs(estimator.count(text) - count) / count
+            for text, count in zip(texts, counts)
+            if count
+        ),
+        default=0.0,
+    )
+
+
+def _least_squares(rows: list[list[int]], targets: list[int]) -> list[float]:
+    """Solve the normal equations of rows · w ≈ targets by elimination."""
+    size = len(rows[0]) if rows else 0
+    matrix = [
+        [float(sum(r[i] * r[j] for r in rows)) for j in range(size)]
+        + [float(sum(r[i] * t for r, t in zip(rows, targets)))]
+        for i in range(size)
+    ]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(matrix[row][column]))
+        matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+        if abs(matrix[column][column]) < 1e-12:
+            continue  # Collinear feature: leave its weight at 0
+        for row in range(size):
+            if row != column:
+                factor = matrix[row][column] / matrix[column][column]
+                for j in range(column, size + 1):
+                    matrix[row][j] -= factor * matrix[column][j]
+    return [
+        matrix[i][size] / matrix[i][i] if abs(matrix[i][i]) >= 1e-12 else 0.0
+        for i in range(size)
+    ]
+
+
+# tokenizer name -> encoder, or None if it could not be loaded
+_encoders: dict[str, object | None] = {}
+_encoders_lock = threading.Lock()
+_NOT_LOADED = object()
+_TIKTOKEN_INSTALLED: bool | None = None
+
+
+class TokenizerError(ValueError):
+    """A local BPE file, encoding_cache entry or the estimator could not be loaded."""
+
+
+def get_encoder(encoding_name: str = DEFAULT_ENCODING):
+    """Return the shared encoder for a tokenizer, loading it on first use.
+
+    A failed load is remembered so later calls do not retry it. A tiktoken
+    encoding that cannot be loaded (tiktoken missing, or no network to
+    download it) falls back to the estimate, but a BPE file, encoding_cache
+    entry or estimator was configured explicitly, so failing to load one
+    is an error; encodings with an encoding_cache are never downloaded.
+
+    Args:
+        encoding_name: Tokenizer name (see the module docstring).
+
+    Returns:
+        tiktoken Encoding or TokenEstimator, or None if a tiktoken encoding
+        could not be loaded.
+
+    Raises:
+        TokenizerError: If a BPE file, encoding_cache entry or the
+            estimator could not be loaded.
+    """
+    try:
+        encoder = _encoders[encoding_name]
+    except KeyError:
+        with _encoders_lock:
+            encoder = _encoders.get(encoding_name, _NOT_LOADED)
+            if encoder is _NOT_LOADED:
+                start = time.perf_counter()
+                try:
+                    encoder = _load_encoder(encoding_name)
+                except Exception as e:
+                    encoder = None if _falls_back_to_estimate(encoding_name) else e
+                STATS.encoder_load_seconds += time.perf_counter() - start
+                _encoders[encoding_name] = encoder
+
+    if isinstance(encoder, Exception):
+        raise TokenizerError(f"Cannot load tokenizer {encoding_name}: {encoder}")
+    return encoder
+
+
+def _falls_back_to_estimate(encoding_name: str) -> bool:
+    """Check whether a tokenizer name selects a tiktoken encoding by name alone."""
+    return ":" not in encoding_name and encoding_name != ESTIMATOR
+
+
+def _load_encoder(encoding_name: str):
+    """Load the encoder a tokenizer name selects."""
+    if encoding_name.partition(":")[0] == ESTIMATOR:
+        return TokenEstimator.from_name(encoding_name)
+
+    import tiktoken
+
+    if not encoding_name.startswith(BPE_PREFIX):
+        encoding, _, cache_dir = encoding_name.partition(":")
+        if cache_dir:
+            from .encoding_cache import entry_path, load_encoding
+
+            # Never download when a local copy was configured
+            encoder = load_encoding(cache_dir, encoding)
+            if encoder is None:
+                raise ValueError(
+                    f"No readable entry {entry_path(cache_dir, encoding)} "
+                    "(write it with 'prompt_lang tokenizer-cache')"
+                )
+            return encoder
+        return tiktoken.get_encoding(encoding)
+
+    from tiktoken.load import load_tiktoken_bpe
+
+    _, base, path = encoding_name.split(":", 2)
+    return tiktoken.Encoding(
+        encoding_name,
+        pat_str=BPE_PATTERNS[base],
+        mergeable_ranks=load_tiktoken_bpe(path),
+        special_tokens=BPE_SPECIAL_TOKENS[base],
+    )
+
+
+def tokenizer_id(encoding_name: str = DEFAULT_ENCODING) -> str:
+    """Identify what produces counts for a tokenizer, without loading it.
+
+    Used to key cached results, so counts made by the fallback estimate are
+    not reused once tiktoken is installed (and vice versa), nor counts of
+    a local BPE file or encoding_cache entry once it changes.
+    """
+    encoder = _encoders.get(encoding_name, _NOT_LOADED)
+    if encoder is None:
+        return "estimate"
+    if encoding_name.partition(":")[0] == ESTIMATOR:
+        return encoding_name
+    if encoder is _NOT_LOADED and not _tiktoken_installed():
+        return "estimate"
+    if encoding_name.startswith(BPE_PREFIX):
+        try:
+            stat = os.stat(encoding_name.split(":", 2)[2])
+        except (IndexError, OSError):
+            return "estimate"
+        return f"{encoding_name}:{stat.st_mtime_ns}:{stat.st_size}"
+    encoding, _, cache_dir = encoding_name.partition(":")
+    if cache_dir:
+        from .encoding_cache import entry_path
+
+        try:
+            stat = os.stat(entry_path(cache_dir, encoding))
+        except OSError:
+            return "estimate"
+        return f"{encoding_name}:{stat.st_mtime_ns}:{stat.st_size}"
+    return f"tiktoken:{encoding}"
+
+
+def _tiktoken_installed() -> bool:
+    """Check whether tiktoken can be imported, without importing it."""
+    global _TIKTOKEN_INSTALLED
+    if _TIKTOKEN_INSTALLED is None:
+        import importlib.util
+
+        _TIKTOKEN_INSTALLED = importlib.util.find_spec("tiktoken") is not None
+    return _TIKTOKEN_INSTALLED
+
+
+def warm_up(encoding_name: str = DEFAULT_ENCODING) -> bool:
+    """Load the encoder ahead of the first count.
+
+    Long-running hosts (daemons, pool workers) call this once at startup so
+    no validation request pays the load cost.
+
+    Args:
+        encoding_name: Tokenizer name (see the module docstring).
+
+    Returns:
+        True if the encoder is available, False if counts will be estimated.
+
+    Raises:
+        TokenizerError: If a BPE file, encoding_cache entry or the
+            estimator could not be loaded.
+    """
+    return get_encoder(encoding_name) is not None
+
+
+def count_tokens(
+    content: str,
+    encoding_name: str = DEFAULT_ENCODING,
+    max_tokens: int | None = None,
+) -> int:
+    """Count tokens in content.
+
+    Falls back to a rough estimate (1 token ≈ 4 chars) when the encoder is
+    unavailable or fails on the content. Encoded counts are kept in
+    COUNT_CACHE and reused for the same content and encoding.
+
+    Args:
+        content: Text to count.
+        encoding_name: Tokenizer name (see the module docstring).
+        max_tokens: Stop encoding once the count reaches this many tokens.
+            A count of max_tokens or more is then only a lower bound.
+
+    Returns:
+        Token count.
+    """
+    encoder = get_encoder(encoding_name)
+
+    start = time.perf_counter()
+    if encoder is None:
+        count = len(content) // 4
+    else:
+        key = COUNT_CACHE.make_key(content, tokenizer_id(encoding_name))
+        count = COUNT_CACHE.get(key)
+        if count is None:
+            count = _encode_count(encoder, content, max_tokens)
+            if max_tokens is None or count < max_tokens:
+                COUNT_CACHE.put(key, count)
+    STATS.count_seconds += time.perf_counter() - start
+    STATS.files_counted += 1
+
+    return count
+
+
+def count_tokens_batch(
+    contents: list[str],
+    encoding_name: str = DEFAULT_ENCODING,
+    threads: int | None = None,
+    max_tokens: int | None = None,
+) -> list[int]:
+    """Count tokens in many texts, encoding them in batches on a thread pool.
+
+    Gives the same counts as calling count_tokens on each text, and uses
+    COUNT_CACHE the same way. Texts not in the cache are grouped into
+    batches of about COUNT_BATCH_CHARS characters, which are encoded
+    concurrently: tiktoken releases the GIL while it encodes. Unlike
+    Encoding.encode_batch, a text the encoder fails on gets the estimate
+    without failing the rest of its batch.
+
+    Args:
+        contents: Texts to count.
+        encoding_name: Tokenizer name (see the module docstring).
+        threads: Number of encoding threads (default COUNT_THREADS). 1
+            encodes on the calling thread.
+        max_tokens: Stop encoding each text once its count reaches this
+            many tokens (see count_tokens).
+
+    Returns:
+        Token counts, in the order of contents.
+    """
+    encoder = get_encoder(encoding_name)
+    if encoder is None:
+        STATS.files_counted += len(contents)
+        return [len(content) // 4 for content in contents]
+
+    start = time.perf_counter()
+    tokenizer = tokenizer_id(encoding_name)
+    keys = [COUNT_CACHE.make_key(content, tokenizer) for content in contents]
+    counts: dict[bytes, int] = {}
+    missing: dict[bytes, str] = {}
+    for key, content in zip(keys, contents):
+        if key in counts or key in missing:
+            STATS.cache_hits += 1  # Duplicate text: counted once
+            continue
+        count = COUNT_CACHE.get(key)
+        if count is None:
+            missing[key] = content
+        else:
+            counts[key] = count
+
+    batches: list[list[bytes]] = [[]]
+    batch_chars = 0
+    for key, content in missing.items():
+        if batch_chars >= COUNT_BATCH_CHARS:
+            batches.append([])
+            batch_chars = 0
+        batches[-1].append(key)
+        batch_chars += len(content)
+
+    def encode_batch(batch: list[bytes]) -> list[int]:
+        return [_encode_count(encoder, missing[key], max_tokens) for key in batch]
+
+    if threads is None:
+        threads = COUNT_THREADS
+    if threads > 1 and len(batches) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(min(threads, len(batches))) as executor:
+            batch_counts = list(executor.map(encode_batch, batches))
+    else:
+        batch_counts = [encode_batch(batch) for batch in batches]
+
+    for batch, batch_count in zip(batches, batch_counts):
+        for key, count in zip(batch, batch_count):
+            counts[key] = count
+            if max_tokens is None or count < max_tokens:
+                COUNT_CACHE.put(key, count)
+    STATS.count_seconds += time.perf_counter() - start
+    STATS.files_counted += len(contents)
+
+    return [counts[key] for key in keys]
+
+
+def count_tokens_by_span(
+    content: str,
+    spans: list[tuple[int, int]],
+    encoding_name: str = DEFAULT_ENCODING,
+    min_tokens: int = 0,
+    max_tokens: int | None = None,
+) -> tuple[int, list[int] | None]:
+    """Count tokens in content and in spans of it, encoding it at most once.
+
+    The total is the same as count_tokens', and uses COUNT_CACHE the same
+    way. Tokens are attributed to every span containing their first
+    character, using the byte length of each token of the one encoding,
+    so spans may overlap. The estimator counts each span on its own, and
+    without an encoder each span is estimated like the whole text.
+
+    Args:
+        content: Text to count.
+        spans: (start, end) character offsets of parts of content.
+        encoding_name: Tokenizer name (see the module docstring).
+        min_tokens: Only count the spans of texts with at least this many
+            tokens. Cached texts with fewer are not encoded at all.
+        max_tokens: Stop encoding once the count reaches this many tokens
+            (see count_tokens). Only the spans that end in the encoded part
+            of the text are then counted; the others get None.
+
+    Returns:
+        Tuple of (token count, token count of each span, or None if the
+        text has fewer than min_tokens tokens).
+    """
+    encoder = get_encoder(encoding_name)
+    bound = math.inf if max_tokens is None else max_tokens
+    STATS.files_counted += 1
+    if encoder is None:
+        count = len(content) // 4
+        if count < min_tokens:
+            return count, None
+        return count, [(end - start) // 4 for start, end in spans]
+
+    start_time = time.perf_counter()
+    key = COUNT_CACHE.make_key(content, tokenizer_id(encoding_name))
+    count = COUNT_CACHE.get(key)
+    span_counts = None
+    if count is None or min_tokens <= count:
+        try:
+            encoded, encoded_end = _encode_prefix(encoder, content, max_tokens)
+        except Exception:
+            encoded = None  # Estimate everything, as count_tokens does
+        if count is None:
+            count = len(content) // 4 if encoded is None else len(encoded)
+            if count < bound:  # Not a partial count
+                COUNT_CACHE.put(key, count)
+        if min_tokens <= count and encoded is None:
+            span_counts = [(end - start) // 4 for start, end in spans]
+        elif min_tokens <= count and isinstance(encoder, TokenEstimator):
+            span_counts = [encoder.count(content[start:end]) for start, end in spans]
+        elif min_tokens <= count:
+            counted = [(start, end) for start, end in spans if end <= encoded_end]
+            counts = iter(_count_span_tokens(encoder, content, encoded, counted))
+            span_counts = [
+                next(counts) if end <= encoded_end else None for _, end in spans
+            ]
+    STATS.count_seconds += time.perf_counter() - start_time
+
+    return count, span_counts
+
+
+def _count_span_tokens(
+    encoder, content: str, encoded: list[int], spans: list[tuple[int, int]]
+) -> list[int]:
+    """Count the tokens of encoded (content's encoding) starting in each span."""
+    import bisect
+    import itertools
+
+    # Byte offset of the start of each token
+    token_lengths = map(len, encoder.decode_tokens_bytes(encoded))
+    token_starts = list(itertools.accumulate(token_lengths, initial=0))
+    token_starts.pop()
+
+    # Byte offset of each span boundary
+    byte_offsets: dict[int, int] = {}
+    offset = 0
+    position = 0
+    for boundary in sorted({boundary for span in spans for boundary in span}):
+        offset += len(content[position:boundary].encode("utf-8", "surrogatepass"))
+        byte_offsets[boundary] = offset
+        position = boundary
+
+    return [
+        bisect.bisect_left(token_starts, byte_offsets[end])
+        - bisect.bisect_left(token_starts, byte_offsets[start])
+        for start, end in spans
+    ]
+
+
+def _encode_count(encoder, content: str, max_tokens: int | None = None) -> int:
+    """Encode content and return its length, or the estimate on failure."""
+    try:
+        return len(_encode(encoder, content, max_tokens))
+    except Exception:
+        return len(content) // 4
+
+
+def _encode(encoder, content: str, max_tokens: int | None) -> list[int]:
+    """Encode content, or with max_tokens only until that many tokens."""
+    return _encode_prefix(encoder, content, max_tokens)[0]
+
+
+def _encode_prefix(
+    encoder, content: str, max_tokens: int | None
+) -> tuple[list[int], int]:
+    """Encode content, or with max_tokens only until that many tokens.
+
+    Bounded encodings proceed in chunks of about BOUNDED_CHUNK_CHARS cut
+    at token-safe boundaries (see SEGMENT_BOUNDARY_PATTERN), so the
+    tokens of the chunks are those of the whole text.
+
+    Returns:
+        Tuple of (tokens, length of the encoded prefix of content).
+    """
+    if max_tokens is None:
+        return encoder.encode(content), len(content)
+    encoded: list[int] = []
+    start = 0
+    while start < len(content) and len(encoded) < max_tokens:
+        match = SEGMENT_BOUNDARY_PATTERN.search(content, start + BOUNDED_CHUNK_CHARS)
+        end = match.start() if match else len(content)
+        encoded += encoder.encode(content[start:end])
+        start = end
+    return encoded, start
+
+
+def split_segments(content: str) -> list[str]:
+    """Split content at token-safe boundaries (see SEGMENT_BOUNDARY_PATTERN)."""
+    segments = []
+    start = 0
+    for match in SEGMENT_BOUNDARY_PATTERN.finditer(content):
+        if match.start() > start:
+            segments.append(content[start : match.start()])
+            start = match.start()
+    segments.append(content[start:])
+    return segments
+
+
+def count_tokens_incremental(
+    content: str,
+    segment_counts: dict[str, int] | None,
+    encoding_name: str = DEFAULT_ENCODING,
+) -> tuple[int, dict[str, int]]:
+    """Count tokens, reusing counts of segments seen in an earlier version.
+
+    Content is split into segments at token-safe boundaries; only segments
+    not found in segment_counts are encoded. The total equals
+    count_tokens(content, encoding_name).
+
+    Args:
+        content: Text to count.
+        segment_counts: Counts by segment text from the previous call for
+            an earlier version of the text, or None.
+        encoding_name: Tokenizer name (see the module docstring).
+
+    Returns:
+        Tuple of (token count, counts by segment text for the next call).
+    """
+    encoder = get_encoder(encoding_name)
+    if encoder is None:
+        # The estimate is not additive over segments, and is cheap anyway
+        return count_tokens(content, encoding_name), {}
+
+    previous = segment_counts or {}
+    counts: dict[str, int] = {}
+    total = 0
+
+    start = time.perf_counter()
+    try:
+        for segment in split_segments(content):
+            count = counts.get(segment)
+            if count is None:
+                count = previous.get(segment)
+            if count is None:
+                count = len(encoder.encode(segment))
+            counts[segment] = count
+            total += count
+    except Exception:
+        total = len(content) // 4
+        counts = {}
+    STATS.count_seconds += time.perf_counter() - start
+    STATS.files_counted += 1
+
+    return total, counts
+
+
+class TokenCounter:
+    """Counts the tokens of text that is fed in pieces.
+
+    The total equals count_tokens on the concatenated text. Text is
+    encoded in batches cut at token-safe boundaries (see
+    SEGMENT_BOUNDARY_PATTERN), so memory is bounded by the batch size
+    and the longest paragraph rather than by the whole text. With
+    max_tokens, text fed once the count reaches it is not encoded, and
+    the total is then only a lower bound.
+    """
+
+    def __init__(
+        self,
+        encoding_name: str = DEFAULT_ENCODING,
+        batch_chars: int = ENCODE_BATCH_CHARS,
+        max_tokens: int | None = None,
+    ) -> None:
+        self._encoder = get_encoder(encoding_name)
+        self._batch_chars = batch_chars
+        self._max_tokens = math.inf if max_tokens is None else max_tokens
+        self._flush_at = batch_chars
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._chars = 0
+        self._count = 0
+
+    def feed(self, text: str) -> None:
+        """Add the next piece of text."""
+        self._chars += len(text)
+        if self._encoder is None or self._count >= self._max_tokens:
+            return
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= self._flush_at:
+            self._encode(final=False)
+
+    def total(self) -> int:
+        """Return the token count of all text fed so far.
+
+        Call once, after the last piece.
+        """
+        if self._encoder is not None and self._count < self._max_tokens:
+            self._encode(final=True)
+        STATS.files_counted += 1
+        if self._encoder is None:
+            return self._chars // 4
+        return self._count
+
+    def _encode(self, final: bool) -> None:
+        pending = "".join(self._pending)
+        cut = len(pending)
+        if not final:
+            cut = 0
+            for match in SEGMENT_BOUNDARY_PATTERN.finditer(pending, 1):
+                cut = match.start()
+            if not cut:
+                # No boundary yet: wait for more text
+                self._pending = [pending]
+                self._flush_at = self._pending_chars + self._batch_chars
+                return
+
+        start = time.perf_counter()
+        try:
+            self._count += len(self._encoder.encode(pending[:cut]))
+        except Exception:
+            # Estimate the whole text, as count_tokens does
+            self._encoder = None
+        STATS.count_seconds += time.perf_counter() - start
+
+        rest = pending[cut:]
+        if self._encoder is None or self._count >= self._max_tokens:
+            rest = ""
+        self._pending = [rest] if rest else []
+        self._pending_chars = len(rest)
+        self._flush_at = self._batch_chars
+
+
+def reset_stats() -> None:
+    """Reset timing counters."""
+    STATS.encoder_load_seconds = 0.0
+    STATS.count_seconds = 0.0
+    STATS.files_counted = 0
+    STATS.cache_hits = 0
+    STATS.cache_misses = 0
@@ -6,14 +6,23 @@ Usage:
     python -m prompt_lang.validate path/to/file.md --config custom.yaml
     python -m prompt_lang.validate path/to/file.md --no-semantic
     python -m prompt_lang.validate path/to/file.md -v
+    python -m prompt_lang.validate path/to/directory/ --jobs 8
+    python -m prompt_lang.validate path/to/directory/ --no-cache
+    python -m prompt_lang.validate path/to/directory/ --watch
+    python -m prompt_lang serve
+    python -m prompt_lang lsp
+    python -m prompt_lang tokenizer-cache
 """
 
 import argparse
+import os
 import sys
-from fnmatch import fnmatch
 from pathlib import Path
+from typing import TextIO
 
-from .config import Config, load_config
+from . import frontmatter, tokens
+from .cache import DEFAULT_CACHE_DIR, ResultCache
+from .config import TOKENIZER_BACKENDS, Config, FileRule, load_config
 from .directives import (
     extract_instruction_steps,
     parse_directives,
@@ -21,8 +30,7 @@ from .directives import (
     validate_instruction_step,
 )
 from .errors import ValidationResult
-from .parser import ParsedPrompt, parse_file
-from .semantic import validate_semantic
+from .parser import ParsedPrompt, Tag, parse_content, parse_file, parse_stream
 
 # Exit codes
 EXIT_SUCCESS = 0
@@ -30,6 +38,25 @@ EXIT_VALIDATION_ERROR = 1
 EXIT_CONFIG_ERROR = 2
 EXIT_FILE_NOT_FOUND = 3
 
+# Directories with fewer files are validated serially; below this size
+# worker startup costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+# Files larger than this are validated as a stream instead of being read
+# whole (and bypass the result cache, which keys on the whole content)
+STREAMING_MIN_BYTES = 64 * 1024 * 1024
+
+# Files a serial directory run reads ahead, to count their tokens together
+COUNT_WINDOW_FILES = 256
+
+
+class CLIError(Exception):
+    """A problem that ends the run before validation, with its exit code."""
+
+    def __init__(self, message: str, exit_code: int) -> None:
+        super().__init__(message)
+        self.exit_code = exit_code
+
 
 def main(argv: list[str] | None = None) -> int:
     """Main entry point for CLI.
@@ -40,35 +67,104 @@ def main(argv: list[str] | None = None) -> int:
     Returns:
         Exit code (0 for success, non-zero for errors).
     """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv and argv[0] == "serve":
+        from .daemon import serve_main
+
+        return serve_main(argv[1:])
+
+    if argv and argv[0] == "lsp":
+        from .lsp import lsp_main
+
+        return lsp_main(argv[1:])
+
+    if argv and argv[0] == "tokenizer-cache":
+        from .encoding_cache import tokenizer_cache_main
+
+        return tokenizer_cache_main(argv[1:])
+
     args = parse_args(argv)
 
+    if args.watch:
+        from .watch import watch
+
+        return watch(args)
+
+    try:
+        results = None
+        # --stats reports timings of this process, so it always runs locally
+        if not (args.no_daemon or args.stats):
+            from .daemon import validate_remote
+
+            results = validate_remote(args)
+        if results is None:
+            results = run_validation(args)
+    except CLIError as e:
+        print(e, file=sys.stderr)
+        return e.exit_code
+
+    # Print results
+    all_passed = print_results(results, verbose=args.verbose)
+
+    if args.stats:
+        print_stats(results)
+
+    return EXIT_SUCCESS if all_passed else EXIT_VALIDATION_ERROR
+
+
+def run_validation(args: argparse.Namespace) -> list[ValidationResult]:
+    """Validate the path named by parsed command line arguments.
+
+    Args:
+        args: Arguments from parse_args.
+
+    Returns:
+        Validation results, one per file.
+
+    Raises:
+        CLIError: If the config cannot be loaded or the path does not exist.
+    """
     # Load configuration
     try:
         config = load_config(args.config)
     except Exception as e:
-        print(f"Error loading config: {e}", file=sys.stderr)
-        return EXIT_CONFIG_ERROR
+        raise CLIError(f"Error loading config: {e}", EXIT_CONFIG_ERROR) from e
 
     # Override semantic check if --no-semantic
     if args.no_semantic:
         config.validation.semantic_check = False
+    if args.exact_tokens:
+        config.validation.tokens.exact = True
+    if args.tokenizer:
+        config.validation.tokens.backend = args.tokenizer
+    try:
+        config.validation.tokens.check()
+        tokens.warm_up(config.validation.tokens.tokenizer)
+    except ValueError as e:
+        raise CLIError(f"Error loading config: {e}", EXIT_CONFIG_ERROR) from e
 
     # Resolve path
     path = Path(args.path)
     if not path.exists():
-        print(f"Error: Path not found: {path}", file=sys.stderr)
-        return EXIT_FILE_NOT_FOUND
+        raise CLIError(f"Error: Path not found: {path}", EXIT_FILE_NOT_FOUND)
+
+    cache = None if args.no_cache else ResultCache(DEFAULT_CACHE_DIR)
+    if cache is not None:
+        tokens.COUNT_CACHE.load(cache.token_counts_path)
 
     # Validate file(s)
     if path.is_file():
-        results = [validate_file(path, config)]
+        results = [validate_file(path, config, cache)]
     else:
-        results = validate_directory(path, config)
+        results = validate_directory(path, config, jobs=args.jobs, cache=cache)
 
-    # Print results
-    all_passed = print_results(results, verbose=args.verbose)
+    if cache is not None:
+        cache.prune()
+        tokens.COUNT_CACHE.save(cache.token_counts_path)
 
-    return EXIT_SUCCESS if all_passed else EXIT_VALIDATION_ERROR
+    return results
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -106,6 +202,19 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         help="Skip semantic validation (ambiguous language detection)",
     )
 
+    parser.add_argument(
+        "--exact-tokens",
+        action="store_true",
+        help="Count every token of files past the fail threshold (default: stop there)",
+    )
+
+    parser.add_argument(
+        "--tokenizer",
+        choices=TOKENIZER_BACKENDS,
+        default=None,
+        help="Token counting backend (default: validation.tokens.backend)",
+    )
+
     parser.add_argument(
         "--verbose",
         "-v",
@@ -113,9 +222,52 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         help="Verbose output (show passing files)",
     )
 
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=_default_jobs(),
+        help="Number of worker processes for directory validation (default: CPU count)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Do not read or write the result cache ({DEFAULT_CACHE_DIR}/)",
+    )
+
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help=(
+            "Print cache hits, tokenizer timing and frontmatter parser paths "
+            "(bypasses the daemon; times of --jobs workers are summed)"
+        ),
+    )
+
+    parser.add_argument(
+        "--watch",
+        "-w",
+        action="store_true",
+        help="Keep running and revalidate files as they change",
+    )
+
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Validate in-process even if a 'prompt_lang serve' daemon is running",
+    )
+
     return parser.parse_args(argv)
 
 
+def _default_jobs() -> int:
+    """Return the number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
 def get_matching_file_rule(file_path: Path, config: Config):
     """Get the file rule that matches the given path.
 
@@ -126,53 +278,219 @@ def get_matching_file_rule(file_path: Path, config: Config):
     Returns:
         Matching FileRule or None.
     """
-    file_path_str = file_path.as_posix()
+    return config.compiled.first_file_rule(file_path.as_posix())
+
+
+def get_matching_file_rules(file_path: Path, config: Config) -> list[FileRule]:
+    """Get every file rule that matches the given path.
+
+    Args:
+        file_path: Path to the file.
+        config: Configuration object.
 
-    for rule in config.file_rules:
-        if fnmatch(file_path_str, rule.pattern):
-            return rule
-    return None
+    Returns:
+        Matching FileRules in configuration order.
+    """
+    return config.compiled.matching_file_rules(file_path.as_posix())
 
 
-def validate_file(file_path: Path, config: Config) -> ValidationResult:
+def validate_file(
+    file_path: Path,
+    config: Config,
+    cache: ResultCache | None = None,
+    memory_map: bool = False,
+) -> ValidationResult:
     """Validate a single prompt file.
 
     Args:
         file_path: Path to the prompt file.
         config: Configuration object.
+        cache: Optional result cache. Unchanged files are answered from it
+            without being parsed.
+        memory_map: Memory-map the file when it is parsed (see
+            parser.parse_file).
 
     Returns:
         ValidationResult for the file.
     """
+    try:
+        streamed = file_path.stat().st_size >= STREAMING_MIN_BYTES
+    except OSError:
+        streamed = False  # Let parse_file report the read failure
+    if streamed:
+        return _validate_file_streamed(file_path, config)
+
+    if cache is not None:
+        return _validate_file_cached(file_path, config, cache)
+
     # Check for file-specific rules first
     file_rule = get_matching_file_rule(file_path, config)
 
     # Parse and validate structure
-    parsed, result = parse_file(file_path, config, file_rule)
+    parsed, result = parse_file(file_path, config, file_rule, memory_map)
+
+    _validate_parsed(file_path, parsed, result, config, file_rule)
+    return result
+
+
+def validate_content(
+    content: str, file_path: Path, config: Config, token_count: int | None = None
+) -> ValidationResult:
+    """Validate prompt content as if it were read from file_path.
+
+    Args:
+        content: Prompt file content.
+        file_path: Path used for file rule matching and reporting.
+        config: Configuration object.
+        token_count: Token count of content, if already counted.
+
+    Returns:
+        ValidationResult for the content.
+    """
+    file_rule = get_matching_file_rule(file_path, config)
+    result = ValidationResult(file_path=str(file_path))
+    parsed, result = parse_content(content, result, config, file_rule, token_count)
+
+    _validate_parsed(file_path, parsed, result, config, file_rule)
+    return result
+
+
+def validate_stream(
+    stream: TextIO, file_path: Path, config: Config
+) -> ValidationResult:
+    """Validate prompt content read from a text stream.
+
+    Produces the same result as validate_content on the stream's content
+    (see parser.parse_stream for the limits), but each block is checked
+    as soon as it is parsed and then dropped, so memory is bounded by the
+    largest block rather than the file.
+
+    Args:
+        stream: Text stream positioned at the start of the content.
+        file_path: Path used for file rule matching and reporting.
+        config: Configuration object.
+
+    Returns:
+        ValidationResult for the content.
+    """
+    file_rule = get_matching_file_rule(file_path, config)
+    result = ValidationResult(file_path=str(file_path))
+
+    semantic_check = config.validation.semantic_check and not (
+        file_rule and file_rule.skip_frontmatter
+    )
+    if semantic_check:
+        from .semantic import check_ambiguous_language
+
+    # Errors of each check, merged below in the order _validate_parsed
+    # reports them
+    semantic_result = ValidationResult(file_path=str(file_path))
+    directives_result = ValidationResult(file_path=str(file_path))
+    instructions_result = ValidationResult(file_path=str(file_path))
+
+    # File rules only need every forbidden tag and one tag of each name
+    forbidden_tags = {
+        tag_name
+        for rule in get_matching_file_rules(file_path, config)
+        for tag_name in rule.forbidden_tags
+    }
+    rule_tags: list[Tag] = []
+    seen_tags: set[str] = set()
+
+    def check_tag(tag: Tag) -> None:
+        if tag.name == "instructions":
+            if semantic_check:
+                check_ambiguous_language(
+                    ParsedPrompt(tags=[tag]), semantic_result, config
+                )
+            validate_instructions_block(
+                tag.content, tag.start_line, instructions_result, config
+            )
+        elif tag.name == "directives":
+            validate_directives_block(
+                tag.content, tag.start_line, directives_result, config
+            )
+        if tag.name in forbidden_tags or tag.name not in seen_tags:
+            seen_tags.add(tag.name)
+            rule_tags.append(Tag(tag.name, "", tag.start_line, tag.end_line))
+
+    parse_stream(stream, result, config, file_rule, on_tag=check_tag)
+
+    result.errors.extend(semantic_result.errors)
+    validate_file_rules(file_path, ParsedPrompt(tags=rule_tags), result, config)
+    result.errors.extend(directives_result.errors)
+    result.errors.extend(instructions_result.errors)
+    return result
+
 
+def _validate_file_streamed(file_path: Path, config: Config) -> ValidationResult:
+    """Validate a file too large to read whole."""
+    try:
+        with open(file_path, encoding="utf-8") as stream:
+            return validate_stream(stream, file_path, config)
+    except OSError as e:
+        result = ValidationResult(file_path=str(file_path))
+        result.add_error(0, f"Failed to read file: {e}")
+        return result
+
+
+def _validate_file_cached(
+    file_path: Path, config: Config, cache: ResultCache
+) -> ValidationResult:
+    """Validate a file, answering from the cache when its inputs are unchanged."""
+    try:
+        data = file_path.read_bytes()
+    except OSError:
+        # Let the uncached path report the read failure
+        return validate_file(file_path, config)
+
+    # The key records whether the tokenizer loads, so load it first
+    tokens.warm_up(config.validation.tokens.tokenizer)
+    file_rules = get_matching_file_rules(file_path, config)
+    key = cache.make_key(data, file_rules, config)
+    cached = cache.get(key, str(file_path))
+    if cached is not None:
+        return cached
+
+    # Decode the way Path.read_text does (universal newlines)
+    content = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    result = validate_content(content, file_path, config)
+    cache.put(key, result)
+    return result
+
+
+def _validate_parsed(
+    file_path: Path,
+    parsed: ParsedPrompt,
+    result: ValidationResult,
+    config: Config,
+    file_rule: FileRule | None,
+) -> None:
+    """Run the checks that follow structural parsing."""
     # Run semantic validation (skip for files without standard structure)
-    if not (file_rule and file_rule.skip_frontmatter):
+    # semantic is only imported when its checks are enabled
+    if config.validation.semantic_check and not (
+        file_rule and file_rule.skip_frontmatter
+    ):
+        from .semantic import validate_semantic
+
         validate_semantic(parsed, result, config)
 
     # Validate file-specific tag rules
     validate_file_rules(file_path, parsed, result, config)
 
-    # Validate directives if present
-    directives_tag = parsed.get_tag("directives")
-    if directives_tag:
+    # Validate every directives block
+    for directives_tag in parsed.get_tags("directives"):
         validate_directives_block(
             directives_tag.content, directives_tag.start_line, result, config
         )
 
-    # Validate instruction steps if present
-    instructions_tag = parsed.get_tag("instructions")
-    if instructions_tag:
+    # Validate instruction steps in every instructions block
+    for instructions_tag in parsed.get_tags("instructions"):
         validate_instructions_block(
             instructions_tag.content, instructions_tag.start_line, result, config
         )
 
-    return result
-
 
 def validate_file_rules(
     file_path: Path, parsed: ParsedPrompt, result: ValidationResult, config: Config
@@ -185,28 +503,22 @@ def validate_file_rules(
         result: Validation result to update with errors.
         config: Configuration object with file rules.
     """
-    # Convert to POSIX path for pattern matching
-    file_path_str = file_path.as_posix()
-
-    for rule in config.file_rules:
-        if fnmatch(file_path_str, rule.pattern):
-            # Check required tags
-            for required_tag in rule.required_tags:
-                if not parsed.has_tag(required_tag):
-                    result.add_error(
-                        0,
-                        f"File matching pattern '{rule.pattern}' requires <{required_tag}> tag",
-                    )
-
-            # Check forbidden tags
-            for forbidden_tag in rule.forbidden_tags:
-                if parsed.has_tag(forbidden_tag):
-                    forbidden_tag_obj = parsed.get_tag(forbidden_tag)
-                    line_num = forbidden_tag_obj.start_line if forbidden_tag_obj else 0
-                    result.add_error(
-                        line_num,
-                        f"File matching pattern '{rule.pattern}' forbids <{forbidden_tag}> tag",
-                    )
+    for rule in get_matching_file_rules(file_path, config):
+        # Check required tags
+        for required_tag in rule.required_tags:
+            if not parsed.has_tag(required_tag):
+                result.add_error(
+                    0,
+                    f"File matching pattern '{rule.pattern}' requires <{required_tag}> tag",
+                )
+
+        # Check forbidden tags, reporting each occurrence
+        for forbidden_tag in rule.forbidden_tags:
+            for forbidden_tag_obj in parsed.get_tags(forbidden_tag):
+                result.add_error(
+                    forbidden_tag_obj.start_line,
+                    f"File matching pattern '{rule.pattern}' forbids <{forbidden_tag}> tag",
+                )
 
 
 def validate_directives_block(
@@ -221,10 +533,11 @@ def validate_directives_block(
         config: Configuration object.
     """
     directives = parse_directives(content)
+    compiled_patterns = config.compiled.directive_patterns
 
     for directive in directives:
         is_valid, error_msg = validate_directive(
-            directive.content, config.validation.directives
+            directive.content, config.validation.directives, compiled_patterns
         )
         if not is_valid:
             # Calculate actual line number in file
@@ -247,10 +560,11 @@ def validate_instructions_block(
         config: Configuration object.
     """
     steps = extract_instruction_steps(content)
+    action_keywords = config.compiled.action_keywords
 
     for step_content, relative_line_num in steps:
         is_valid, error_msg = validate_instruction_step(
-            step_content, config.validation.instructions
+            step_content, config.validation.instructions, action_keywords
         )
         if not is_valid:
             # Calculate actual line number in file
@@ -261,22 +575,169 @@ def validate_instructions_block(
             )
 
 
-def validate_directory(dir_path: Path, config: Config) -> list[ValidationResult]:
+def validate_directory(
+    dir_path: Path,
+    config: Config,
+    jobs: int = 1,
+    cache: ResultCache | None = None,
+) -> list[ValidationResult]:
     """Validate all prompt files in a directory.
 
     Args:
         dir_path: Path to the directory.
         config: Configuration object.
+        jobs: Number of worker processes. Directories with fewer than
+            PARALLEL_MIN_FILES files are always validated in this process,
+            with tokens counted in batches on threads (see
+            tokens.count_tokens_batch).
+        cache: Optional result cache shared by all workers.
 
     Returns:
-        List of ValidationResult objects.
+        List of ValidationResult objects, in sorted path order.
     """
-    results: list[ValidationResult] = []
-
     # Find all .md files recursively
-    for file_path in sorted(dir_path.rglob("*.md")):
-        results.append(validate_file(file_path, config))
+    file_paths = sorted(dir_path.rglob("*.md"))
+
+    if jobs <= 1 or len(file_paths) < PARALLEL_MIN_FILES:
+        results = []
+        for start in range(0, len(file_paths), COUNT_WINDOW_FILES):
+            window = file_paths[start : start + COUNT_WINDOW_FILES]
+            results.extend(_validate_batched(window, config, cache))
+        return results
+
+    return _validate_parallel(file_paths, config, jobs, cache)
+
+
+def _validate_batched(
+    file_paths: list[Path],
+    config: Config,
+    cache: ResultCache | None,
+) -> list[ValidationResult]:
+    """Validate files, counting the tokens of all of them in one batch.
 
+    Files are read (and looked up in the cache) first. The contents left
+    to parse are counted with tokens.count_tokens_batch, then validated
+    with their counts. Results are the same as validate_file's; files it
+    would stream or fail to read are passed to it as they are.
+    """
+    tokens_config = config.validation.tokens
+    if cache is not None:
+        # The key records whether the tokenizer loads, so load it first
+        tokens.warm_up(tokens_config.tokenizer)
+
+    results: list[ValidationResult | None] = []
+    pending: list[tuple[int, Path, str | None, str]] = []  # (index, path, key, content)
+    for file_path in file_paths:
+        try:
+            streamed = file_path.stat().st_size >= STREAMING_MIN_BYTES
+            data = None if streamed else file_path.read_bytes()
+        except OSError:
+            data = None
+        if data is None:
+            results.append(validate_file(file_path, config, cache))
+            continue
+
+        key = None
+        if cache is not None:
+            file_rules = get_matching_file_rules(file_path, config)
+            key = cache.make_key(data, file_rules, config)
+            cached = cache.get(key, str(file_path))
+            if cached is not None:
+                results.append(cached)
+                continue
+
+        try:
+            # Decode the way Path.read_text does (universal newlines)
+            content = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        except UnicodeDecodeError:
+            results.append(validate_file(file_path, config, cache))
+            continue
+
+        pending.append((len(results), file_path, key, content))
+        results.append(None)
+
+    token_counts = tokens.count_tokens_batch(
+        [content for _, _, _, content in pending],
+        tokens_config.tokenizer,
+        max_tokens=tokens_config.count_bound,
+    )
+    for (index, file_path, key, content), token_count in zip(pending, token_counts):
+        result = validate_content(content, file_path, config, token_count)
+        if key is not None:
+            cache.put(key, result)
+        results[index] = result
+    return results
+
+
+# Configuration and cache for the current worker process, set once by _init_worker
+_worker_config: Config | None = None
+_worker_cache: ResultCache | None = None
+
+
+def _init_worker(config: Config, cache: ResultCache | None) -> None:
+    """Initialize a worker process with the shared configuration."""
+    global _worker_config, _worker_cache
+    _worker_config = config
+    _worker_cache = cache
+    # Forked workers start with a copy of the parent's stats
+    tokens.STATS = tokens.TokenStats()
+    frontmatter.STATS = frontmatter.FrontmatterStats()
+    if cache is not None:
+        tokens.COUNT_CACHE.load(cache.token_counts_path)
+    tokens.warm_up(config.validation.tokens.tokenizer)
+
+
+def _validate_in_worker(
+    file_path: Path,
+) -> tuple[
+    ValidationResult,
+    dict[bytes, int],
+    tuple[tokens.TokenStats, frontmatter.FrontmatterStats],
+]:
+    """Validate a file using the worker's configuration.
+
+    Returns:
+        The result, the token counts the worker cached since its last
+        file, for the parent's token count cache, and the worker's
+        tokenizer and frontmatter stats since its last file (including
+        the encoder load, for its first), for --stats.
+    """
+    result = validate_file(file_path, _worker_config, _worker_cache)
+    stats = (tokens.STATS, frontmatter.STATS)
+    tokens.STATS = tokens.TokenStats()
+    frontmatter.STATS = frontmatter.FrontmatterStats()
+    return result, tokens.COUNT_CACHE.take_added(), stats
+
+
+def _validate_parallel(
+    file_paths: list[Path],
+    config: Config,
+    jobs: int,
+    cache: ResultCache | None = None,
+) -> list[ValidationResult]:
+    """Validate files across a process pool.
+
+    The configuration is sent to each worker once at startup, and files are
+    handed out in chunks. Results are returned in input order. Token counts
+    made by the workers are added to this process's token count cache, and
+    their timing stats to this process's.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = min(jobs, len(file_paths))
+    chunksize = max(1, len(file_paths) // (jobs * 4))
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(config, cache)
+    ) as executor:
+        for result, token_counts, (token_stats, fm_stats) in executor.map(
+            _validate_in_worker, file_paths, chunksize=chunksize
+        ):
+            tokens.COUNT_CACHE.update(token_counts)
+            tokens.STATS.add(token_stats)
+            frontmatter.STATS.add(fm_stats)
+            results.append(result)
     return results
 
 
@@ -314,6 +775,20 @@ def print_results(results: list[ValidationResult], verbose: bool = False) -> boo
     return failed_count == 0
 
 
+def print_stats(results: list[ValidationResult]) -> None:
+    """Print performance statistics for the run.
+
+    Times spent in worker processes are summed over the workers.
+
+    Args:
+        results: Validation results of the run.
+    """
+    hits = sum(1 for result in results if result.cached)
+    print(f"Result cache: {hits} hit(s), {len(results) - hits} miss(es)")
+    print(tokens.STATS)
+    print(frontmatter.STATS)
+
+
 def print_failure(result: ValidationResult) -> None:
     """Print a failed validation result.
 
@@ -335,7 +810,18 @@ def print_failure(result: ValidationResult) -> None:
             print(f"  Line {warning.line}: {warning.message}")
 
     print()
-    print(f"Token count: {result.token_count}")
+    if result.token_count_exact:
+        print(f"Token count: {result.token_count}")
+    else:
+        print(
+            f"Token count: {result.token_count_text} "
+            "(--exact-tokens counts them all, by block)"
+        )
+    if result.token_breakdown:
+        if not result.token_count_exact:
+            print("  Blocks counted before it stopped:")
+        for label, count in result.token_breakdown.items():
+            print(f"  {label}: {count}")
     print(
         f"Result: FAIL ({len(result.errors)} errors, {len(result.warnings)} warnings)"
     )
@@ -0,0 +1,420 @@
+"""Watch mode: revalidate prompt files as they change.
+
+Changes are picked up with inotify on Linux and by polling modification
+times elsewhere. Events are debounced, then only the changed files are
+validated again; an edit to the config file revalidates everything.
+Output is incremental: for each changed file, the errors it gained and
+the errors it lost since the previous run.
+"""
+
+import argparse
+import os
+import select
+import struct
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from . import tokens
+from .cache import DEFAULT_CACHE_DIR, ResultCache
+from .config import DEFAULT_CONFIG_PATH, Config, load_config
+from .errors import ValidationError, ValidationResult
+
+# Quiet period that ends a burst of file events
+DEBOUNCE_SECONDS = 0.1
+POLL_INTERVAL_SECONDS = 0.5
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _is_prompt_file(path: Path) -> bool:
+    return path.suffix == ".md"
+
+
+def _absolute(path: Path | str) -> Path:
+    """Return path made absolute, the one form watched paths are compared in."""
+    return Path(os.path.abspath(path))
+
+
+def _prompt_files(root: Path) -> list[Path]:
+    """Return the prompt files a watched path covers."""
+    if root.is_dir():
+        return sorted(root.rglob("*.md"))
+    return [root] if root.exists() else []
+
+
+class PollingWatcher:
+    """Detects changes by comparing modification times between scans."""
+
+    def __init__(
+        self,
+        root: Path,
+        extra_files: list[Path],
+        interval: float = POLL_INTERVAL_SECONDS,
+    ) -> None:
+        self.root = _absolute(root)
+        self.extra_files = [_absolute(path) for path in extra_files]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in _prompt_files(self.root) + self.extra_files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout: float | None = None) -> set[Path]:
+        """Wait for changes.
+
+        Args:
+            timeout: Seconds to wait. None waits until something changes.
+
+        Returns:
+            Paths created, modified or deleted since the previous call.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                time.sleep(self.interval)
+            else:
+                time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Detects changes with Linux inotify, watching directories recursively."""
+
+    def __init__(self, root: Path, extra_files: list[Path]) -> None:
+        import ctypes
+
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        root = _absolute(root)
+        extra_files = [_absolute(path) for path in extra_files]
+        self._root = root
+        self._dirs: dict[int, Path] = {}
+        # Files watched through their parent directory, when not under root
+        self._file_filter: set[Path] | None = None
+        if root.is_dir():
+            self._add_tree(root)
+        else:
+            self._file_filter = {root}
+            self._add_dir(root.parent)
+        for path in extra_files:
+            if self._file_filter is not None:
+                self._file_filter.add(path)
+            if path.parent not in self._dirs.values():
+                self._add_dir(path.parent)
+        self._extra_files = set(extra_files)
+
+    def _add_dir(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            # A directory watched twice keeps its descriptor and first path
+            self._dirs.setdefault(wd, directory)
+
+    def _add_tree(self, directory: Path) -> list[Path]:
+        """Watch a directory and its subdirectories; return prompt files inside."""
+        self._add_dir(directory)
+        found = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return found
+        for entry in entries:
+            path = directory / entry.name
+            if entry.is_dir(follow_symlinks=False):
+                found.extend(self._add_tree(path))
+            elif _is_prompt_file(path):
+                found.append(path)
+        return found
+
+    def _wanted(self, path: Path) -> bool:
+        if path in self._extra_files:
+            return True
+        if self._file_filter is not None:
+            return path in self._file_filter
+        return _is_prompt_file(path)
+
+    def read(self, timeout: float | None = None) -> set[Path]:
+        """Wait for changes.
+
+        Args:
+            timeout: Seconds to wait. None waits until something changes.
+
+        Returns:
+            Paths created, modified or deleted since the previous call.
+        """
+        changed: set[Path] = set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not changed:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return changed
+            changed |= self._drain()
+        return changed
+
+    def _drain(self) -> set[Path]:
+        changed: set[Path] = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; report every file as changed
+                changed.update(_prompt_files(self._root))
+                changed.update(self._extra_files)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if self._file_filter is not None:
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self._add_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    # Reported so files that were inside it can be dropped
+                    changed.add(path)
+                continue
+            if self._wanted(path):
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def make_watcher(root: Path, extra_files: list[Path]):
+    """Return an inotify watcher where supported, otherwise a polling one."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, extra_files)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, extra_files)
+
+
+def diff_messages(
+    old: list[ValidationError], new: list[ValidationError]
+) -> tuple[list[ValidationError], list[ValidationError]]:
+    """Compare two error lists by message.
+
+    Messages are compared without line numbers, so an error that only
+    moved because lines were added above it is not reported again.
+
+    Returns:
+        (introduced, fixed): errors only in new, and errors only in old.
+    """
+    remaining = Counter(error.message for error in old)
+    introduced = []
+    for error in new:
+        if remaining[error.message]:
+            remaining[error.message] -= 1
+        else:
+            introduced.append(error)
+
+    remaining = Counter(error.message for error in new)
+    fixed = []
+    for error in old:
+        if remaining[error.message]:
+            remaining[error.message] -= 1
+        else:
+            fixed.append(error)
+    return introduced, fixed
+
+
+class WatchSession:
+    """Validation state for a watched path, updated file by file."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        # Absolute, like the paths watchers report and results are keyed by
+        self.root = _absolute(args.path)
+        self.config_path = _absolute(args.config or DEFAULT_CONFIG_PATH)
+        self.cache = None if args.no_cache else ResultCache(DEFAULT_CACHE_DIR)
+        if self.cache is not None:
+            tokens.COUNT_CACHE.load(self.cache.token_counts_path)
+        self.config = self._load_config()
+        self.results: dict[Path, ValidationResult] = {}
+
+    def _load_config(self) -> Config:
+        config = load_config(self.config_path)
+        if self.args.no_semantic:
+            config.validation.semantic_check = False
+        if self.args.exact_tokens:
+            config.validation.tokens.exact = True
+        if self.args.tokenizer:
+            config.validation.tokens.backend = self.args.tokenizer
+        config.validation.tokens.check()
+        tokens.warm_up(config.validation.tokens.tokenizer)
+        return config
+
+    def initial(self) -> bool:
+        """Validate every file and print the full report.
+
+        Returns:
+            True if all files passed.
+        """
+        from .validate import print_results, validate_file
+
+        for path in _prompt_files(self.root):
+            self.results[path] = validate_file(path, self.config, self.cache)
+        if self.cache is not None:
+            tokens.COUNT_CACHE.save(self.cache.token_counts_path)
+        return print_results(list(self.results.values()), verbose=self.args.verbose)
+
+    def update(self, changed: set[Path]) -> None:
+        """Revalidate changed files and print what changed in their results."""
+        from .validate import validate_file
+
+        changed = {_absolute(path) for path in changed}
+        config_changed = self.config_path in changed
+        revalidated: dict[Path, ValidationResult] = {}
+        if config_changed:
+            print(f"Config changed: {self.config_path}; revalidating all files")
+            targets = set(_prompt_files(self.root)) | set(self.results)
+            # Keep the previous config (and results) if the new one is
+            # invalid, which may only show once files are validated with it
+            try:
+                config = self._load_config()
+                for path in sorted(targets):
+                    if path.is_file():
+                        revalidated[path] = validate_file(path, config, self.cache)
+            except Exception as e:
+                print(
+                    f"Error in config {self.config_path}: {e}; "
+                    "keeping the previous config",
+                    file=sys.stderr,
+                )
+                return
+            self.config = config
+        else:
+            targets = {path for path in changed if _is_prompt_file(path)}
+            # Files inside a directory that was removed or moved away
+            targets.update(
+                known
+                for known in self.results
+                for path in changed
+                if path in known.parents and not path.exists()
+            )
+
+        for path in sorted(targets):
+            old = self.results.pop(path, None)
+            if not path.is_file():
+                if old is not None:
+                    print(f"REMOVED: {path}")
+                continue
+            new = revalidated.get(path)
+            if new is None:
+                new = validate_file(path, self.config, self.cache)
+            self.results[path] = new
+            self._print_change(path, old, new)
+
+        if self.cache is not None:
+            self.cache.prune()
+            tokens.COUNT_CACHE.save(self.cache.token_counts_path)
+
+        failing = sum(1 for result in self.results.values() if not result.passed)
+        print(
+            f"[{time.strftime('%H:%M:%S')}] "
+            f"{len(self.results)} file(s), {failing} failing"
+        )
+
+    def _print_change(
+        self, path: Path, old: ValidationResult | None, new: ValidationResult
+    ) -> None:
+        introduced, fixed = diff_messages(old.errors if old else [], new.errors)
+        if not introduced and not fixed:
+            return
+        status = "PASS" if new.passed else "FAIL"
+        print(f"{status}: {path}")
+        for error in introduced:
+            print(f"  + Line {error.line}: {error.message}")
+        for error in fixed:
+            print(f"  - Line {error.line}: {error.message} (fixed)")
+
+
+def watch(args: argparse.Namespace) -> int:
+    """Validate the path named by args, then revalidate it on every change.
+
+    Args:
+        args: Arguments from validate.parse_args.
+
+    Returns:
+        Exit code once interrupted.
+    """
+    from .validate import EXIT_CONFIG_ERROR, EXIT_FILE_NOT_FOUND, EXIT_SUCCESS
+
+    try:
+        session = WatchSession(args)
+    except Exception as e:
+        print(f"Error loading config: {e}", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+    if not session.root.exists():
+        print(f"Error: Path not found: {session.root}", file=sys.stderr)
+        return EXIT_FILE_NOT_FOUND
+
+    watcher = make_watcher(session.root, [session.config_path])
+    session.initial()
+    print(f"Watching {session.root} for changes (Ctrl+C to stop)")
+
+    try:
+        while True:
+            changed = watcher.read()
+            # Collect the rest of the burst (editors often write several times)
+            while more := watcher.read(DEBOUNCE_SECONDS):
+                changed |= more
+            session.update(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return EXIT_SUCCESS